@@ -0,0 +1,162 @@
+"""
+Cold-start benchmark for the metrics Lambda.
+
+Each run is a fresh interpreter that times:
+- import:        `import metrics` (the Lambda init phase)
+- first_request: the first /dashboard request, including any lazily created client and modules
+- cold_total:    import + first_request, what the first request after idle waits for
+- warm_request:  the same request again in the same process
+
+The table is a boto3-free stand-in, so only initialization and aggregation are
+measured. The real DynamoDB resource is still created (no network calls are made).
+Runs are repeated in LAZY_INIT=true and LAZY_INIT=false mode and reported as p50/p99.
+
+Usage:
+    python bench_cold_start.py [--runs 20] [--size 2000] [--save-baseline] [--check] [--tolerance 0.25]
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+BASELINE_PATH = os.path.join(HERE, "cold_start_baseline.json")
+MODES = {"lazy": "true", "eager": "false"}
+STAGES = ("import", "first_request", "cold_total", "warm_request")
+EVENT = {
+    "rawPath": "/dashboard",
+    "queryStringParameters": {"startDate": "20240101", "endDate": "20241231"},
+}
+
+
+class StaticTable:
+    """Returns the given items from scan segments; conditions are ignored"""
+
+    def __init__(self, items):
+        self.items = items
+
+    def scan(self, Segment=0, TotalSegments=1, **kwargs):
+        return {"Items": self.items[Segment::TotalSegments], "ScannedCount": len(self.items) // TotalSegments}
+
+
+def child(size, seed):
+    """One cold start; prints the stage timings in milliseconds as JSON"""
+    sys.path.insert(0, os.path.join(HERE, "..", "metrics_retrival"))
+    from synthetic_prs import generate_prs
+
+    table = StaticTable(generate_prs(size, seed))
+    stdout, sys.stdout = sys.stdout, open(os.devnull, "w")
+    try:
+        started = time.perf_counter()
+        import metrics
+        imported = time.perf_counter()
+
+        create_table = metrics.dynamo_table
+
+        def stand_in(name):
+            create_table(name)
+            return table
+        metrics.dynamo_table = stand_in
+
+        assert metrics.lambda_handler(EVENT, None)["statusCode"] == 200
+        first = time.perf_counter()
+        metrics.lambda_handler(EVENT, None)
+        warm = time.perf_counter()
+    finally:
+        sys.stdout.close()
+        sys.stdout = stdout
+
+    print(json.dumps({
+        "import": (imported - started) * 1000,
+        "first_request": (first - imported) * 1000,
+        "cold_total": (first - started) * 1000,
+        "warm_request": (warm - first) * 1000,
+    }))
+
+
+def run_once(mode, size, seed):
+    env = dict(
+        os.environ,
+        LAZY_INIT=MODES[mode],
+        AWS_DEFAULT_REGION=os.environ.get("AWS_DEFAULT_REGION", "us-east-1"),
+        DYNAMO_TABLE_NAME="bench",
+        RESPONSE_CACHE_ENABLED="false",
+        QUERY_PLANNER_ENABLED="false",
+    )
+    output = subprocess.run(
+        [sys.executable, __file__, "--child", "--size", str(size), "--seed", str(seed)],
+        env=env, check=True, capture_output=True, text=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def percentile(values, p):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--size", type=int, default=2000, help="PRs returned by the stand-in table")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--save-baseline", action="store_true", help=f"Write results to {os.path.basename(BASELINE_PATH)}")
+    parser.add_argument("--check", action="store_true", help="Exit with status 1 when lazy cold_total p99 regressed")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.size, args.seed)
+        return
+
+    results = {}
+    for mode in MODES:
+        runs = [run_once(mode, args.size, args.seed) for _ in range(args.runs)]
+        results[mode] = {
+            stage: {
+                "p50_ms": round(percentile([run[stage] for run in runs], 50), 1),
+                "p99_ms": round(percentile([run[stage] for run in runs], 99), 1),
+            }
+            for stage in STAGES
+        }
+
+    print(f"{'mode':<6} {'stage':<14} {'p50 ms':>8} {'p99 ms':>8}")
+    for mode, stages in results.items():
+        for stage, value in stages.items():
+            print(f"{mode:<6} {stage:<14} {value['p50_ms']:>8.1f} {value['p99_ms']:>8.1f}")
+
+    try:
+        with open(BASELINE_PATH) as f:
+            baseline = json.load(f)
+    except (OSError, ValueError):
+        baseline = None
+    regressed = False
+    if baseline:
+        previous = baseline["results"]["lazy"]["cold_total"]["p99_ms"]
+        ratio = results["lazy"]["cold_total"]["p99_ms"] / previous
+        regressed = ratio > 1 + args.tolerance
+        print(f"lazy cold_total p99 vs baseline: {ratio:.2f}x{' REGRESSION' if regressed else ''}")
+
+    if args.save_baseline:
+        with open(BASELINE_PATH, "w") as f:
+            json.dump({
+                "python": platform.python_version(),
+                "machine": platform.machine(),
+                "runs": args.runs,
+                "size": args.size,
+                "results": results,
+            }, f, indent=2)
+            f.write("\n")
+        print(f"Saved baseline to {BASELINE_PATH}")
+
+    if args.check and regressed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""
+Compares the pure-Python and NumPy columnar aggregators on synthetic PR items.
+
+Usage:
+    python bench_columnar.py [--sizes 10000,100000,1000000] [--seed 42] [--legacy]
+"""
+
+import argparse
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "metrics_retrival"))
+
+from synthetic_prs import generate_prs
+from calculate_summary_metrics import calculate_summary_metrics
+from contributor_metrics import calculate_contributor_metrics
+from columnar_metrics import numpy_available, PRColumns, summary_from_columns, contributors_from_columns
+
+
+def timed(fn, *args):
+    started = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", default="10000,100000,1000000")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--legacy", action="store_true", help="Items without precomputed epoch fields")
+    args = parser.parse_args()
+
+    if not numpy_available():
+        sys.exit("NumPy is not installed")
+    logging.disable(logging.WARNING)
+
+    print(f"{'PRs':>9} {'python s':>9} {'build s':>8} {'numpy s':>8} {'end-to-end':>11} {'agg-only':>9} match")
+    for size in (int(value) for value in args.sizes.split(",")):
+        items = generate_prs(size, args.seed, epoch_fields=not args.legacy)
+
+        python_result, python_time = timed(lambda: (calculate_summary_metrics(items), calculate_contributor_metrics(items)))
+        cols, build_time = timed(PRColumns, items)
+        numpy_result, agg_time = timed(lambda: (summary_from_columns(cols), contributors_from_columns(cols)))
+
+        numpy_time = build_time + agg_time
+        print(
+            f"{size:>9} {python_time:>9.3f} {build_time:>8.3f} {agg_time:>8.3f} "
+            f"{python_time / numpy_time:>10.1f}x {python_time / agg_time:>8.1f}x {python_result == numpy_result}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Measures bulk_import.py throughput on synthetic GitHub export archives written to a
+temporary directory and imported into the in-memory DynamoDB stand-in.
+
+Usage:
+    python bench_import.py [--prs 50000] [--files 8] [--processes N] [--writers 8] [--seed 42]
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+from datetime import datetime, timedelta, timezone
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "metrics_storage"))
+
+from memory_table import MemoryTable
+from bulk_import import run_import
+
+REVIEW_STATES = ["APPROVED", "COMMENTED", "CHANGES_REQUESTED"]
+
+
+def github_pr(rng, repo, number, people, start):
+    created = start + timedelta(minutes=rng.randrange(365 * 24 * 60))
+    merged = created + timedelta(hours=rng.expovariate(1 / 48)) if rng.random() < 0.7 else None
+    closed = merged or (created + timedelta(days=3) if rng.random() < 0.1 else None)
+    return {
+        "url": f"https://api.github.com/repos/example/{repo}/pulls/{number}",
+        "html_url": f"https://github.com/example/{repo}/pull/{number}",
+        "number": number,
+        "state": "closed" if closed else "open",
+        "draft": rng.random() < 0.03,
+        "user": {"login": rng.choice(people), "id": number},
+        "created_at": created.strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "updated_at": (closed or created).strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "merged_at": merged.strftime("%Y-%m-%dT%H:%M:%SZ") if merged else None,
+        "merged_by": {"login": rng.choice(people)} if merged else None,
+        "head": {"ref": f"ENG-{number}-change", "sha": "0" * 40},
+        "base": {"ref": rng.choice(["develop", "develop", "main"]), "repo": {"name": repo, "language": "Python"}},
+        "additions": rng.randint(1, 800),
+        "deletions": rng.randint(0, 300),
+        "body": "x" * rng.randint(0, 400),
+    }, created
+
+
+def github_reviews(rng, pr, created, people):
+    reviews = []
+    when = created
+    for _ in range(rng.randint(0, 3)):
+        when += timedelta(hours=rng.expovariate(1 / 10))
+        reviews.append({
+            "user": {"login": rng.choice(people)},
+            "state": rng.choice(REVIEW_STATES),
+            "submitted_at": when.strftime("%Y-%m-%dT%H:%M:%SZ"),
+            "pull_request_url": pr["url"],
+        })
+    return reviews
+
+
+def write_archives(directory, prs, files, seed):
+    """PRs as NDJSON and reviews as a separate JSON document per file"""
+    rng = random.Random(seed)
+    people = [f"dev-{i:04d}" for i in range(300)]
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    per_file = -(-prs // files)
+    for index in range(files):
+        pr_lines = []
+        reviews = []
+        for number in range(index * per_file, min(prs, (index + 1) * per_file)):
+            pr, created = github_pr(rng, f"service-{number % 40:03d}", number, people, start)
+            pr_lines.append(json.dumps(pr))
+            reviews.extend(github_reviews(rng, pr, created, people))
+        with open(os.path.join(directory, f"pulls-{index:03d}.ndjson"), "w") as f:
+            f.write("\n".join(pr_lines) + "\n")
+        with open(os.path.join(directory, f"reviews-{index:03d}.json"), "w") as f:
+            json.dump({"reviews": reviews}, f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--prs", type=int, default=50000)
+    parser.add_argument("--files", type=int, default=8)
+    parser.add_argument("--processes", type=int)
+    parser.add_argument("--writers", type=int, default=8)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        write_archives(directory, args.prs, args.files, args.seed)
+        table = MemoryTable()
+        checkpoint = os.path.join(directory, "import.ckpt")
+        stats = run_import([directory], table, checkpoint_path=checkpoint, processes=args.processes, writers=args.writers)
+        print(f"import: {stats}")
+        resumed = run_import([directory], table, checkpoint_path=checkpoint, processes=args.processes, writers=args.writers)
+        print(f"resume: {resumed}")
+
+
+if __name__ == "__main__":
+    main()
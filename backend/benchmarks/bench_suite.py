@@ -0,0 +1,210 @@
+"""
+Benchmark suite for the metrics read path on synthetic PR items.
+
+Stages, timed separately at each size:
+- scan:            read_by_date over the whole range from an in-memory DynamoDB stand-in
+- scan_projected:  the same read with the dashboard aggregators' ProjectionExpression
+- summary:         calculate_summary_metrics
+- contributors:    calculate_contributor_metrics
+- decode_resource: boto3's TypeDeserializer over the raw (wire format) items, as resource reads do
+- decode_client:   client_reads.decode_item over the same raw items (DYNAMODB_READ_PATH=client)
+- serialize:       metrics.response() of the /table body (JSON encoding of every item)
+- serialize_native: the same body as the client read path returns it (native ints/floats)
+
+Each stage reports seconds (the best of --repeat rounds over all stages, so one GC
+pause or burst of load does not decide a --check), items/second and tracemalloc peak memory
+(measured in a separate run so tracing does not distort the timings). Results can be
+saved as a baseline and later runs are compared against it. --check flags a stage
+whose ratio to the baseline exceeds the run's median ratio by more than --tolerance,
+and the median itself when it exceeds --tolerance.
+
+Usage:
+    python bench_suite.py [--sizes 1000,10000,100000] [--seed 42] [--repeat 5]
+                          [--save-baseline] [--check] [--tolerance 0.5] [--no-memory]
+"""
+
+import argparse
+import gc
+import json
+import logging
+import os
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "metrics_retrival"))
+
+# metrics.py reads these at import time. Its table handles are only created on the
+# first request, which never happens here; only response() is used
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+os.environ.setdefault("DYNAMO_TABLE_NAME", "bench")
+os.environ.setdefault("RESPONSE_CACHE_ENABLED", "false")
+
+from synthetic_prs import generate_prs
+from memory_table import MemoryTable
+from query_planner import read_by_date, build_projection
+from calculate_summary_metrics import calculate_summary_metrics
+from contributor_metrics import calculate_contributor_metrics
+from dashboard_metrics import REQUIRED_ATTRIBUTES as DASHBOARD_ATTRIBUTES
+from metrics import response
+from client_reads import decode_item
+from boto3.dynamodb.types import TypeSerializer, TypeDeserializer
+
+BASELINE_PATH = os.path.join(HERE, "baselines.json")
+RANGE_START = "2024-01-01T00:00:00Z"
+RANGE_END = "2024-12-31T23:59:59Z"
+INDEXES = {
+    "CreatedMonthIndex": ("CreatedMonth", "CreatedDate"),
+    "SquadIndex": ("Squad", "CreatedDate"),
+    "TechStackIndex": ("TechStack", "CreatedDate"),
+}
+
+
+def quiet_read(table, **read_kwargs):
+    """read_by_date without its per-call stats line"""
+    items, _ = read_by_date(table, RANGE_START, RANGE_END, **read_kwargs)
+    return items
+
+
+def stages(table, items):
+    projection = build_projection(DASHBOARD_ATTRIBUTES)
+    serializer, deserializer = TypeSerializer(), TypeDeserializer()
+    wire_items = [{name: serializer.serialize(value) for name, value in item.items()} for item in items]
+    native_items = [decode_item(item) for item in wire_items]
+    return [
+        ("scan", lambda: quiet_read(table)),
+        ("scan_projected", lambda: quiet_read(table, **projection)),
+        ("summary", lambda: calculate_summary_metrics(items)),
+        ("contributors", lambda: calculate_contributor_metrics(items)),
+        ("decode_resource", lambda: [{name: deserializer.deserialize(value) for name, value in item.items()} for item in wire_items]),
+        ("decode_client", lambda: [decode_item(item) for item in wire_items]),
+        ("serialize", lambda: response(200, items)),
+        ("serialize_native", lambda: response(200, native_items)),
+    ]
+
+
+def measure(fn, trace_memory):
+    if trace_memory:
+        tracemalloc.start()
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        return peak / (1024 * 1024)
+    gc.collect()
+    started = time.perf_counter()
+    fn()
+    return time.perf_counter() - started
+
+
+def run_size(size, seed, with_memory, repeat=1):
+    items = generate_prs(size, seed, string_encoded=0.2)
+    table = MemoryTable(indexes=INDEXES).load(items)
+    stage_list = stages(table, items)
+    # Rounds over all stages rather than back-to-back repeats, so a burst of load
+    # on the machine slows one round of every stage instead of all runs of one
+    timings = {name: [] for name, _ in stage_list}
+    for _ in range(repeat):
+        for name, fn in stage_list:
+            timings[name].append(measure(fn, False))
+    results = {}
+    for name, fn in stage_list:
+        seconds = min(timings[name])
+        results[name] = {
+            "seconds": round(seconds, 4),
+            "items_per_second": round(size / seconds) if seconds else None,
+            "peak_mb": round(measure(fn, True), 2) if with_memory else None,
+        }
+    return results
+
+
+def load_baseline():
+    try:
+        with open(BASELINE_PATH) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def compare(name, size, current, baseline):
+    """Ratio of one stage's time to the stored baseline, or None when it has no baseline"""
+    previous = ((baseline or {}).get("results", {}).get(str(size)) or {}).get(name)
+    if not previous or not previous.get("seconds"):
+        return None
+    return current["seconds"] / previous["seconds"]
+
+
+def regressions(ratios, tolerance):
+    """
+    (size, stage, ratio) entries slower than the baseline by more than tolerance.
+    A shared host speeds up and slows down as a whole, so stages are judged against
+    the median ratio of the run. The median itself is checked too, so a slowdown of
+    every stage is still reported (as stage "median").
+    """
+    if not ratios:
+        return []
+    drift = statistics.median(ratios.values())
+    print(f"Median ratio to baseline: {drift:.2f}x; stages are checked relative to it")
+    flagged = [(size, name, ratio) for (size, name), ratio in ratios.items() if ratio / drift > 1 + tolerance]
+    if drift > 1 + tolerance:
+        flagged.append(("all", "median", drift))
+    return flagged
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", default="1000,10000,100000", help="Comma-separated PR counts (add 1000000 for the large run)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--save-baseline", action="store_true", help=f"Write results to {os.path.basename(BASELINE_PATH)}")
+    parser.add_argument("--check", action="store_true", help="Exit with status 1 when a stage regressed")
+    parser.add_argument("--tolerance", type=float, default=0.5, help="Allowed slowdown vs. baseline, relative to the run's median ratio, before flagging")
+    parser.add_argument("--no-memory", action="store_true", help="Skip the tracemalloc run")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed runs per stage; the fastest is reported")
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    baseline = load_baseline()
+    all_results = {}
+    ratios = {}
+
+    print(f"{'PRs':>8} {'stage':<15} {'seconds':>9} {'items/s':>11} {'peak MB':>8} {'vs base':>8}")
+    for size in (int(value) for value in args.sizes.split(",")):
+        # read_by_date prints a stats line per call; keep the report readable
+        stdout, sys.stdout = sys.stdout, open(os.devnull, "w")
+        try:
+            results = run_size(size, args.seed, not args.no_memory, args.repeat)
+        finally:
+            sys.stdout.close()
+            sys.stdout = stdout
+        all_results[str(size)] = results
+        for name, result in results.items():
+            ratio = compare(name, size, result, baseline)
+            note = ""
+            if ratio is not None:
+                ratios[(size, name)] = ratio
+                note = f"{ratio:>6.2f}x"
+            peak = f"{result['peak_mb']:>8.1f}" if result["peak_mb"] is not None else f"{'-':>8}"
+            print(f"{size:>8} {name:<15} {result['seconds']:>9.4f} {result['items_per_second'] or 0:>11,} {peak} {note}")
+
+    if args.save_baseline:
+        with open(BASELINE_PATH, "w") as f:
+            json.dump({
+                "python": platform.python_version(),
+                "machine": platform.machine(),
+                "seed": args.seed,
+                "results": all_results,
+            }, f, indent=2)
+            f.write("\n")
+        print(f"Saved baseline to {BASELINE_PATH}")
+
+    flagged = regressions(ratios, args.tolerance)
+    for size, name, ratio in flagged:
+        print(f"REGRESSION: {name} at {size} PRs is {ratio:.2f}x the baseline")
+    if args.check and flagged:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,274 @@
+"""
+In-memory stand-in for a boto3 DynamoDB Table, used by the benchmarks and the bulk
+importer's local mode. It works offline and needs no DynamoDB Local.
+
+Items are kept in DynamoDB wire format (TypeSerializer) and deserialized only when
+they are returned, so reads pay the same Decimal/type conversion cost boto3 does.
+Supported:
+- scan (Segment/TotalSegments, Limit, ExclusiveStartKey, FilterExpression, ProjectionExpression)
+- query on the base table or a GSI (KeyConditionExpression on partition key and sort key)
+- put_item / get_item / delete_item
+- meta.client.batch_write_item / batch_get_item with Python-typed items
+- meta.client.transact_write_items with Put actions on this table, optionally
+  conditional on attribute_not_exists(<key>)
+FilterExpression and KeyConditionExpression must be boto3 condition objects (Key/Attr).
+Pages hold at most page_items evaluated items, approximating DynamoDB's 1 MB page limit.
+"""
+
+import bisect
+import zlib
+from boto3.dynamodb.conditions import AttributeBase
+from boto3.dynamodb.types import TypeSerializer, TypeDeserializer
+from botocore.exceptions import ClientError
+
+_serializer = TypeSerializer()
+_deserializer = TypeDeserializer()
+
+
+class _LazyItem:
+    """Deserializes single attributes on demand for condition evaluation"""
+
+    __slots__ = ("wire",)
+
+    def __init__(self, wire):
+        self.wire = wire
+
+    def get(self, name, default=None):
+        value = self.wire.get(name)
+        return default if value is None else _deserializer.deserialize(value)
+
+
+def _operand(value, item):
+    return item.get(value.name) if isinstance(value, AttributeBase) else value
+
+
+def _compare(left, right, op):
+    if left is None or right is None:
+        return False
+    try:
+        return op(left, right)
+    except TypeError:
+        return False
+
+
+def evaluate(condition, item):
+    """Evaluate a boto3 Key/Attr condition against an item (anything with .get)"""
+    operator = type(condition).__name__
+    values = condition.get_expression()["values"]
+    if operator == "And":
+        return all(evaluate(value, item) for value in values)
+    if operator == "Or":
+        return any(evaluate(value, item) for value in values)
+    if operator == "Not":
+        return not evaluate(values[0], item)
+    if operator == "AttributeExists":
+        return item.get(values[0].name) is not None
+    if operator == "AttributeNotExists":
+        return item.get(values[0].name) is None
+
+    operands = [_operand(value, item) for value in values]
+    if operator == "Equals":
+        return operands[0] is not None and operands[0] == operands[1]
+    if operator == "NotEquals":
+        return operands[0] != operands[1]
+    if operator == "LessThan":
+        return _compare(operands[0], operands[1], lambda a, b: a < b)
+    if operator == "LessThanEquals":
+        return _compare(operands[0], operands[1], lambda a, b: a <= b)
+    if operator == "GreaterThan":
+        return _compare(operands[0], operands[1], lambda a, b: a > b)
+    if operator == "GreaterThanEquals":
+        return _compare(operands[0], operands[1], lambda a, b: a >= b)
+    if operator == "Between":
+        return _compare(operands[0], operands[1], lambda a, b: a >= b) and _compare(operands[0], operands[2], lambda a, b: a <= b)
+    if operator == "BeginsWith":
+        return isinstance(operands[0], str) and operands[0].startswith(operands[1])
+    if operator == "In":
+        return operands[0] in operands[1]
+    raise NotImplementedError(f"Condition {operator} is not supported by MemoryTable")
+
+
+def _key_values(condition, names):
+    """Pull equality values for the given key names out of a KeyConditionExpression"""
+    found = {}
+    operator = type(condition).__name__
+    values = condition.get_expression()["values"]
+    if operator == "And":
+        for value in values:
+            found.update(_key_values(value, names))
+    elif operator == "Equals" and isinstance(values[0], AttributeBase) and values[0].name in names:
+        found[values[0].name] = values[1]
+    return found
+
+
+class _MemoryClient:
+    """Subset of the resource's meta.client used with Python-typed items"""
+
+    def __init__(self, table):
+        self._table = table
+
+    def batch_write_item(self, RequestItems, **kwargs):
+        for request in RequestItems.get(self._table.name, []):
+            if "PutRequest" in request:
+                self._table.put_item(Item=request["PutRequest"]["Item"])
+            else:
+                self._table.delete_item(Key=request["DeleteRequest"]["Key"])
+        return {"UnprocessedItems": {}}
+
+    def batch_get_item(self, RequestItems, **kwargs):
+        request = RequestItems.get(self._table.name, {})
+        found = [self._table.get_item(Key=key).get("Item") for key in request.get("Keys", [])]
+        return {"Responses": {self._table.name: [item for item in found if item]}, "UnprocessedKeys": {}}
+
+    def transact_write_items(self, TransactItems, **kwargs):
+        puts = [entry["Put"] for entry in TransactItems]
+        reasons = [
+            {"Code": "ConditionalCheckFailed" if put.get("ConditionExpression") and put["Item"][self._table.key] in self._table._items else "None"}
+            for put in puts
+        ]
+        if any(reason["Code"] != "None" for reason in reasons):
+            raise ClientError({
+                "Error": {"Code": "TransactionCanceledException", "Message": "Transaction cancelled"},
+                "CancellationReasons": reasons,
+            }, "TransactWriteItems")
+        for put in puts:
+            self._table.put_item(Item=put["Item"])
+        return {}
+
+
+class _Meta:
+    def __init__(self, table):
+        self.client = _MemoryClient(table)
+
+
+class MemoryTable:
+    def __init__(self, name="pr-metrics", key="PR_ID", indexes=None, page_items=1000):
+        """indexes maps an index name to (partition key, sort key)"""
+        self.name = self.table_name = name
+        self.key = key
+        self.index_keys = dict(indexes or {})
+        self.page_items = page_items
+        self.meta = _Meta(self)
+        self._items = {}
+        self._index_cache = {}
+        self._segment_cache = {}
+
+    def load(self, items):
+        for item in items:
+            self.put_item(Item=item)
+        return self
+
+    def __len__(self):
+        return len(self._items)
+
+    # --- single-item operations -------------------------------------------------
+    def put_item(self, Item, **kwargs):
+        self._items[Item[self.key]] = {name: _serializer.serialize(value) for name, value in Item.items()}
+        self._invalidate()
+        return {}
+
+    def get_item(self, Key, **kwargs):
+        wire = self._items.get(Key[self.key])
+        return {"Item": self._deserialize(wire, kwargs)} if wire else {}
+
+    def delete_item(self, Key, ReturnValues=None, **kwargs):
+        wire = self._items.pop(Key[self.key], None)
+        self._invalidate()
+        if wire and ReturnValues == "ALL_OLD":
+            return {"Attributes": self._deserialize(wire, {})}
+        return {}
+
+    # --- reads -------------------------------------------------------------------
+    def scan(self, Segment=None, TotalSegments=None, Limit=None, ExclusiveStartKey=None,
+             FilterExpression=None, **kwargs):
+        keys = self._segment_keys(Segment or 0, TotalSegments or 1)
+        position = 0
+        if ExclusiveStartKey:
+            position = self._segment_positions(TotalSegments or 1)[ExclusiveStartKey[self.key]] + 1
+        return self._page(keys, position, Limit, FilterExpression, kwargs,
+                          lambda key: {self.key: key})
+
+    def query(self, KeyConditionExpression, IndexName=None, Limit=None, ExclusiveStartKey=None,
+              FilterExpression=None, **kwargs):
+        """Forward-order query; the base table has no sort key, so it yields at most one item"""
+        if IndexName is None:
+            key = _key_values(KeyConditionExpression, {self.key}).get(self.key)
+            keys = [key] if key in self._items and not ExclusiveStartKey else []
+            position = 0
+        else:
+            partition_key, sort_key = self.index_keys[IndexName]
+            partition = _key_values(KeyConditionExpression, {partition_key}).get(partition_key)
+            entries = self._index(IndexName).get(partition, [])
+            keys = [key for _, key in entries]
+            position = 0
+            if ExclusiveStartKey:
+                position = bisect.bisect_right(entries, (ExclusiveStartKey[sort_key], ExclusiveStartKey[self.key]))
+
+        def last_key(key):
+            last = {self.key: key}
+            if IndexName is not None:
+                wire = self._items[key]
+                for name in self.index_keys[IndexName]:
+                    last[name] = _deserializer.deserialize(wire[name])
+            return last
+
+        condition = KeyConditionExpression if FilterExpression is None else KeyConditionExpression & FilterExpression
+        return self._page(keys, position, Limit, condition, kwargs, last_key)
+
+    # --- internals ---------------------------------------------------------------
+    def _page(self, keys, position, limit, condition, kwargs, last_key):
+        page_size = min(limit or self.page_items, self.page_items)
+        end = min(position + page_size, len(keys))
+        items = []
+        for key in keys[position:end]:
+            wire = self._items[key]
+            if condition is None or evaluate(condition, _LazyItem(wire)):
+                items.append(self._deserialize(wire, kwargs))
+        response = {"Items": items, "Count": len(items), "ScannedCount": end - position}
+        if end < len(keys):
+            response["LastEvaluatedKey"] = last_key(keys[end - 1])
+        return response
+
+    def _deserialize(self, wire, kwargs):
+        projection = kwargs.get("ProjectionExpression")
+        if not projection:
+            return {name: _deserializer.deserialize(value) for name, value in wire.items()}
+        names = kwargs.get("ExpressionAttributeNames", {})
+        wanted = [names.get(part.strip(), part.strip()) for part in projection.split(",")]
+        return {name: _deserializer.deserialize(wire[name]) for name in wanted if name in wire}
+
+    def _invalidate(self):
+        self._index_cache.clear()
+        self._segment_cache.clear()
+
+    def _index(self, name):
+        index = self._index_cache.get(name)
+        if index is None:
+            partition_key, sort_key = self.index_keys[name]
+            index = {}
+            for key, wire in self._items.items():
+                if partition_key in wire and sort_key in wire:
+                    partition = _deserializer.deserialize(wire[partition_key])
+                    index.setdefault(partition, []).append((_deserializer.deserialize(wire[sort_key]), key))
+            for entries in index.values():
+                entries.sort()
+            self._index_cache[name] = index
+        return index
+
+    def _segments(self, total_segments):
+        segments = self._segment_cache.get(total_segments)
+        if segments is None:
+            keys = [[] for _ in range(total_segments)]
+            positions = {}
+            for key in self._items:
+                segment = keys[zlib.crc32(str(key).encode()) % total_segments]
+                positions[key] = len(segment)
+                segment.append(key)
+            segments = self._segment_cache[total_segments] = (keys, positions)
+        return segments
+
+    def _segment_keys(self, segment, total_segments):
+        return self._segments(total_segments)[0][segment]
+
+    def _segment_positions(self, total_segments):
+        return self._segments(total_segments)[1]
@@ -0,0 +1,109 @@
+"""
+Seeded generator of synthetic PR items shaped like the rows the storage service writes.
+Works offline; the same seed always yields the same items.
+"""
+
+import json
+import random
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+
+STATES = ["Open", "Review in Progress", "Changes Requested", "Merged", "Closed"]
+STATE_WEIGHTS = [10, 10, 5, 65, 10]
+BRANCHES = ["develop", "main", "release", "feature"]
+BRANCH_WEIGHTS = [70, 15, 10, 5]
+SQUADS = ["platform", "growth", "payments", "mobile", "data"]
+STACKS = ["Python", "JavaScript", "TypeScript", "Go", "Java"]
+
+
+def iso(moment):
+    return moment.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def epoch(moment):
+    return Decimal(str(round(moment.timestamp(), 3)))
+
+
+def hours(start, end):
+    return Decimal(str(round((end - start).total_seconds() / 3600, 4)))
+
+
+def generate_prs(count, seed=42, start=datetime(2024, 1, 1, tzinfo=timezone.utc), days=365,
+                 repo_count=40, people_count=300, epoch_fields=True, string_encoded=0.0):
+    """
+    epoch_fields=True adds the epoch/duration attributes current ingest writes;
+    False produces legacy rows with ISO timestamps only.
+    string_encoded is the fraction of items whose Reviewers/ChangeRequestors are stored
+    as JSON strings, as some older rows are.
+
+    Squad, TechStack, CreatedMonth and the URL/sender attributes come from a second
+    generator, so adding them did not change the items an existing seed produces.
+    """
+    rng = random.Random(seed)
+    extra_rng = random.Random(seed + 1)
+    repos = [f"service-{i:03d}" for i in range(repo_count)]
+    repo_squads = {repo: extra_rng.choice(SQUADS) for repo in repos}
+    repo_stacks = {repo: extra_rng.choice(STACKS) for repo in repos}
+    people = [f"dev-{i:04d}" for i in range(people_count)]
+    span_minutes = days * 24 * 60
+
+    items = []
+    for index in range(count):
+        repo = rng.choice(repos)
+        created = start + timedelta(minutes=rng.randrange(span_minutes))
+        state = rng.choices(STATES, STATE_WEIGHTS)[0]
+        branch = rng.choices(BRANCHES, BRANCH_WEIGHTS)[0]
+        item = {
+            "PR_ID": f"{repo}_{index}",
+            "PRNumber": Decimal(index),
+            "repository": repo,
+            "Author": rng.choice(people),
+            "State": state,
+            "TargetBranch": branch,
+            "PR_Size": Decimal(int(rng.lognormvariate(4.5, 1.2))),
+            "CreatedDate": iso(created),
+            "ReviewRequestedTime": iso(created),
+            "PR_Iterations": Decimal(rng.choice([0, 0, 0, 1])),
+            "Squad": repo_squads[repo],
+            "TechStack": repo_stacks[repo],
+            "CreatedMonth": iso(created)[:7],
+            "Jira_URL": f"https://jira.example.com/browse/ENG-{index}",
+            "PR_URL": f"https://github.com/example/{repo}/pull/{index}",
+            "sender": item_sender(extra_rng, people),
+            "action": "closed" if state in ("Merged", "Closed") else "opened",
+        }
+        if epoch_fields:
+            item["CreatedEpoch"] = item["ReviewRequestedEpoch"] = epoch(created)
+            item["CreatedDay"] = created.date().isoformat()
+
+        if state != "Open" or rng.random() < 0.3:
+            # Skewed reviewer distribution: a few people do most reviews
+            reviewers = list({people[min(int(rng.paretovariate(1.2)) - 1, people_count - 1)] for _ in range(rng.randint(1, 3))})
+            item["Reviewers"] = reviewers
+            item["FirstReviewer"] = reviewers[0]
+            first_review = created + timedelta(hours=rng.expovariate(1 / 12))
+            item["FirstReviewTime"] = first_review.replace(tzinfo=None).isoformat()
+            if state == "Changes Requested" or rng.random() < 0.2:
+                item["ChangeRequestors"] = [rng.choice(reviewers)]
+            if epoch_fields:
+                item["FirstReviewEpoch"] = epoch(first_review)
+                item["ReviewWaitHours"] = hours(created, first_review)
+
+        if state == "Merged":
+            merged = created + timedelta(hours=rng.expovariate(1 / 48))
+            item["MergedDate"] = iso(merged)
+            if epoch_fields:
+                item["MergedEpoch"] = epoch(merged)
+                item["CreatedToMergeHours"] = hours(created, merged)
+
+        if string_encoded and extra_rng.random() < string_encoded:
+            for name in ("Reviewers", "ChangeRequestors"):
+                if name in item:
+                    item[name] = json.dumps(item[name])
+
+        items.append(item)
+    return items
+
+
+def item_sender(rng, people):
+    return rng.choice(people) if rng.random() < 0.9 else "dependabot[bot]"
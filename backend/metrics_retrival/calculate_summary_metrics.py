@@ -1,5 +1,9 @@
-from datetime import datetime
 from collections import defaultdict
+from pr_times import parse_pr_times, TIME_ATTRIBUTES
+from pr_record import as_record, repo_key, PRRecord, SIZE_FIELDS
+
+# Item attributes calculate_summary_metrics reads; the retrieval layer projects reads to these
+REQUIRED_ATTRIBUTES = ("State", "TargetBranch", "PR_Size", "repository") + TIME_ATTRIBUTES
 
 def format_cycle_time_readable(hours):
     if hours < 24:
@@ -9,85 +13,170 @@ def format_cycle_time_readable(hours):
         remaining_hours = int(hours % 24)
         return f"{days} d {remaining_hours} h"
 
-def calculate_summary_metrics(pr_items):
-    merged_to_develop = [pr for pr in pr_items if pr.get("State", "").lower() == "merged" and pr.get("TargetBranch") == "develop"]
-    merged_to_main = [pr for pr in pr_items if pr.get("State", "").lower() == "merged" and pr.get("TargetBranch") == "main"]
-
-    total_prs = len([pr for pr in pr_items if pr.get("TargetBranch") == "develop"])
-    merged_prs = len(merged_to_develop)
-    avg_pr_size = calculate_average([pr.get("PR_Size", 0) for pr in merged_to_develop])
-    avg_review_time = calculate_average([
-        time_diff_in_hours(pr.get("ReviewRequestedTime"), pr.get("FirstReviewTime"))
-        for pr in merged_to_develop if pr.get("ReviewRequestedTime") and pr.get("FirstReviewTime")
-    ])
-    avg_cycle_time_hours = calculate_average([
-        time_diff_in_hours(pr.get("CreatedDate"), pr.get("MergedDate"))
-        for pr in merged_to_develop if pr.get("CreatedDate") and pr.get("MergedDate")
-    ])
-    pr_to_production = len(merged_to_develop)
-    loc_to_production = sum(pr.get("PR_Size", 0) for pr in merged_to_main)
-
-    # Aggregated PR size and cycle time per repository
-    repo_pr_counts = defaultdict(int)
-    repo_pr_sizes = defaultdict(list)
-    repo_cycle_times = defaultdict(list)
-
-    for pr in merged_to_develop:
-        repo = (pr.get("repository") or "unknown").lower().strip()
-        repo_pr_counts[repo] += 1
-        repo_pr_sizes[repo].append(pr.get("PR_Size", 0))
-
-        start = pr.get("CreatedDate")
-        end = pr.get("MergedDate")
-        if start and end:
-            cycle_hours = time_diff_in_hours(start, end)
-            if cycle_hours > 0:
-                repo_cycle_times[repo].append(cycle_hours)
-
-    avg_pr_size_per_repo = {
-        repo: round(sum(sizes) / len(sizes)) if sizes else 0
-        for repo, sizes in repo_pr_sizes.items()
-    }
-
-    avg_cycle_time_per_repo = {
-        repo: round(sum(cycles) / len(cycles), 2) if cycles else 0
-        for repo, cycles in repo_cycle_times.items()
-    }
-
-    repo_summary = {}
-    for repo in sorted(repo_pr_counts):
-        repo_summary[repo] = {
-            "avg_pr_size": avg_pr_size_per_repo.get(repo, 0),
-            "pr_count": repo_pr_counts.get(repo, 0),
-            "avg_cycle_time": avg_cycle_time_per_repo.get(repo, 0)
+class SummaryAccumulator:
+    """Running totals behind calculate_summary_metrics, fed one PR at a time"""
+
+    def __init__(self):
+        self.total_prs = 0
+        self.merged_prs = 0
+        self.pr_size_sum = 0.0
+        self.pr_size_count = 0
+        self.review_time_sum = 0.0
+        self.review_time_count = 0
+        self.cycle_time_sum = 0.0
+        self.cycle_time_count = 0
+        self.loc_to_production = 0
+
+        # Aggregated PR size and cycle time per repository
+        self.repo_pr_counts = defaultdict(int)
+        self.repo_pr_size_sums = defaultdict(int)
+        self.repo_cycle_time_sums = defaultdict(float)
+        self.repo_cycle_time_counts = defaultdict(int)
+
+    def add(self, pr):
+        """
+        Fold in one PR item or PRRecord. Items are read directly: decoding one into a
+        record costs more than a single pass saves, so records only pay off when
+        several aggregators share them (the dashboard).
+        """
+        is_record = type(pr) is PRRecord
+        if is_record:
+            branch, merged = pr.branch, pr.state_lower == "merged"
+        else:
+            branch, merged = pr.get("TargetBranch"), (pr.get("State") or "").lower() == "merged"
+        if branch == "develop":
+            self.total_prs += 1
+        if not merged or branch not in ("main", "develop"):
+            return
+
+        size = as_record(pr, SIZE_FIELDS).pr_size if is_record else pr.get("PR_Size", 0)
+        if branch == "main":
+            self.loc_to_production += size
+            return
+
+        self.merged_prs += 1
+
+        positive_size = positive_float(size)
+        if positive_size:
+            self.pr_size_sum += positive_size
+            self.pr_size_count += 1
+
+        if is_record:
+            review_hours, cycle_hours, repo = pr.review_wait_hours, pr.created_to_merge_hours, pr.repo_key
+        else:
+            times = parse_pr_times(pr)
+            review_hours, cycle_hours, repo = times["review_wait_hours"], times["created_to_merge_hours"], repo_key(pr.get("repository"))
+
+        review_hours = review_hours or 0
+        if review_hours > 0:
+            self.review_time_sum += review_hours
+            self.review_time_count += 1
+
+        cycle_hours = cycle_hours or 0
+        if cycle_hours > 0:
+            self.cycle_time_sum += cycle_hours
+            self.cycle_time_count += 1
+
+        self.repo_pr_counts[repo] += 1
+        self.repo_pr_size_sums[repo] += size
+        if cycle_hours > 0:
+            self.repo_cycle_time_sums[repo] += cycle_hours
+            self.repo_cycle_time_counts[repo] += 1
+
+    def add_rollup(self, row):
+        """Fold in one pre-aggregated day/repo/branch rollup row written by the storage service"""
+        if row.get("RollupKey", "").startswith("@"):
+            return  # per-reviewer rows share the table
+        branch = row.get("TargetBranch")
+        if branch == "develop":
+            self.total_prs += int(row.get("pr_count", 0))
+
+        merged_count = int(row.get("merged_count", 0))
+        if not merged_count:
+            return
+        if branch == "main":
+            self.loc_to_production += row.get("merged_size_sum", 0)
+            return
+        if branch != "develop":
+            return
+
+        self.merged_prs += merged_count
+        self.pr_size_sum += float(row.get("merged_size_pos_sum", 0))
+        self.pr_size_count += int(row.get("merged_size_pos_count", 0))
+        self.review_time_sum += float(row.get("review_time_sum", 0))
+        self.review_time_count += int(row.get("review_time_count", 0))
+        self.cycle_time_sum += float(row.get("cycle_time_sum", 0))
+        self.cycle_time_count += int(row.get("cycle_time_count", 0))
+
+        repo = row.get("repository") or "unknown"
+        self.repo_pr_counts[repo] += merged_count
+        self.repo_pr_size_sums[repo] += row.get("merged_size_sum", 0)
+        if int(row.get("cycle_time_count", 0)):
+            self.repo_cycle_time_sums[repo] += float(row.get("cycle_time_sum", 0))
+            self.repo_cycle_time_counts[repo] += int(row.get("cycle_time_count", 0))
+
+    def merge(self, other):
+        """Fold in another accumulator's totals (e.g. a cached per-day partial); other is left unchanged"""
+        self.total_prs += other.total_prs
+        self.merged_prs += other.merged_prs
+        self.pr_size_sum += other.pr_size_sum
+        self.pr_size_count += other.pr_size_count
+        self.review_time_sum += other.review_time_sum
+        self.review_time_count += other.review_time_count
+        self.cycle_time_sum += other.cycle_time_sum
+        self.cycle_time_count += other.cycle_time_count
+        self.loc_to_production += other.loc_to_production
+        for totals, other_totals in (
+            (self.repo_pr_counts, other.repo_pr_counts),
+            (self.repo_pr_size_sums, other.repo_pr_size_sums),
+            (self.repo_cycle_time_sums, other.repo_cycle_time_sums),
+            (self.repo_cycle_time_counts, other.repo_cycle_time_counts),
+        ):
+            for repo, value in other_totals.items():
+                totals[repo] += value
+
+    def result(self):
+        avg_pr_size = self.pr_size_sum / self.pr_size_count if self.pr_size_count else 0
+        avg_review_time = self.review_time_sum / self.review_time_count if self.review_time_count else 0
+        avg_cycle_time_hours = self.cycle_time_sum / self.cycle_time_count if self.cycle_time_count else 0
+
+        repo_summary = {}
+        for repo in sorted(self.repo_pr_counts):
+            pr_count = self.repo_pr_counts[repo]
+            cycle_count = self.repo_cycle_time_counts.get(repo, 0)
+            repo_summary[repo] = {
+                "avg_pr_size": round(self.repo_pr_size_sums[repo] / pr_count),
+                "pr_count": pr_count,
+                "avg_cycle_time": round(self.repo_cycle_time_sums[repo] / cycle_count, 2) if cycle_count else 0
+            }
+
+        return {
+            "total_prs": self.total_prs,
+            "merged_prs": self.merged_prs,
+            "avg_pr_size": round(avg_pr_size),
+            "avg_review_time": format_cycle_time_readable(avg_review_time),
+            "avg_cycle_time": format_cycle_time_readable(avg_cycle_time_hours),
+            "pr_to_prod": self.merged_prs,
+            "loc_to_prod": self.loc_to_production,
+            "repo_summary": repo_summary
         }
 
-    return {
-        "total_prs": total_prs,
-        "merged_prs": merged_prs,
-        "avg_pr_size": round(avg_pr_size),
-        "avg_review_time": format_cycle_time_readable(avg_review_time),
-        "avg_cycle_time": format_cycle_time_readable(avg_cycle_time_hours),
-        "pr_to_prod": pr_to_production,
-        "loc_to_prod": loc_to_production,
-        "repo_summary": repo_summary
-    }
-
-def calculate_average(numbers):
-    valid = []
-    for n in numbers:
-        try:
-            val = float(n)
-            if val > 0:
-                valid.append(val)
-        except (TypeError, ValueError):
-            continue
-    return sum(valid) / len(valid) if valid else 0
-
-def time_diff_in_hours(start_iso, end_iso):
+def calculate_summary_metrics(pr_items):
+    summary = SummaryAccumulator()
+    for pr in pr_items:
+        summary.add(pr)
+    return summary.result()
+
+def calculate_summary_from_rollups(rollup_rows):
+    """Same output as calculate_summary_metrics, built from O(days x repos) rollup rows"""
+    summary = SummaryAccumulator()
+    for row in rollup_rows:
+        summary.add_rollup(row)
+    return summary.result()
+
+def positive_float(value):
     try:
-        start = datetime.fromisoformat(start_iso.replace("Z", ""))
-        end = datetime.fromisoformat(end_iso.replace("Z", ""))
-        return (end - start).total_seconds() / 3600.0
-    except:
+        val = float(value)
+    except (TypeError, ValueError):
         return 0
+    return val if val > 0 else 0
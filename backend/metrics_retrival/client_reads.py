@@ -0,0 +1,116 @@
+"""
+Helper Module: client_reads.py
+Read path on the low-level DynamoDB client instead of the boto3 resource.
+
+The resource deserializes every number into a Decimal (through a per-value type
+dispatch and a Decimal context), and response() later converts each Decimal back in
+a Python callback. ClientTable sends the same query/scan requests through a plain
+boto3.client("dynamodb") and decodes the raw attribute values itself:
+- N becomes an int when whole and a float otherwise (what decimal_default emits)
+- S, BOOL, NULL, L and M map to str, bool, None, list and dict
+- SS/NS/BS become sets, as with the resource; B is returned as bytes
+
+Key/Attr conditions, ProjectionExpression placeholders and ExclusiveStartKey are
+accepted exactly as Table.query/scan take them, so the query planner, the parallel
+scan and cursor paging work unchanged. Every other attribute is the wrapped Table's.
+The client must not be the resource's meta.client: boto3 registers its own value
+(de)serialization on that one.
+"""
+
+from decimal import Decimal
+from boto3.dynamodb.conditions import ConditionExpressionBuilder
+from boto3.dynamodb.types import TypeSerializer
+
+_serializer = TypeSerializer()
+
+# Largest integer a float represents exactly; bigger whole numbers are parsed as Decimal
+_EXACT_FLOAT_INT = 2 ** 53
+
+
+def decode_number(text):
+    """int for whole numbers, float otherwise"""
+    if "." not in text and "e" not in text and "E" not in text:
+        return int(text)
+    number = float(text)
+    if number.is_integer():
+        return int(number) if abs(number) < _EXACT_FLOAT_INT else int(Decimal(text))
+    return number
+
+
+def decode_value(value):
+    """Native Python value for one DynamoDB attribute value ({"S": ...}, {"N": ...}, ...)"""
+    if "S" in value:
+        return value["S"]
+    if "N" in value:
+        return decode_number(value["N"])
+    if "BOOL" in value:
+        return value["BOOL"]
+    if "NULL" in value:
+        return None
+    if "M" in value:
+        return decode_item(value["M"])
+    if "L" in value:
+        return [decode_value(element) for element in value["L"]]
+    if "SS" in value:
+        return set(value["SS"])
+    if "NS" in value:
+        return {decode_number(number) for number in value["NS"]}
+    if "B" in value:
+        return bytes(value["B"])
+    if "BS" in value:
+        return {bytes(element) for element in value["BS"]}
+    raise TypeError(f"Unknown DynamoDB attribute value type: {sorted(value)}")
+
+
+def decode_item(item):
+    return {name: decode_value(value) for name, value in item.items()}
+
+
+def build_request(table_name, kwargs):
+    """Client request for Table.query/scan kwargs: conditions built, values and start key serialized"""
+    params = dict(kwargs, TableName=table_name)
+    names = dict(params.get("ExpressionAttributeNames") or {})
+    values = dict(params.get("ExpressionAttributeValues") or {})
+    builder = ConditionExpressionBuilder()
+    for key, is_key_condition in (("KeyConditionExpression", True), ("FilterExpression", False)):
+        condition = params.get(key)
+        if condition is not None and not isinstance(condition, str):
+            expression = builder.build_expression(condition, is_key_condition=is_key_condition)
+            params[key] = expression.condition_expression
+            names.update(expression.attribute_name_placeholders)
+            values.update(expression.attribute_value_placeholders)
+    if names:
+        params["ExpressionAttributeNames"] = names
+    if values:
+        params["ExpressionAttributeValues"] = {name: _serializer.serialize(value) for name, value in values.items()}
+    if params.get("ExclusiveStartKey"):
+        params["ExclusiveStartKey"] = {name: _serializer.serialize(value) for name, value in params["ExclusiveStartKey"].items()}
+    return params
+
+
+def decode_response(response):
+    """A client query/scan response in resource form, with native numbers"""
+    decoded = dict(response)
+    if "Items" in response:
+        decoded["Items"] = [decode_item(item) for item in response["Items"]]
+    if response.get("LastEvaluatedKey"):
+        decoded["LastEvaluatedKey"] = decode_item(response["LastEvaluatedKey"])
+    return decoded
+
+
+class ClientTable:
+    """Proxy for a boto3 Table whose query and scan go through the low-level client"""
+
+    def __init__(self, table, client):
+        self._table = table
+        self._client = client
+        self.name = table.name
+
+    def query(self, **kwargs):
+        return decode_response(self._client.query(**build_request(self.name, kwargs)))
+
+    def scan(self, **kwargs):
+        return decode_response(self._client.scan(**build_request(self.name, kwargs)))
+
+    def __getattr__(self, name):
+        return getattr(self._table, name)
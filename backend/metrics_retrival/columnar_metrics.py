@@ -0,0 +1,342 @@
+"""
+Helper Module: columnar_metrics.py
+Optional NumPy engine for the summary and contributor metrics.
+
+Scanned items are converted once into typed columns (categorical codes for repo,
+author, state, branch and day, float64 epochs/durations, sizes) and every average,
+group-by, daily bucket and top-k leaderboard is computed with vectorized ops.
+Output matches calculate_summary_metrics / calculate_contributor_metrics.
+
+NumPy is not required by the Lambda; when it is missing numpy_available() is False
+and callers stay on the pure-Python aggregators.
+"""
+
+import json
+import logging
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from calculate_summary_metrics import format_cycle_time_readable, REQUIRED_ATTRIBUTES as SUMMARY_ATTRIBUTES
+from contributor_metrics import logger, REQUIRED_ATTRIBUTES as CONTRIBUTOR_ATTRIBUTES
+from pr_record import reviewer_names, change_requestor_names
+from pr_times import parse_pr_times, epoch_to_day, SECONDS_PER_DAY
+from time_buckets import bucket_start
+
+LEADERBOARD_SIZE = 5
+
+# PRColumns reads the same attributes as both Python aggregators plus Squad for squad masks
+REQUIRED_ATTRIBUTES = tuple(dict.fromkeys(SUMMARY_ATTRIBUTES + CONTRIBUTOR_ATTRIBUTES + ("Squad",)))
+
+
+def numpy_available():
+    return np is not None
+
+
+class Interner:
+    """Assigns dense integer codes to categorical values in first-seen order"""
+
+    def __init__(self):
+        self.codes = {}
+        self.values = []
+
+    def code(self, value):
+        code = self.codes.get(value)
+        if code is None:
+            code = len(self.values)
+            self.codes[value] = code
+            self.values.append(value)
+        return code
+
+    def lookup(self, value):
+        return self.codes.get(value, -2)
+
+
+def _number(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return float("nan")
+
+
+class PRColumns:
+    """Typed column arrays for a list of PR items"""
+
+    def __init__(self, items):
+        self.raw_repos = Interner()      # contributor repo key: repository as stored
+        self.authors = Interner()
+        self.raw_states = Interner()
+        self.branches = Interner()       # TargetBranch as stored
+        self.people = Interner()         # reviewers and change requestors
+        self.squads = Interner()
+
+        raw_repo, author, raw_state, branch, squad, size = [], [], [], [], [], []
+        has_created, created_epoch, requested_epoch = [], [], []
+        has_review_strings, review_wait, created_to_merge = [], [], []
+        first_reviewer = []
+        reviewer_pr, reviewer_code, changer_pr, changer_code = [], [], [], []
+        nan = float("nan")
+        repo_code, author_code, state_code = self.raw_repos.code, self.authors.code, self.raw_states.code
+        branch_code, squad_code, person_code = self.branches.code, self.squads.code, self.people.code
+
+        # One Python pass collects raw codes and numbers; everything else is derived per distinct value
+        for index, pr in enumerate(items):
+            get = pr.get
+            times = parse_pr_times(pr)
+            repository = get("repository")
+            raw_repo.append(repo_code("UnknownRepo" if repository is None else repository))
+            author.append(author_code(get("Author")))
+            raw_state.append(state_code(get("State", "")))
+            branch.append(branch_code(get("TargetBranch")))
+            squad.append(squad_code(get("Squad")))
+            size.append(_number(get("PR_Size", 0)))
+
+            has_created.append(bool(get("CreatedDate")))
+            created = times["CreatedDate"]
+            created_epoch.append(nan if created is None else created)
+            requested = times["ReviewRequestedTime"]
+            requested_epoch.append(nan if requested is None else requested)
+            has_review_strings.append(bool(get("ReviewRequestedTime") and get("FirstReviewTime")))
+            wait = times["review_wait_hours"]
+            review_wait.append(nan if wait is None else wait)
+            merge_hours = times["created_to_merge_hours"]
+            created_to_merge.append(nan if merge_hours is None else merge_hours)
+
+            reviewers = reviewer_names(pr)
+            for name in reviewers:
+                reviewer_pr.append(index)
+                reviewer_code.append(person_code(name))
+            # A null FirstReviewer falls back to the first listed reviewer, as in the Python engine
+            first = (get("FirstReviewer") or reviewers[0]) if reviewers else None
+            first_reviewer.append(person_code(first) if first else -1)
+            for name in change_requestor_names(pr):
+                changer_pr.append(index)
+                changer_code.append(person_code(name))
+
+        self.count = len(raw_repo)
+        self.raw_repo = np.array(raw_repo, dtype=np.int32)
+        self.author = np.array(author, dtype=np.int32)
+        self.branch = np.array(branch, dtype=np.int32)
+        self.squad = np.array(squad, dtype=np.int32)
+        self.size = np.array(size, dtype=np.float64)
+        self.has_created = np.array(has_created, dtype=bool)
+        self.has_review_strings = np.array(has_review_strings, dtype=bool)
+        self.review_wait = np.array(review_wait, dtype=np.float64)
+        self.created_to_merge = np.array(created_to_merge, dtype=np.float64)
+        self.first_reviewer = np.array(first_reviewer, dtype=np.int32)
+        self.reviewer_pr = np.array(reviewer_pr, dtype=np.int64)
+        self.reviewer_code = np.array(reviewer_code, dtype=np.int32)
+        self.changer_pr = np.array(changer_pr, dtype=np.int64)
+        self.changer_code = np.array(changer_code, dtype=np.int32)
+        self.reviewers_per_pr = np.bincount(self.reviewer_pr, minlength=self.count)
+
+        # Summary repo key: lower-cased, stripped, "unknown" when missing
+        self.repos, self.repo = _recode(self.raw_repos, self.raw_repo, lambda repo: (repo or "unknown").lower().strip())
+        # Lower-cased State
+        self.states, self.state = _recode(self.raw_states, np.array(raw_state, dtype=np.int32), lambda state: (state or "").lower())
+        self.has_author = np.array([bool(name) for name in self.authors.values], dtype=bool)[self.author]
+        self.to_develop_ci = np.array(
+            [(name or "").lower() == "develop" for name in self.branches.values], dtype=bool
+        )[self.branch]
+
+        # Calendar days (UTC) shared by the created-volume and review-speed buckets
+        created_days = np.floor(np.array(created_epoch, dtype=np.float64) / SECONDS_PER_DAY)
+        review_days = np.floor(np.array(requested_epoch, dtype=np.float64) / SECONDS_PER_DAY)
+        valid_created, valid_review = ~np.isnan(created_days), ~np.isnan(review_days)
+        day_numbers = np.unique(np.concatenate([created_days[valid_created], review_days[valid_review]])).astype(np.int64)
+        self.days = Interner()
+        for day_number in day_numbers:
+            self.days.code(epoch_to_day(int(day_number) * SECONDS_PER_DAY))
+        self.created_day = np.full(self.count, -1, dtype=np.int32)
+        self.created_day[valid_created] = np.searchsorted(day_numbers, created_days[valid_created])
+        self.review_day = np.full(self.count, -1, dtype=np.int32)
+        self.review_day[valid_review] = np.searchsorted(day_numbers, review_days[valid_review])
+
+
+def _recode(source, codes, normalize):
+    """Map codes of source onto a new Interner of normalize(value)"""
+    target = Interner()
+    mapping = np.array([target.code(normalize(value)) for value in source.values], dtype=np.int32)
+    return target, mapping[codes] if len(codes) else codes
+
+
+def _top_k(names, values, descending, k=LEADERBOARD_SIZE):
+    """Indices of the top-k values, ties broken by name (as the pure-Python aggregators do)"""
+    if len(values) == 0:
+        return []
+    name_rank = np.argsort(np.argsort(np.array(names, dtype=object)))
+    order = np.lexsort((name_rank, -values if descending else values))
+    return order[:k]
+
+
+def _leaderboard(interner, counts, label, descending=True, cast=int, mask=None):
+    present = np.flatnonzero(counts > 0 if mask is None else mask)
+    names = [interner.values[i] for i in present]
+    top = _top_k(names, counts[present], descending)
+    return [{"name": names[i], label: cast(counts[present][i])} for i in top]
+
+
+def summary_from_columns(cols):
+    merged = cols.state == cols.states.lookup("merged")
+    to_develop = cols.branch == cols.branches.lookup("develop")
+    to_main = cols.branch == cols.branches.lookup("main")
+    merged_to_develop = merged & to_develop
+
+    sizes = cols.size[merged_to_develop]
+    positive_sizes = sizes[sizes > 0]
+    review_hours = cols.review_wait[merged_to_develop]
+    review_hours = review_hours[review_hours > 0]
+    cycle_hours = cols.created_to_merge[merged_to_develop]
+    positive_cycles = cycle_hours > 0
+
+    avg_pr_size = float(positive_sizes.mean()) if len(positive_sizes) else 0
+    avg_review_time = float(review_hours.mean()) if len(review_hours) else 0
+    avg_cycle_time_hours = float(cycle_hours[positive_cycles].mean()) if positive_cycles.any() else 0
+    loc_to_production = float(np.nansum(cols.size[merged & to_main]))
+
+    repo_count = len(cols.repos.values)
+    repo_codes = cols.repo[merged_to_develop]
+    repo_pr_counts = np.bincount(repo_codes, minlength=repo_count)
+    repo_size_sums = np.bincount(repo_codes, weights=sizes, minlength=repo_count)
+    repo_cycle_sums = np.bincount(repo_codes[positive_cycles], weights=cycle_hours[positive_cycles], minlength=repo_count)
+    repo_cycle_counts = np.bincount(repo_codes[positive_cycles], minlength=repo_count)
+
+    repo_summary = {}
+    for code in sorted(np.flatnonzero(repo_pr_counts), key=lambda c: cols.repos.values[c]):
+        pr_count = int(repo_pr_counts[code])
+        cycle_count = int(repo_cycle_counts[code])
+        repo_summary[cols.repos.values[code]] = {
+            "avg_pr_size": round(float(repo_size_sums[code]) / pr_count),
+            "pr_count": pr_count,
+            "avg_cycle_time": round(float(repo_cycle_sums[code]) / cycle_count, 2) if cycle_count else 0
+        }
+
+    merged_prs = int(merged_to_develop.sum())
+    return {
+        "total_prs": int(to_develop.sum()),
+        "merged_prs": merged_prs,
+        "avg_pr_size": round(avg_pr_size),
+        "avg_review_time": format_cycle_time_readable(avg_review_time),
+        "avg_cycle_time": format_cycle_time_readable(avg_cycle_time_hours),
+        "pr_to_prod": merged_prs,
+        "loc_to_prod": int(loc_to_production) if loc_to_production.is_integer() else loc_to_production,
+        "repo_summary": repo_summary
+    }
+
+
+def contributors_from_columns(cols, mask=None, granularity="day"):
+    """Contributor metrics over the PRs selected by mask (all PRs when mask is None)"""
+    if mask is None:
+        mask = np.ones(cols.count, dtype=bool)
+    item_count = int(mask.sum())
+    people_count = len(cols.people.values)
+    # Chart bucket of every distinct day
+    buckets = Interner()
+    day_bucket = np.array([buckets.code(bucket_start(day, granularity)) for day in cols.days.values], dtype=np.int32)
+    bucket_count = len(buckets.values)
+
+    # Reviewer membership rows belonging to selected PRs
+    reviewer_rows = mask[cols.reviewer_pr]
+    reviewer_codes = cols.reviewer_code[reviewer_rows]
+    reviewer_prs = cols.reviewer_pr[reviewer_rows]
+    reviews = np.bincount(reviewer_codes, minlength=people_count)
+
+    repo_pairs = np.unique(reviewer_codes.astype(np.int64) * max(1, len(cols.raw_repos.values)) + cols.raw_repo[reviewer_prs])
+    unique_repos = np.bincount(repo_pairs // max(1, len(cols.raw_repos.values)), minlength=people_count)
+
+    flagged = np.bincount(cols.changer_code[mask[cols.changer_pr]], minlength=people_count)
+
+    merged = cols.state == cols.states.lookup("merged")
+    delivered_mask = mask & merged & cols.to_develop_ci & cols.has_author
+    delivered = np.bincount(cols.author[delivered_mask], minlength=len(cols.authors.values))
+
+    has_reviewers = cols.reviewers_per_pr > 0
+    timed = (
+        mask
+        & (cols.state != cols.states.lookup("open"))
+        & cols.has_review_strings
+        & has_reviewers
+        & (cols.review_wait >= 0)
+        & (cols.first_reviewer >= 0)
+        & (cols.review_day >= 0)
+    )
+    inverted = mask & cols.has_review_strings & has_reviewers & (cols.review_wait < 0)
+    if inverted.any():
+        logger.warning(f"[WARN] {int(inverted.sum())} PRs have FirstReviewTime earlier than ReviewRequestedTime")
+    response_sums = np.bincount(cols.first_reviewer[timed], weights=cols.review_wait[timed], minlength=people_count)
+    response_counts = np.bincount(cols.first_reviewer[timed], minlength=people_count)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        response_avgs = np.round(response_sums / response_counts, 2)
+
+    volume_mask = mask & cols.has_created & (cols.created_day >= 0)
+    bucket_volume = np.bincount(day_bucket[cols.created_day[volume_mask]], minlength=bucket_count)
+    speed_sums = np.bincount(day_bucket[cols.review_day[timed]], weights=cols.review_wait[timed], minlength=bucket_count)
+    speed_counts = np.bincount(day_bucket[cols.review_day[timed]], minlength=bucket_count)
+
+    chart_buckets = np.flatnonzero((bucket_volume > 0) | (speed_counts > 0))
+    chart = [
+        {
+            "date": buckets.values[bucket],
+            "pr_volume": int(bucket_volume[bucket]),
+            "avg_review_time_hrs": round(float(speed_sums[bucket]) / int(speed_counts[bucket]), 2) if speed_counts[bucket] else 0.0
+        }
+        for bucket in sorted(chart_buckets, key=lambda b: buckets.values[b])
+    ]
+
+    reviewer_names = sorted(cols.people.values[code] for code in np.flatnonzero(reviews))
+    total_reviewer_count = int(cols.reviewers_per_pr[mask].sum())
+    total_reviewed_prs = int((has_reviewers & mask).sum())
+
+    result = {
+        "impactful_contributors": _leaderboard(cols.authors, delivered, "prs_delivered"),
+        "new_reviewers": reviewer_names[:3],
+        "code_quality_champions": _leaderboard(cols.people, flagged, "prs_flagged"),
+        "fastest_reviewers": _leaderboard(
+            cols.people, response_avgs, "avg_response_time_hrs",
+            descending=False, cast=float, mask=response_counts > 0
+        ),
+        "cross_repo_champions": _leaderboard(cols.people, unique_repos, "unique_repos_reviewed", mask=unique_repos > 1),
+        "top_reviewers": _leaderboard(cols.people, reviews, "reviews"),
+        "total_reviewers": len(reviewer_names),
+        "review_coverage": round((total_reviewed_prs / item_count) * 100, 1) if item_count else 0.0,
+        "avg_reviewers_per_pr": int(round(total_reviewer_count / item_count)) if item_count else 0,
+        "review_speed_chart": chart,
+        "review_speed_granularity": granularity
+    }
+
+    if logger.isEnabledFor(logging.INFO):
+        logger.info("[Contributor Metrics Result] %s", json.dumps(result, indent=2))
+        logger.info("[Unique Reviewer List] %s", reviewer_names)
+    return result
+
+
+def squad_mask(cols, squad):
+    """Rows whose Squad equals squad (all rows when squad is empty)"""
+    if not squad:
+        return None
+    return cols.squad == cols.squads.lookup(squad)
+
+
+def calculate_summary_metrics_columnar(items):
+    return summary_from_columns(PRColumns(items))
+
+
+def calculate_contributor_metrics_columnar(items, granularity="day"):
+    return contributors_from_columns(PRColumns(items), granularity=granularity)
+
+
+def calculate_dashboard_metrics_columnar(items, squad=None, stack=None, table_limit=None, granularity="day"):
+    """Columnar counterpart of dashboard_metrics.calculate_dashboard_metrics"""
+    cols = PRColumns(items)
+    result = {
+        "summary": summary_from_columns(cols),
+        "contributors": contributors_from_columns(cols, squad_mask(cols, squad), granularity)
+    }
+    if table_limit:
+        result["table"] = [
+            pr for pr in items
+            if (not squad or pr.get("Squad") == squad) and (not stack or pr.get("TechStack") == stack)
+        ][:table_limit]
+    return result
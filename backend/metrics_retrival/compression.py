@@ -0,0 +1,61 @@
+"""
+Helper Module: compression.py
+Compresses response bodies for clients that send Accept-Encoding.
+
+Brotli is used when the optional brotli package is installed and the client accepts
+"br"; otherwise gzip. Bodies below COMPRESSION_MIN_BYTES are sent as-is.
+"""
+
+import os
+import gzip
+import base64
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSION_MIN_BYTES = int(os.environ.get("COMPRESSION_MIN_BYTES", "1024"))
+GZIP_LEVEL = int(os.environ.get("GZIP_LEVEL", "6"))
+
+
+def accepted_encodings(accept_encoding):
+    """Encodings the client accepts (q=0 excluded)"""
+    accepted = set()
+    for part in (accept_encoding or "").split(","):
+        name, _, params = part.strip().partition(";")
+        if not name:
+            continue
+        q = params.strip()
+        if q.startswith("q="):
+            try:
+                if float(q[2:]) == 0:
+                    continue
+            except ValueError:
+                continue
+        accepted.add(name.strip().lower())
+    return accepted
+
+
+def compress_response(result, accept_encoding):
+    """Return result with a compressed, base64-encoded body when worthwhile"""
+    body = result.get("body")
+    if not body or result.get("isBase64Encoded") or len(body) < COMPRESSION_MIN_BYTES:
+        return result
+
+    accepted = accepted_encodings(accept_encoding)
+    if brotli is not None and ("br" in accepted or "*" in accepted):
+        encoding, data = "br", brotli.compress(body.encode())
+    elif "gzip" in accepted or "*" in accepted:
+        encoding, data = "gzip", gzip.compress(body.encode(), compresslevel=GZIP_LEVEL)
+    else:
+        return result
+
+    headers = dict(result.get("headers", {}))
+    headers["Content-Encoding"] = encoding
+    headers["Vary"] = "Accept-Encoding"
+    # The ETag describes the uncompressed body, so the encoded variant only matches weakly
+    etag = headers.get("ETag")
+    if etag and not etag.startswith("W/"):
+        headers["ETag"] = f"W/{etag}"
+    return dict(result, body=base64.b64encode(data).decode(), headers=headers, isBase64Encoded=True)
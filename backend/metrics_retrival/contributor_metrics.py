@@ -4,167 +4,230 @@ Updated: Adds time-series PR volume and review speed tracking,
 makes 'state' check case-insensitive, removes 'DeployedToProd',
 and properly computes cross-repo and fastest reviewers using correct field names.
 Adds logging of final return payload and prints list of reviewers.
+Aggregation runs through ContributorAccumulator so other endpoints can feed it in a shared pass.
+review_speed_chart is bucketed by day, week or month with running sums and counts per bucket.
+A PRRecord is read when one is passed in (the dashboard decodes each PR once for all blocks).
+Accumulators merge, so per-day partials can be combined for any range (day_partials.py).
 """
 
-from datetime import datetime
+import os
 import json
 import logging
 from collections import defaultdict
-
-# Configure logger
-logger = logging.getLogger()
-logger.setLevel(logging.INFO)
-
-def calculate_contributor_metrics(items):
-    reviewer_stats = {}
-    total_iterations = 0
-    impactful_contributors = {}
-    code_quality_champions = {}
-    review_response_times = {}
-    reviewer_first_seen = set()
-    reviewer_repo_map = {}
-    new_reviewers = set()
-    total_reviewed_prs = 0
-    total_reviewer_count = 0
-    daily_volume = defaultdict(int)
-    daily_review_speed = defaultdict(list)
-
-    for pr in items:
-        pr_id = pr.get("PR_ID", "Unknown")
-        repo = pr.get("repository", "UnknownRepo")
-        author = pr.get("Author")
-        state = pr.get("State", "").lower()
-        branch = pr.get("TargetBranch", "").lower()
-        created = pr.get("CreatedDate")
-        review_requested = pr.get("ReviewRequestedTime")
-        first_reviewed = pr.get("FirstReviewTime")
-
-        if created:
+from pr_times import parse_pr_times, epoch_to_day, TIME_ATTRIBUTES
+from pr_record import as_record, lowered, reviewer_names, change_requestor_names, PRRecord, REVIEW_FIELDS, CONTRIBUTOR_FIELDS
+from time_buckets import bucket_start
+
+# Item attributes calculate_contributor_metrics reads; the retrieval layer projects reads to these
+REQUIRED_ATTRIBUTES = (
+    "PR_ID", "repository", "Author", "State", "TargetBranch", "PR_Iterations",
+    "Reviewers", "ReviewerSet", "FirstReviewer", "ChangeRequestors", "ChangeRequestorSet",
+) + TIME_ATTRIBUTES
+
+# Module logger; configuring the root logger here changed the level of every library's logging
+logger = logging.getLogger(__name__)
+logger.setLevel(os.environ.get("LOG_LEVEL", "INFO").upper())
+
+class ContributorAccumulator:
+    """Running reviewer/contributor state behind calculate_contributor_metrics, fed one PR at a time"""
+
+    def __init__(self, granularity="day"):
+        self.granularity = granularity
+        self.item_count = 0
+        self.reviewer_stats = {}
+        self.total_iterations = 0
+        self.impactful_contributors = {}
+        self.code_quality_champions = {}
+        self.review_response_times = {}
+        self.reviewer_repo_map = {}
+        self.new_reviewers = set()
+        self.total_reviewed_prs = 0
+        self.total_reviewer_count = 0
+        self.bucket_volume = defaultdict(int)
+        self.bucket_review_sums = defaultdict(float)
+        self.bucket_review_counts = defaultdict(int)
+
+    def add(self, pr):
+        """Fold in one PR item or PRRecord; items are read directly, without building a record"""
+        if type(pr) is PRRecord:
+            record = as_record(pr, REVIEW_FIELDS | CONTRIBUTOR_FIELDS)
+            pr_id, repo, author = record.pr_id, record.repository, record.author
+            state, branch = record.state_lower, record.branch_lower
+            has_created_date, created_day = record.has_created_date, record.created_day
+            has_review_times, requested, delta = record.has_review_times, record.review_requested, record.review_wait_hours
+            iterations, reviewers, first_reviewer = record.iterations, record.reviewers, record.first_reviewer
+            change_requestors = record.change_requestors
+        else:
+            times = parse_pr_times(pr)
+            get = pr.get
+            pr_id, repo, author = get("PR_ID", "Unknown"), get("repository"), get("Author")
+            state, branch = lowered(get("State")), lowered(get("TargetBranch"))
+            has_created_date, created_day = bool(get("CreatedDate")), times["created_day"]
+            has_review_times = bool(get("ReviewRequestedTime")) and bool(get("FirstReviewTime"))
+            requested, delta = times["ReviewRequestedTime"], times["review_wait_hours"]
             try:
-                created_day = datetime.fromisoformat(created.replace("Z", "")).date().isoformat()
-                daily_volume[created_day] += 1
-            except Exception as e:
-                logger.warning(f"[WARN] PR_ID={pr_id} - failed to parse CreatedDate: {e}")
+                iterations = int(get("PR_Iterations", 0))
+            except Exception:
+                iterations = 0
+            reviewers, first_reviewer = reviewer_names(pr), get("FirstReviewer")
+            change_requestors = change_requestor_names(pr)
+        if repo is None:
+            repo = "UnknownRepo"
+        self.item_count += 1
+
+        if has_created_date:
+            if created_day:
+                self.bucket_volume[bucket_start(created_day, self.granularity)] += 1
+            else:
+                logger.warning(f"[WARN] PR_ID={pr_id} - failed to parse CreatedDate")
 
         if author and state == "merged" and branch == "develop":
-            impactful_contributors[author] = impactful_contributors.get(author, 0) + 1
+            self.impactful_contributors[author] = self.impactful_contributors.get(author, 0) + 1
 
-        try:
-            iterations = int(pr.get("PR_Iterations", 0))
-        except Exception:
-            iterations = 0
-        total_iterations += iterations
+        self.total_iterations += iterations
 
-        reviewers = pr.get("Reviewers", [])
-        if isinstance(reviewers, str):
-            try:
-                reviewers = json.loads(reviewers)
-            except:
-                reviewers = []
-
-        total_reviewer_count += len(reviewers)
+        self.total_reviewer_count += len(reviewers)
         if reviewers:
-            total_reviewed_prs += 1
+            self.total_reviewed_prs += 1
 
-        if state != "open" and review_requested and first_reviewed and reviewers:
+        if state != "open" and has_review_times and reviewers:
             try:
-                r1 = datetime.fromisoformat(review_requested.replace("Z", ""))
-                r2 = datetime.fromisoformat(first_reviewed.replace("Z", ""))
-                if r2 >= r1:
-                    delta = (r2 - r1).total_seconds() / 3600.0
-                    first_reviewer = pr.get("FirstReviewer", reviewers[0])
+                if requested is None or delta is None:
+                    raise ValueError("unparseable review timestamp")
+                if delta >= 0:
+                    if first_reviewer is None:
+                        first_reviewer = reviewers[0]
                     if first_reviewer:
-                        if first_reviewer not in review_response_times:
-                            review_response_times[first_reviewer] = []
-                        review_response_times[first_reviewer].append(delta)
-                        review_day = r1.date().isoformat()
-                        daily_review_speed[review_day].append(delta)
+                        if first_reviewer not in self.review_response_times:
+                            self.review_response_times[first_reviewer] = []
+                        self.review_response_times[first_reviewer].append(delta)
+                        review_bucket = bucket_start(epoch_to_day(requested), self.granularity)
+                        self.bucket_review_sums[review_bucket] += delta
+                        self.bucket_review_counts[review_bucket] += 1
                 else:
                     logger.warning(f"[WARN] PR_ID={pr_id} has FirstReviewTime earlier than ReviewRequestedTime")
             except Exception as e:
                 logger.warning(f"[WARN] PR_ID={pr_id} - error parsing review time: {e}")
 
-        changers = pr.get("ChangeRequestors", [])
-        if isinstance(changers, str):
-            try:
-                changers = json.loads(changers)
-            except:
-                changers = []
-
-        for c in changers:
-            code_quality_champions[c] = code_quality_champions.get(c, 0) + 1
+        for c in change_requestors:
+            self.code_quality_champions[c] = self.code_quality_champions.get(c, 0) + 1
 
         for r in reviewers:
-            if r not in reviewer_first_seen:
-                new_reviewers.add(r)
-            reviewer_first_seen.add(r)
-
-            if r not in reviewer_repo_map:
-                reviewer_repo_map[r] = set()
-            reviewer_repo_map[r].add(repo)
-
-            if r not in reviewer_stats:
-                reviewer_stats[r] = {"reviews": 0, "iterations": 0}
-            reviewer_stats[r]["reviews"] += 1
-            reviewer_stats[r]["iterations"] += iterations
-
-    top_reviewers = sorted(
-        [
-            {"name": r, "reviews": stats["reviews"]}
-            for r, stats in reviewer_stats.items()
-        ],
-        key=lambda x: x["reviews"],
-        reverse=True
-    )[:5]
-
-    fastest_reviewers = [
-        {
-            "name": r,
-            "avg_response_time_hrs": round(sum(times) / len(times), 2)
-        }
-        for r, times in review_response_times.items() if times
-    ]
-    fastest_reviewers = sorted(fastest_reviewers, key=lambda x: x["avg_response_time_hrs"])[:5]
-
-    code_quality_leaders = sorted(
-        [ {"name": r, "prs_flagged": count} for r, count in code_quality_champions.items() ],
-        key=lambda x: x["prs_flagged"], reverse=True
-    )[:5]
-
-    cross_repo_champions = sorted(
-        [ {"name": r, "unique_repos_reviewed": len(repos)} for r, repos in reviewer_repo_map.items() if len(repos) > 1 ],
-        key=lambda x: x["unique_repos_reviewed"], reverse=True
-    )[:5]
-
-    review_coverage_percent = round((total_reviewed_prs / len(items)) * 100, 1) if items else 0.0
-    avg_reviewers_per_pr = int(round(total_reviewer_count / len(items))) if items else 0
-
-    daily_chart = [
-        {
-            "date": day,
-            "pr_volume": daily_volume[day],
-            "avg_review_time_hrs": round(sum(daily_review_speed[day]) / len(daily_review_speed[day]), 2) if daily_review_speed[day] else 0.0
+            self.new_reviewers.add(r)
+
+            if r not in self.reviewer_repo_map:
+                self.reviewer_repo_map[r] = set()
+            self.reviewer_repo_map[r].add(repo)
+
+            if r not in self.reviewer_stats:
+                self.reviewer_stats[r] = {"reviews": 0, "iterations": 0}
+            self.reviewer_stats[r]["reviews"] += 1
+            self.reviewer_stats[r]["iterations"] += iterations
+
+    def merge(self, other):
+        """
+        Fold in another accumulator (e.g. a cached per-day partial); other is left unchanged.
+        Its chart buckets are re-bucketed to this granularity, so other must be at day
+        granularity or at this one.
+        """
+        self.item_count += other.item_count
+        self.total_iterations += other.total_iterations
+        self.total_reviewed_prs += other.total_reviewed_prs
+        self.total_reviewer_count += other.total_reviewer_count
+        for r, stats in other.reviewer_stats.items():
+            totals = self.reviewer_stats.setdefault(r, {"reviews": 0, "iterations": 0})
+            totals["reviews"] += stats["reviews"]
+            totals["iterations"] += stats["iterations"]
+        for counts, other_counts in (
+            (self.impactful_contributors, other.impactful_contributors),
+            (self.code_quality_champions, other.code_quality_champions),
+        ):
+            for name, count in other_counts.items():
+                counts[name] = counts.get(name, 0) + count
+        for r, times in other.review_response_times.items():
+            self.review_response_times.setdefault(r, []).extend(times)
+        for r, repos in other.reviewer_repo_map.items():
+            self.reviewer_repo_map.setdefault(r, set()).update(repos)
+        self.new_reviewers.update(other.new_reviewers)
+        for totals, other_totals in (
+            (self.bucket_volume, other.bucket_volume),
+            (self.bucket_review_sums, other.bucket_review_sums),
+            (self.bucket_review_counts, other.bucket_review_counts),
+        ):
+            for bucket, value in other_totals.items():
+                totals[bucket_start(bucket, self.granularity)] += value
+
+    def result(self):
+        # Ties are broken by name so the output does not depend on read order
+        top_reviewers = sorted(
+            [
+                {"name": r, "reviews": stats["reviews"]}
+                for r, stats in self.reviewer_stats.items()
+            ],
+            key=lambda x: (-x["reviews"], x["name"])
+        )[:5]
+
+        fastest_reviewers = [
+            {
+                "name": r,
+                "avg_response_time_hrs": round(sum(times) / len(times), 2)
+            }
+            for r, times in self.review_response_times.items() if times
+        ]
+        fastest_reviewers = sorted(fastest_reviewers, key=lambda x: (x["avg_response_time_hrs"], x["name"]))[:5]
+
+        code_quality_leaders = sorted(
+            [ {"name": r, "prs_flagged": count} for r, count in self.code_quality_champions.items() ],
+            key=lambda x: (-x["prs_flagged"], x["name"])
+        )[:5]
+
+        cross_repo_champions = sorted(
+            [ {"name": r, "unique_repos_reviewed": len(repos)} for r, repos in self.reviewer_repo_map.items() if len(repos) > 1 ],
+            key=lambda x: (-x["unique_repos_reviewed"], x["name"])
+        )[:5]
+
+        item_count = self.item_count
+        review_coverage_percent = round((self.total_reviewed_prs / item_count) * 100, 1) if item_count else 0.0
+        avg_reviewers_per_pr = int(round(self.total_reviewer_count / item_count)) if item_count else 0
+
+        bucket_volume = self.bucket_volume
+        review_sums, review_counts = self.bucket_review_sums, self.bucket_review_counts
+        chart = [
+            {
+                "date": bucket,
+                "pr_volume": bucket_volume.get(bucket, 0),
+                "avg_review_time_hrs": round(review_sums[bucket] / review_counts[bucket], 2) if review_counts.get(bucket) else 0.0
+            }
+            for bucket in sorted(set(bucket_volume.keys()).union(review_counts.keys()))
+        ]
+
+        result = {
+            "impactful_contributors": sorted(
+                [ {"name": r, "prs_delivered": count} for r, count in self.impactful_contributors.items() ],
+                key=lambda x: (-x["prs_delivered"], x["name"])
+            )[:5],
+            "new_reviewers": sorted(list(self.new_reviewers))[:3],
+            "code_quality_champions": code_quality_leaders,
+            "fastest_reviewers": fastest_reviewers,
+            "cross_repo_champions": cross_repo_champions,
+            "top_reviewers": top_reviewers,
+            "total_reviewers": len(self.reviewer_stats),
+            "review_coverage": review_coverage_percent,
+            "avg_reviewers_per_pr": avg_reviewers_per_pr,
+            "review_speed_chart": chart,
+            "review_speed_granularity": self.granularity
         }
-        for day in sorted(set(daily_volume.keys()).union(daily_review_speed.keys()))
-    ]
-
-    result = {
-        "impactful_contributors": sorted(
-            [ {"name": r, "prs_delivered": count} for r, count in impactful_contributors.items() ],
-            key=lambda x: x["prs_delivered"], reverse=True
-        )[:5],
-        "new_reviewers": sorted(list(new_reviewers))[:3],
-        "code_quality_champions": code_quality_leaders,
-        "fastest_reviewers": fastest_reviewers,
-        "cross_repo_champions": cross_repo_champions,
-        "top_reviewers": top_reviewers,
-        "total_reviewers": len(reviewer_stats),
-        "review_coverage": review_coverage_percent,
-        "avg_reviewers_per_pr": avg_reviewers_per_pr,
-        "review_speed_chart": daily_chart
-    }
-
-    logger.info("[Contributor Metrics Result] %s", json.dumps(result, indent=2))
-    logger.info("[Unique Reviewer List] %s", sorted(list(reviewer_stats.keys())))
-
-    return result
+
+        # Only pay for dumping the result when it is actually logged
+        if logger.isEnabledFor(logging.INFO):
+            logger.info("[Contributor Metrics Result] %s", json.dumps(result, indent=2))
+            logger.info("[Unique Reviewer List] %s", sorted(list(self.reviewer_stats.keys())))
+
+        return result
+
+
+def calculate_contributor_metrics(items, granularity="day"):
+    contributors = ContributorAccumulator(granularity)
+    for pr in items:
+        contributors.add(pr)
+    return contributors.result()
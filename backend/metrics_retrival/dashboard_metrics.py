@@ -0,0 +1,43 @@
+"""
+Helper Module: dashboard_metrics.py
+Computes the /summary, /contributors and first page of /table payloads in one pass
+over a single date-range read, decoding each PR into one PRRecord shared by both blocks.
+"""
+
+from calculate_summary_metrics import SummaryAccumulator, REQUIRED_ATTRIBUTES as SUMMARY_ATTRIBUTES
+from contributor_metrics import ContributorAccumulator, REQUIRED_ATTRIBUTES as CONTRIBUTOR_ATTRIBUTES
+from pr_record import PRRecord
+
+# Attributes the summary and contributor blocks read; table rows need whole items
+REQUIRED_ATTRIBUTES = tuple(dict.fromkeys(SUMMARY_ATTRIBUTES + CONTRIBUTOR_ATTRIBUTES + ("Squad", "TechStack")))
+
+
+def calculate_dashboard_metrics(items, squad=None, stack=None, table_limit=None, granularity="day"):
+    """
+    items must cover the whole date range without squad/stack filters, as /summary does.
+    The contributor block only sees the squad's PRs and the table rows the squad/stack's PRs,
+    matching what /contributors and /table return for the same query.
+    """
+    summary = SummaryAccumulator()
+    contributors = ContributorAccumulator(granularity)
+    table_rows = []
+
+    for pr in items:
+        record = PRRecord.from_item(pr)
+        summary.add(record)
+
+        if squad and pr.get("Squad") != squad:
+            continue
+        contributors.add(record)
+
+        if table_limit and len(table_rows) < table_limit:
+            if not stack or pr.get("TechStack") == stack:
+                table_rows.append(pr)
+
+    result = {
+        "summary": summary.result(),
+        "contributors": contributors.result()
+    }
+    if table_limit:
+        result["table"] = table_rows
+    return result
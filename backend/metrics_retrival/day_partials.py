@@ -0,0 +1,116 @@
+"""
+Helper Module: day_partials.py
+Per-day partial aggregates for /summary and /contributors, cached in-process.
+
+A request range is split into calendar days. Each day's PRs (by CreatedDate) are
+folded into their own SummaryAccumulator / ContributorAccumulator. These partials
+sit in a bounded LRU keyed by (kind, day, squad, stack), and the response is the
+merge of the partials for every day in range. A range that overlaps an earlier
+one (the date picker moved by a day) only reads and aggregates its new days.
+Uncached days are read in contiguous runs, one date-range read per run.
+
+Days within PARTIAL_CACHE_MUTABLE_DAYS of today (UTC), and later ones, are
+recomputed on every request and never cached. Older days are kept for
+PARTIAL_CACHE_TTL_SECONDS, so PRs created on them that merge later show up once
+the entry expires. Closed ranges in the response cache behave the same way.
+"""
+
+import os
+from datetime import datetime, timedelta
+from query_planner import day_buckets
+from response_cache import LRUCache
+from calculate_summary_metrics import SummaryAccumulator
+from contributor_metrics import ContributorAccumulator
+
+PARTIAL_CACHE_MAX_ENTRIES = int(os.environ.get("PARTIAL_CACHE_MAX_ENTRIES", "1024"))
+PARTIAL_CACHE_TTL_SECONDS = int(os.environ.get("PARTIAL_CACHE_TTL_SECONDS", "86400"))
+PARTIAL_CACHE_MUTABLE_DAYS = int(os.environ.get("PARTIAL_CACHE_MUTABLE_DAYS", "1"))
+
+# Reused while the Lambda container is warm
+partial_cache = LRUCache(PARTIAL_CACHE_MAX_ENTRIES)
+
+
+def first_mutable_day(now=None):
+    """Earliest "YYYY-MM-DD" that is still recomputed on every request"""
+    today = (now or datetime.utcnow()).date()
+    return (today - timedelta(days=max(PARTIAL_CACHE_MUTABLE_DAYS - 1, 0))).isoformat()
+
+
+def day_runs(days):
+    """Split sorted "YYYY-MM-DD" days into runs of consecutive days"""
+    runs = []
+    previous = None
+    for day in days:
+        current = datetime.strptime(day, "%Y-%m-%d").date()
+        if previous is not None and current - previous == timedelta(days=1):
+            runs[-1].append(day)
+        else:
+            runs.append([day])
+        previous = current
+    return runs
+
+
+def day_partials(kind, start, end, squad, stack, read_range, build_partial, cache=partial_cache, now=None):
+    """
+    Return ([partial per day in range], stats).
+    read_range(start, end) returns the items created between two ISO timestamps
+    (already filtered by squad/stack); build_partial(items) aggregates one day's items.
+    """
+    mutable_from = first_mutable_day(now)
+    days = day_buckets(start, end)
+    partials = {}
+    missing = []
+    for day in days:
+        partial = cache.get((kind, day, squad, stack)) if day < mutable_from else None
+        if partial is None:
+            missing.append(day)
+        else:
+            partials[day] = partial
+
+    runs = day_runs(missing)
+    for run in runs:
+        by_day = {day: [] for day in run}
+        for item in read_range(f"{run[0]}T00:00:00Z", f"{run[-1]}T23:59:59Z"):
+            items = by_day.get((item.get("CreatedDate") or "")[:10])
+            if items is not None:
+                items.append(item)
+        for day in run:
+            partial = partials[day] = build_partial(by_day[day])
+            if day < mutable_from:
+                cache.set((kind, day, squad, stack), partial, PARTIAL_CACHE_TTL_SECONDS)
+
+    stats = {"kind": kind, "days": len(days), "cached_days": len(days) - len(missing), "reads": len(runs)}
+    return [partials[day] for day in days], stats
+
+
+def summary_partial(items):
+    summary = SummaryAccumulator()
+    for pr in items:
+        summary.add(pr)
+    return summary
+
+
+def contributor_partial(items):
+    # Day granularity, so the partial can be re-bucketed for any requested granularity
+    contributors = ContributorAccumulator("day")
+    for pr in items:
+        contributors.add(pr)
+    return contributors
+
+
+def summary_from_partials(start, end, read_range, **kwargs):
+    """(calculate_summary_metrics result for the range, stats) built from per-day partials"""
+    summary = SummaryAccumulator()
+    partials, stats = day_partials("summary", start, end, None, None, read_range, summary_partial, **kwargs)
+    for partial in partials:
+        summary.merge(partial)
+    return summary.result(), stats
+
+
+def contributors_from_partials(start, end, squad, granularity, read_range, **kwargs):
+    """(calculate_contributor_metrics result for the range, stats) built from per-day partials"""
+    contributors = ContributorAccumulator(granularity)
+    partials, stats = day_partials("contributors", start, end, squad, None, read_range, contributor_partial, **kwargs)
+    for partial in partials:
+        contributors.merge(partial)
+    return contributors.result(), stats
@@ -1,15 +1,108 @@
 import os
 import json
-import boto3
-from boto3.dynamodb.conditions import Key, Attr
 from datetime import datetime
-from decimal import Decimal
-from contributor_metrics import calculate_contributor_metrics
-from calculate_summary_metrics import calculate_summary_metrics
+from pr_record import as_record
+from response_encoding import encode_body
+from pagination import parse_limit, parse_fields, parse_sort, decode_cursor, encode_cursor, sort_items, select_fields
+from compression import compress_response
+from time_buckets import resolve_granularity
+from response_cache import create_response_cache, build_cache_key, ttl_for_range, conditional_response, get_header
 
 DYNAMODB_TABLE_NAME = os.environ.get("DYNAMO_TABLE_NAME")
-dynamodb = boto3.resource("dynamodb")
-table = dynamodb.Table(DYNAMODB_TABLE_NAME)
+ROLLUP_TABLE_NAME = os.environ.get("ROLLUP_TABLE_NAME")
+SUMMARY_SOURCE = os.environ.get("SUMMARY_SOURCE", "items")
+SKETCH_TABLE_NAME = os.environ.get("SKETCH_TABLE_NAME")
+PERCENTILE_SOURCE = os.environ.get("PERCENTILE_SOURCE", "items")
+# "rollup" serves /contributors leaderboards from the per-reviewer rollup rows
+CONTRIBUTOR_SOURCE = os.environ.get("CONTRIBUTOR_SOURCE", "items")
+# review_speed_chart granularity when the request has none: "day", "week", "month" or "auto"
+CHART_GRANULARITY = os.environ.get("CHART_GRANULARITY", "auto")
+# "python" (default) or "numpy"; numpy falls back to python when NumPy is not installed
+AGGREGATION_ENGINE = os.environ.get("AGGREGATION_ENGINE", "python")
+# Read only the attributes the aggregators declare in REQUIRED_ATTRIBUTES
+PROJECTION_ENABLED = os.environ.get("PROJECTION_ENABLED", "true").lower() == "true"
+# Cold-start mode: boto3, the DynamoDB client and each endpoint's modules load on first use.
+# "false" loads everything at import (provisioned concurrency / SnapStart, where init is free).
+LAZY_INIT = os.environ.get("LAZY_INIT", "true").lower() == "true"
+# "dynamodb", or "sqlite" to read a local SQLITE_PATH database through sqlite_backend.py (from metrics_storage)
+STORAGE_BACKEND = os.environ.get("STORAGE_BACKEND", "dynamodb").lower()
+SQLITE_PATH = os.environ.get("SQLITE_PATH", "metrics.db")
+# Build /summary and /contributors from cached per-day partials (day_partials.py)
+PARTIAL_CACHE_ENABLED = os.environ.get("PARTIAL_CACHE_ENABLED", "false").lower() == "true"
+# Root of the Parquet segments written by cold_tier.py (from metrics_storage); unset reads only the hot table
+COLD_TIER_DIR = os.environ.get("COLD_TIER_DIR")
+# Connection pool shared by the parallel month queries and scan segments
+DYNAMODB_MAX_POOL_CONNECTIONS = int(os.environ.get("DYNAMODB_MAX_POOL_CONNECTIONS", "16"))
+DYNAMODB_CONNECT_TIMEOUT = float(os.environ.get("DYNAMODB_CONNECT_TIMEOUT", "2"))
+DYNAMODB_READ_TIMEOUT = float(os.environ.get("DYNAMODB_READ_TIMEOUT", "10"))
+# "client" reads through the low-level client with native int/float decoding (client_reads.py); "resource" yields Decimals
+DYNAMODB_READ_PATH = os.environ.get("DYNAMODB_READ_PATH", "resource").lower()
+response_cache = create_response_cache()
+
+# DynamoDB resource, low-level client and Table handles, created on first use and reused while the container is warm
+_dynamodb = None
+_dynamodb_client = None
+_tables = {}
+
+def dynamodb_config():
+    from botocore.config import Config
+    return Config(
+        max_pool_connections=DYNAMODB_MAX_POOL_CONNECTIONS,
+        tcp_keepalive=True,
+        connect_timeout=DYNAMODB_CONNECT_TIMEOUT,
+        read_timeout=DYNAMODB_READ_TIMEOUT,
+        retries={"mode": "standard"},
+    )
+
+def get_dynamodb():
+    """The shared DynamoDB resource (or SQLite stand-in); its meta.client is the one pooled low-level client"""
+    global _dynamodb
+    if _dynamodb is None and STORAGE_BACKEND == "sqlite":
+        from sqlite_backend import SQLiteResource
+        _dynamodb = SQLiteResource(SQLITE_PATH)
+    elif _dynamodb is None:
+        import boto3
+        _dynamodb = boto3.resource("dynamodb", config=dynamodb_config())
+    return _dynamodb
+
+def get_dynamodb_client():
+    """Plain low-level client for DYNAMODB_READ_PATH=client; the resource's meta.client converts values to Decimals"""
+    global _dynamodb_client
+    if _dynamodb_client is None:
+        import boto3
+        _dynamodb_client = boto3.client("dynamodb", config=dynamodb_config())
+    return _dynamodb_client
+
+def dynamo_table(name):
+    """Table handle for name, or None when the table is not configured"""
+    if not name:
+        return None
+    table = _tables.get(name)
+    if table is None:
+        table = get_dynamodb().Table(name)
+        if DYNAMODB_READ_PATH == "client" and STORAGE_BACKEND != "sqlite":
+            from client_reads import ClientTable
+            table = ClientTable(table, get_dynamodb_client())
+        _tables[name] = table
+    return table
+
+def use_columnar(engine):
+    # columnar_metrics imports NumPy, so it is only loaded when the numpy engine is requested
+    if engine != "numpy":
+        return False
+    from columnar_metrics import numpy_available
+    return numpy_available()
+
+def warm_up():
+    """Eager initialization: import every endpoint's modules and create the table handles"""
+    import query_planner, calculate_summary_metrics, contributor_metrics, dashboard_metrics, percentile_metrics, reviewer_leaderboard
+    use_columnar(AGGREGATION_ENGINE)
+    if COLD_TIER_DIR:
+        import cold_tier
+    if PARTIAL_CACHE_ENABLED:
+        import day_partials
+    for name in (DYNAMODB_TABLE_NAME, ROLLUP_TABLE_NAME, SKETCH_TABLE_NAME):
+        dynamo_table(name)
 
 def lambda_handler(event, context):
     print("Event received:", json.dumps(event))
@@ -17,8 +110,6 @@ def lambda_handler(event, context):
     query = event.get("queryStringParameters", {}) or {}
     start_date_raw = query.get("startDate")
     end_date_raw = query.get("endDate")
-    squad = query.get("squad")
-    stack = query.get("stack")
 
     try:
         start_date = datetime.strptime(start_date_raw, "%Y%m%d").replace(hour=0, minute=0, second=0).isoformat() + "Z"
@@ -30,70 +121,215 @@ def lambda_handler(event, context):
         if not start_date or not end_date:
             return response(400, "Missing required parameters: startDate, endDate")
 
-        if path.endswith("/summary"):
-            return get_summary(start_date, end_date)
-        elif path.endswith("/contributors"):
-            return get_contributors(start_date, end_date, squad)
-        elif path.endswith("/table"):
-            return get_table(start_date, end_date, squad, stack)
-        else:
-            return response(404, "Endpoint not found")
+        cache_key = build_cache_key(path.rstrip("/").rsplit("/", 1)[-1], query)
+        result = response_cache.get(cache_key) if response_cache else None
+        if result is None:
+            result = route_request(path, query, start_date, end_date)
+            if result["statusCode"] != 200:
+                return result
+            # Attach the ETag before caching so cache hits do not rehash the body
+            result = conditional_response(result, None)
+            if response_cache:
+                response_cache.set(cache_key, result, ttl_for_range(end_date_raw))
+        result = conditional_response(result, get_header(event, "if-none-match"))
+        return compress_response(result, get_header(event, "accept-encoding"))
 
     except Exception as e:
         print("Error:", str(e))
         return response(500, f"Internal Server Error: {str(e)}")
 
-def get_summary(start_date, end_date):
-    items = scan_by_date(start_date, end_date)
-    metrics = calculate_summary_metrics(items)
-    return response(200, metrics)
+def route_request(path, query, start_date, end_date):
+    squad = query.get("squad")
+    stack = query.get("stack")
+    columnar = use_columnar(query.get("engine") or AGGREGATION_ENGINE)
+    granularity = None
+    if path.endswith(("/contributors", "/dashboard")):
+        try:
+            granularity = resolve_granularity(query.get("granularity") or CHART_GRANULARITY, start_date, end_date)
+        except ValueError as e:
+            return response(400, f"Invalid granularity: {e}")
+
+    if path.endswith("/summary"):
+        return get_summary(start_date, end_date, query.get("source") or SUMMARY_SOURCE, columnar)
+    elif path.endswith("/percentiles"):
+        return get_percentiles(start_date, end_date, query.get("source") or PERCENTILE_SOURCE)
+    elif path.endswith("/contributors"):
+        return get_contributors(start_date, end_date, squad, columnar, query.get("source") or CONTRIBUTOR_SOURCE, granularity)
+    elif path.endswith("/table"):
+        try:
+            paged = bool(query.get("limit") or query.get("cursor"))
+            limit = parse_limit(query.get("limit")) if paged else None
+            cursor = decode_cursor(query["cursor"]) if query.get("cursor") else None
+            fields = parse_fields(query.get("fields"))
+            sort_column, descending = parse_sort(query.get("sort"))
+        except ValueError as e:
+            return response(400, f"Invalid table parameters: {e}")
+        return get_table(start_date, end_date, squad, stack, limit, cursor, fields, sort_column, descending)
+    elif path.endswith("/dashboard"):
+        try:
+            table_limit = int(query.get("tableLimit") or 0)
+        except ValueError:
+            return response(400, "Invalid tableLimit. Use a positive integer")
+        return get_dashboard(start_date, end_date, squad, stack, table_limit, columnar, granularity)
+    else:
+        return response(404, "Endpoint not found")
+
+def get_summary(start_date, end_date, source="items", columnar=False):
+    if source == "rollup" and ROLLUP_TABLE_NAME:
+        from query_planner import read_rollup_days
+        from calculate_summary_metrics import calculate_summary_from_rollups
+        rows, stats = read_rollup_days(dynamo_table(ROLLUP_TABLE_NAME), start_date, end_date)
+        print("[rollup stats]", json.dumps(stats))
+        return response(200, calculate_summary_from_rollups(rows))
 
-def get_contributors(start_date, end_date, squad=None):
-    items = scan_by_date(start_date, end_date, squad)
-    metrics = calculate_contributor_metrics(items)
+    if columnar:
+        from columnar_metrics import calculate_summary_metrics_columnar as aggregate, REQUIRED_ATTRIBUTES
+    else:
+        from calculate_summary_metrics import calculate_summary_metrics as aggregate, REQUIRED_ATTRIBUTES
+    read_kwargs = aggregation_projection(REQUIRED_ATTRIBUTES)
+    if PARTIAL_CACHE_ENABLED and not columnar:
+        from day_partials import summary_from_partials
+        summary, stats = summary_from_partials(start_date, end_date, lambda start, end: scan_by_date(start, end, **read_kwargs))
+        print("[partial stats]", json.dumps(stats))
+        return response(200, summary)
+    items = scan_by_date(start_date, end_date, **read_kwargs)
+    return response(200, aggregate(items))
+
+def get_percentiles(start_date, end_date, source="items"):
+    from percentile_metrics import calculate_percentile_metrics, calculate_percentiles_from_partials, REQUIRED_ATTRIBUTES
+    if source == "sketch" and SKETCH_TABLE_NAME:
+        from query_planner import read_rollup_days
+        rows, stats = read_rollup_days(dynamo_table(SKETCH_TABLE_NAME), start_date, end_date)
+        print("[sketch stats]", json.dumps(stats))
+        return response(200, calculate_percentiles_from_partials(rows))
+
+    items = scan_by_date(start_date, end_date, **aggregation_projection(REQUIRED_ATTRIBUTES))
+    return response(200, calculate_percentile_metrics(items))
+
+def get_contributors(start_date, end_date, squad=None, columnar=False, source="items", granularity="day"):
+    if columnar:
+        from columnar_metrics import calculate_contributor_metrics_columnar as aggregate, REQUIRED_ATTRIBUTES
+    else:
+        from contributor_metrics import calculate_contributor_metrics as aggregate, REQUIRED_ATTRIBUTES
+    read_kwargs = aggregation_projection(REQUIRED_ATTRIBUTES)
+    if PARTIAL_CACHE_ENABLED and not columnar:
+        from day_partials import contributors_from_partials
+        contributors, stats = contributors_from_partials(
+            start_date, end_date, squad, granularity, lambda start, end: scan_by_date(start, end, squad, **read_kwargs))
+        print("[partial stats]", json.dumps(stats))
+    else:
+        contributors = aggregate(scan_by_date(start_date, end_date, squad, **read_kwargs), granularity)
+
+    # Reviewer rows are not split by squad, so squad requests take every field from items.
+    # The rollup leaderboards replace only the leaderboard fields; the rest need individual PRs.
+    if source == "rollup" and ROLLUP_TABLE_NAME and not squad:
+        from query_planner import read_rollup_days
+        from reviewer_leaderboard import calculate_leaderboards_from_rollups, REVIEWER_ROLLUP_PREFIX
+        rows, stats = read_rollup_days(dynamo_table(ROLLUP_TABLE_NAME), start_date, end_date, REVIEWER_ROLLUP_PREFIX)
+        print("[rollup stats]", json.dumps(stats))
+        contributors.update(calculate_leaderboards_from_rollups(rows))
+    return response(200, contributors)
+
+def get_table(start_date, end_date, squad=None, stack=None, limit=None, cursor=None,
+              fields=None, sort_column=None, descending=False):
+    """
+    Without limit/cursor the full list is returned as before. With them the body is
+    {"items": [...], "nextCursor": ...}; unsorted pages resume from the DynamoDB
+    position, sorted pages (which must read the whole range) from an offset.
+    With the cold tier enabled every page is an offset page.
+    """
+    from query_planner import read_page, build_projection
+    if COLD_TIER_DIR and limit is not None and not sort_column:
+        # Key positions cannot span both tiers, so merged rows are paged by offset in CreatedDate order
+        sort_column = "CreatedDate"
+    read_kwargs = {}
+    if fields:
+        read_kwargs = build_projection(fields + ([sort_column] if sort_column else []))
+
+    if sort_column:
+        items = sort_items(scan_by_date(start_date, end_date, squad, stack, **read_kwargs), sort_column, descending)
+        if limit is None:
+            return response(200, select_fields(items, fields))
+        offset = (cursor or {}).get("offset", 0)
+        if not isinstance(offset, int) or offset < 0:
+            return response(400, "Invalid cursor")
+        page = items[offset:offset + limit]
+        next_offset = offset + len(page)
+        next_cursor = encode_cursor({"offset": next_offset}) if next_offset < len(items) else None
+        return response(200, {"items": select_fields(page, fields), "nextCursor": next_cursor})
+
+    if limit is None:
+        return response(200, scan_by_date(start_date, end_date, squad, stack, **read_kwargs))
+
+    try:
+        items, position = read_page(dynamo_table(DYNAMODB_TABLE_NAME), start_date, end_date, squad, stack, limit, cursor, **read_kwargs)
+    except ValueError as e:
+        return response(400, f"Invalid cursor: {e}")
+    next_cursor = encode_cursor(position) if position else None
+    return response(200, {"items": items, "nextCursor": next_cursor})
+
+def get_dashboard(start_date, end_date, squad=None, stack=None, table_limit=0, columnar=False, granularity="day"):
+    # One unfiltered read serves all three blocks; squad/stack are applied in memory
+    # Table rows are returned whole, so only a dashboard without them can be projected
+    if columnar:
+        from columnar_metrics import calculate_dashboard_metrics_columnar as aggregate, REQUIRED_ATTRIBUTES
+    else:
+        from dashboard_metrics import calculate_dashboard_metrics as aggregate, REQUIRED_ATTRIBUTES
+    read_kwargs = {} if table_limit else aggregation_projection(REQUIRED_ATTRIBUTES)
+    items = scan_by_date(start_date, end_date, **read_kwargs)
+    metrics = aggregate(items, squad, stack, table_limit, granularity)
     return response(200, metrics)
 
+def aggregation_projection(attributes):
+    """ProjectionExpression kwargs for an aggregator's REQUIRED_ATTRIBUTES"""
+    from query_planner import build_projection
+    return build_projection(attributes) if PROJECTION_ENABLED else {}
 
-def get_table(start_date, end_date, squad=None, stack=None):
-    items = scan_by_date(start_date, end_date, squad, stack)
-    return response(200, items)
+def scan_by_date(start, end, squad=None, stack=None, **read_kwargs):
+    from query_planner import read_by_date
+    if COLD_TIER_DIR:
+        return scan_tiers_by_date(start, end, squad, stack, **read_kwargs)
+    items, stats = read_by_date(dynamo_table(DYNAMODB_TABLE_NAME), start, end, squad, stack, **read_kwargs)
+    print("[scan stats]", json.dumps(stats))
+    return items
 
-def scan_by_date(start, end, squad=None, stack=None):
-    filter_exp = (
-            Attr("CreatedDate").gte(start) & Attr("CreatedDate").lte(end)
-    )
-    if squad:
-        filter_exp &= Attr("Squad").eq(squad)
-    if stack:
-        filter_exp &= Attr("TechStack").eq(stack)
+def scan_tiers_by_date(start, end, squad=None, stack=None, **read_kwargs):
+    """Hot-table rows merged with the compacted cold segments; both tiers are read concurrently"""
+    from concurrent.futures import ThreadPoolExecutor
+    from query_planner import read_by_date, build_projection
+    from cold_tier import read_cold_range, merge_tiers, projected_attributes
 
-    response = table.scan(FilterExpression=filter_exp)
-    return response.get("Items", [])
+    attributes = projected_attributes(read_kwargs)
+    drop_key = bool(attributes) and "PR_ID" not in attributes
+    if drop_key:
+        # PR_ID decides which tier serves a PR
+        attributes = attributes + ["PR_ID"]
+        read_kwargs = dict(read_kwargs, **build_projection(attributes))
+
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        cold = pool.submit(read_cold_range, COLD_TIER_DIR, DYNAMODB_TABLE_NAME, start, end, squad, stack, attributes)
+        items, stats = read_by_date(dynamo_table(DYNAMODB_TABLE_NAME), start, end, squad, stack, **read_kwargs)
+        cold_items, cold_stats = cold.result()
+    print("[scan stats]", json.dumps(stats))
+    print("[cold stats]", json.dumps(cold_stats))
+    return merge_tiers(items, cold_items, drop_key)
 
 def calculate_avg_cycle_time(prs):
     total_hours = 0.0
     count = 0
     for pr in prs:
-        start = pr.get("CreatedDate")
-        end = pr.get("MergedDate")
-        if start and end:
-            try:
-                start_ts = datetime.fromisoformat(start.replace("Z", ""))
-                end_ts = datetime.fromisoformat(end.replace("Z", ""))
-                total_hours += (end_ts - start_ts).total_seconds() / 3600.0
-                count += 1
-            except Exception:
-                continue
+        cycle_hours = as_record(pr, 0).created_to_merge_hours
+        if cycle_hours is not None:
+            total_hours += cycle_hours
+            count += 1
     return round(total_hours / count, 2) if count > 0 else 0.0
 
-def decimal_default(obj):
-    if isinstance(obj, Decimal):
-        return int(obj) if obj % 1 == 0 else float(obj)
-    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
-
 def response(status_code, body):
     return {
         "statusCode": status_code,
-        "body": json.dumps(body, default=decimal_default),
+        "body": encode_body(body),
         "headers": {"Content-Type": "application/json"}
-    }
\ No newline at end of file
+    }
+
+if not LAZY_INIT:
+    warm_up()
@@ -0,0 +1,101 @@
+"""
+Helper Module: pagination.py
+Cursor, projection and sort helpers for the /table endpoint.
+
+Cursors are opaque to clients: URL-safe base64 of a small JSON document holding
+either the query planner's resume position (unsorted pages) or an offset into the
+sorted result (sorted pages).
+"""
+
+import os
+import re
+import json
+import base64
+from decimal import Decimal
+
+TABLE_DEFAULT_LIMIT = int(os.environ.get("TABLE_DEFAULT_LIMIT", "100"))
+TABLE_MAX_LIMIT = int(os.environ.get("TABLE_MAX_LIMIT", "1000"))
+
+FIELD_NAME = re.compile(r"^[A-Za-z0-9_]+$")
+
+
+def _json_default(obj):
+    if isinstance(obj, Decimal):
+        return {"$n": str(obj)}
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def _json_hook(obj):
+    if set(obj) == {"$n"}:
+        return Decimal(obj["$n"])
+    return obj
+
+
+def encode_cursor(state):
+    raw = json.dumps(state, separators=(",", ":"), default=_json_default).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    """Inverse of encode_cursor; raises ValueError for anything it did not produce"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        state = json.loads(raw, object_hook=_json_hook)
+    except Exception:
+        raise ValueError("Invalid cursor")
+    if not isinstance(state, dict):
+        raise ValueError("Invalid cursor")
+    return state
+
+
+def parse_limit(value):
+    if value in (None, ""):
+        return TABLE_DEFAULT_LIMIT
+    limit = int(value)
+    if limit <= 0:
+        raise ValueError("limit must be positive")
+    return min(limit, TABLE_MAX_LIMIT)
+
+
+def parse_fields(value):
+    """Comma-separated attribute names; PR_ID is always included so rows stay addressable"""
+    if not value:
+        return None
+    fields = [name.strip() for name in value.split(",") if name.strip()]
+    for name in fields:
+        if not FIELD_NAME.match(name):
+            raise ValueError(f"Invalid field name: {name}")
+    return list(dict.fromkeys(["PR_ID"] + fields))
+
+
+def parse_sort(value):
+    """"column" sorts ascending, "-column" descending; returns (column, descending)"""
+    if not value:
+        return None, False
+    descending = value.startswith("-")
+    column = value.lstrip("-")
+    if not FIELD_NAME.match(column):
+        raise ValueError(f"Invalid sort column: {column}")
+    return column, descending
+
+
+def sort_items(items, column, descending=False):
+    """Sort by one column (numbers before strings, missing values always last), ties by PR_ID"""
+    def key(item):
+        value = item.get(column)
+        if isinstance(value, (int, float, Decimal)) and not isinstance(value, bool):
+            return (0, float(value), "")
+        return (1, 0.0, str(value))
+
+    present = [item for item in items if item.get(column) is not None]
+    missing = [item for item in items if item.get(column) is None]
+    present.sort(key=lambda item: str(item.get("PR_ID", "")))
+    present.sort(key=key, reverse=descending)
+    return present + missing
+
+
+def select_fields(items, fields):
+    """Drop attributes that were only read for sorting"""
+    if not fields:
+        return items
+    return [{name: item[name] for name in fields if name in item} for item in items]
@@ -0,0 +1,70 @@
+"""
+Helper Module: parallel_scan.py
+Paginated, optionally segmented DynamoDB scan used by the metrics endpoints.
+Follows LastEvaluatedKey until every page is read and can split the table into
+Segment/TotalSegments workers on a thread pool.
+"""
+
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+SCAN_TOTAL_SEGMENTS = int(os.environ.get("SCAN_TOTAL_SEGMENTS", "4"))
+SCAN_MAX_WORKERS = int(os.environ.get("SCAN_MAX_WORKERS", "0")) or SCAN_TOTAL_SEGMENTS
+
+
+def scan_segment(table, scan_kwargs, segment=None, total_segments=None):
+    """Read every page of one segment (or of the whole table when unsegmented)"""
+    kwargs = dict(scan_kwargs)
+    if "ExpressionAttributeNames" in kwargs:
+        # boto3 merges the filter placeholders into this dict; keep segments from sharing it
+        kwargs["ExpressionAttributeNames"] = dict(kwargs["ExpressionAttributeNames"])
+    if total_segments and total_segments > 1:
+        kwargs["Segment"] = segment
+        kwargs["TotalSegments"] = total_segments
+
+    items = []
+    pages = 0
+    scanned = 0
+    while True:
+        response = table.scan(**kwargs)
+        pages += 1
+        scanned += response.get("ScannedCount", 0)
+        items.extend(response.get("Items", []))
+        last_key = response.get("LastEvaluatedKey")
+        if not last_key:
+            break
+        kwargs["ExclusiveStartKey"] = last_key
+
+    return items, {"pages": pages, "scanned_count": scanned}
+
+
+def parallel_scan(table, total_segments=None, max_workers=None, **scan_kwargs):
+    """
+    Scan the whole table, returning (items, stats).
+    stats reports pages read, items scanned vs. returned and wall time in ms.
+    """
+    total_segments = max(1, total_segments or SCAN_TOTAL_SEGMENTS)
+    max_workers = max(1, min(max_workers or SCAN_MAX_WORKERS, total_segments))
+    started = time.perf_counter()
+
+    if total_segments == 1:
+        results = [scan_segment(table, scan_kwargs)]
+    else:
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            futures = [
+                pool.submit(scan_segment, table, scan_kwargs, segment, total_segments)
+                for segment in range(total_segments)
+            ]
+            # Collect in segment order so the output order is deterministic
+            results = [future.result() for future in futures]
+
+    items = []
+    stats = {"segments": total_segments, "pages": 0, "scanned_count": 0}
+    for segment_items, segment_stats in results:
+        items.extend(segment_items)
+        stats["pages"] += segment_stats["pages"]
+        stats["scanned_count"] += segment_stats["scanned_count"]
+    stats["returned_count"] = len(items)
+    stats["wall_time_ms"] = round((time.perf_counter() - started) * 1000, 2)
+    return items, stats
@@ -0,0 +1,165 @@
+"""
+Helper Module: percentile_metrics.py
+p50/p75/p90/p99 of cycle time, review wait and PR size for the org, each repo and
+each reviewer. Percentiles come from bounded-memory t-digest sketches, so raw
+durations are never kept or sorted.
+
+The values come from the same merged PRs into develop that calculate_summary_metrics
+averages.
+- org and repo scopes: every such PR.
+- reviewer scope: the PRs each person reviewed.
+- review_wait_hours: credited only to the PR's first reviewer, as fastest_reviewers does.
+
+Daily partials: build_daily_partials turns items into one row per (created day, scope)
+holding serialized sketches. calculate_percentiles_from_partials merges stored rows for
+any date range without reading PR items. Partial table keys: Day (partition,
+"YYYY-MM-DD") and ScopeKey (sort: "org", "repo#<name>" or "reviewer#<name>").
+
+Usage (rebuild stored partials for a date range):
+    python percentile_metrics.py --table <pr table> --sketch-table <partial table> --start 20250101 --end 20250131
+"""
+
+import argparse
+from collections import defaultdict
+from datetime import datetime
+from pr_times import TIME_ATTRIBUTES
+from pr_record import as_record, is_merged, PRRecord, SIZE_FIELDS, REVIEW_FIELDS
+from quantile_sketch import TDigest
+from calculate_summary_metrics import positive_float
+
+PERCENTILE_FIELDS = SIZE_FIELDS | REVIEW_FIELDS
+
+PERCENTILES = (50, 75, 90, 99)
+METRICS = ("cycle_time_hours", "review_wait_hours", "pr_size")
+
+# Item attributes calculate_percentile_metrics reads; the retrieval layer projects reads to these
+REQUIRED_ATTRIBUTES = (
+    "State", "TargetBranch", "PR_Size", "repository", "Reviewers", "ReviewerSet", "FirstReviewer",
+) + TIME_ATTRIBUTES
+
+
+class PercentileAccumulator:
+    """Per-scope sketches behind calculate_percentile_metrics, fed one PR at a time"""
+
+    def __init__(self):
+        self.sketches = defaultdict(dict)
+
+    def sketch(self, scope, metric):
+        sketches = self.sketches[scope]
+        if metric not in sketches:
+            sketches[metric] = TDigest()
+        return sketches[metric]
+
+    def add(self, pr):
+        """Fold in one PR item or PRRecord; only merged develop PRs are decoded"""
+        if not is_merged(pr):
+            return
+        record = as_record(pr, PERCENTILE_FIELDS)
+        if record.branch != "develop":
+            return
+
+        values = {
+            "cycle_time_hours": record.created_to_merge_hours or 0,
+            "review_wait_hours": record.review_wait_hours or 0,
+            "pr_size": positive_float(record.pr_size),
+        }
+        reviewers = record.reviewers
+        first_reviewer = record.first_reviewer or (reviewers[0] if reviewers else None)
+        scopes = ["org", "repo#" + record.repo_key]
+        scopes += ["reviewer#" + name for name in reviewers]
+
+        for metric, value in values.items():
+            if value <= 0:
+                continue
+            for scope in scopes:
+                if metric == "review_wait_hours" and scope.startswith("reviewer#") and scope != f"reviewer#{first_reviewer}":
+                    continue
+                self.sketch(scope, metric).add(value)
+
+    def add_partial(self, row):
+        """Fold in one stored (day, scope) partial row"""
+        scope = row.get("ScopeKey")
+        for metric in METRICS:
+            if row.get(metric) is not None:
+                self.sketch(scope, metric).merge(TDigest.from_bytes(row[metric]))
+
+    def to_rows(self, day):
+        return [
+            {"Day": day, "ScopeKey": scope, **{metric: sketch.to_bytes() for metric, sketch in sketches.items()}}
+            for scope, sketches in sorted(self.sketches.items())
+        ]
+
+    def result(self):
+        scopes = {"org": {}, "repos": {}, "reviewers": {}}
+        for scope, sketches in sorted(self.sketches.items()):
+            summary = {metric: summarize(sketch) for metric, sketch in sorted(sketches.items())}
+            if scope == "org":
+                scopes["org"] = summary
+            elif scope.startswith("repo#"):
+                scopes["repos"][scope[5:]] = summary
+            else:
+                scopes["reviewers"][scope[9:]] = summary
+        return {"percentiles": [f"p{p}" for p in PERCENTILES], **scopes}
+
+
+def summarize(sketch):
+    summary = {"count": sketch.count}
+    for p in PERCENTILES:
+        summary[f"p{p}"] = round(sketch.quantile(p / 100), 2)
+    return summary
+
+
+def calculate_percentile_metrics(pr_items):
+    percentiles = PercentileAccumulator()
+    for pr in pr_items:
+        percentiles.add(pr)
+    return percentiles.result()
+
+
+def calculate_percentiles_from_partials(rows):
+    """Same output as calculate_percentile_metrics, merged from stored daily partial rows"""
+    percentiles = PercentileAccumulator()
+    for row in rows:
+        percentiles.add_partial(row)
+    return percentiles.result()
+
+
+def build_daily_partials(pr_items):
+    """Partial rows for every created day present in pr_items"""
+    days = defaultdict(PercentileAccumulator)
+    for pr in pr_items:
+        record = PRRecord.from_item(pr, PERCENTILE_FIELDS)
+        if record.created_day:
+            days[record.created_day].add(record)
+    return [row for day in sorted(days) for row in days[day].to_rows(day)]
+
+
+def write_daily_partials(sketch_table, rows):
+    """Overwrite stored partials with freshly built rows"""
+    with sketch_table.batch_writer(overwrite_by_pkeys=["Day", "ScopeKey"]) as batch:
+        for row in rows:
+            batch.put_item(Item=row)
+    return len(rows)
+
+
+def main():
+    import boto3
+    from query_planner import read_by_date, build_projection
+
+    parser = argparse.ArgumentParser(description="Rebuild stored daily percentile partials")
+    parser.add_argument("--table", required=True, help="PR metrics table")
+    parser.add_argument("--sketch-table", required=True, help="Daily partial table (Day, ScopeKey)")
+    parser.add_argument("--start", required=True, help="First created day, YYYYMMdd")
+    parser.add_argument("--end", required=True, help="Last created day, YYYYMMdd")
+    args = parser.parse_args()
+
+    dynamodb = boto3.resource("dynamodb")
+    start = datetime.strptime(args.start, "%Y%m%d").isoformat() + "Z"
+    end = datetime.strptime(args.end, "%Y%m%d").replace(hour=23, minute=59, second=59).isoformat() + "Z"
+    items, stats = read_by_date(dynamodb.Table(args.table), start, end, **build_projection(REQUIRED_ATTRIBUTES))
+    written = write_daily_partials(dynamodb.Table(args.sketch_table), build_daily_partials(items))
+    print(f"Wrote {written} partial rows from {stats['returned_count']} PRs")
+
+
+if __name__ == "__main__":
+    main()
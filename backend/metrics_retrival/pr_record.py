@@ -0,0 +1,172 @@
+"""
+Helper Module: pr_record.py
+PRRecord: a PR item decoded once into the fields the aggregators use.
+
+- repository/author/state/branch strings are interned, alongside the lower-cased forms
+  the aggregators compare
+- timestamps, durations and the created day are resolved as parse_pr_times does
+- reviewers and change requestors are tuples (legacy JSON-encoded lists decoded here)
+- PR_Size and PR_Iterations are native ints/floats instead of Decimals
+
+State, branch, repository and times are always decoded. The remaining groups are
+flags, so each aggregator reads only the attributes it declares in REQUIRED_ATTRIBUTES:
+- SIZE_FIELDS: PR_Size (summary, percentiles)
+- REVIEW_FIELDS: reviewers and first reviewer (percentiles, contributors)
+- CONTRIBUTOR_FIELDS: PR_ID, author, iterations and change requestors (contributors)
+A record decoded with more groups serves any subset, so the dashboard decodes each PR
+once (ALL_FIELDS) for all of its blocks.
+"""
+
+import sys
+import json
+from decimal import Decimal
+from pr_times import parse_timestamp, stored_float, duration_hours, epoch_to_day
+
+SIZE_FIELDS, REVIEW_FIELDS, CONTRIBUTOR_FIELDS = 1, 2, 4
+ALL_FIELDS = SIZE_FIELDS | REVIEW_FIELDS | CONTRIBUTOR_FIELDS
+
+_intern = sys.intern
+
+
+def intern_name(value):
+    return _intern(value) if type(value) is str else value
+
+
+def native_number(value):
+    """Decimals as int when whole, else float; other values unchanged"""
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    return value
+
+
+def decode_name_list(value):
+    """Reviewers/ChangeRequestors may be stored as a list or as a JSON-encoded string"""
+    if isinstance(value, str):
+        try:
+            return json.loads(value)
+        except:
+            return []
+    return value
+
+
+def merged_names(listed, name_set):
+    """A legacy name list followed by the names only present in the matching string set"""
+    if not name_set:
+        return listed
+    seen = set(listed)
+    return list(listed) + sorted(name for name in name_set if name not in seen)
+
+
+def reviewer_names(pr):
+    """Reviewers of a PR: the legacy Reviewers list plus the ReviewerSet string set written by newer events"""
+    return merged_names(decode_name_list(pr.get("Reviewers", [])), pr.get("ReviewerSet"))
+
+
+def change_requestor_names(pr):
+    """Reviewers who requested changes: the legacy ChangeRequestors list plus the ChangeRequestorSet string set"""
+    return merged_names(decode_name_list(pr.get("ChangeRequestors", [])), pr.get("ChangeRequestorSet"))
+
+
+# Interned (value, normalized key) pairs; repositories, states and branches are few
+NAME_CACHE_SIZE = 1024
+_repo_keys = {}
+_lowered = {}
+
+
+def repo_key(repository):
+    return (repository or "unknown").lower().strip()
+
+
+def lowered(value):
+    return (value or "").lower()
+
+
+def _names(value, cache, normalize):
+    """(interned value, interned normalize(value)), cached per distinct value"""
+    names = cache.get(value) if type(value) is str or value is None else None
+    if names is None:
+        names = (intern_name(value), _intern(normalize(value)))
+        if len(cache) < NAME_CACHE_SIZE and (type(value) is str or value is None):
+            cache[value] = names
+    return names
+
+
+def _epoch(get, epoch_field, iso_field):
+    """Stored epoch seconds, else the parsed ISO timestamp (legacy rows), else None"""
+    value = get(epoch_field)
+    if value is not None:
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            pass
+    value = get(iso_field)
+    return parse_timestamp(value) if value else None
+
+
+class PRRecord:
+    __slots__ = (
+        "fields", "pr_id", "repository", "repo_key", "author", "state", "state_lower", "branch", "branch_lower",
+        "pr_size", "iterations", "has_created_date", "has_review_times",
+        "created", "review_requested", "first_review", "merged",
+        "review_wait_hours", "created_to_merge_hours", "created_day",
+        "reviewers", "first_reviewer", "change_requestors",
+    )
+
+    @classmethod
+    def from_item(cls, pr, fields=ALL_FIELDS):
+        record = cls()
+        get = pr.get
+        record.fields = fields
+
+        record.repository, record.repo_key = _names(get("repository"), _repo_keys, repo_key)
+        record.state, record.state_lower = _names(get("State"), _lowered, lowered)
+        record.branch, record.branch_lower = _names(get("TargetBranch"), _lowered, lowered)
+        record.has_created_date = bool(get("CreatedDate"))
+        record.has_review_times = bool(get("ReviewRequestedTime")) and bool(get("FirstReviewTime"))
+
+        # Same results as parse_pr_times, without building its intermediate dict
+        record.created = created = _epoch(get, "CreatedEpoch", "CreatedDate")
+        record.review_requested = review_requested = _epoch(get, "ReviewRequestedEpoch", "ReviewRequestedTime")
+        record.first_review = first_review = _epoch(get, "FirstReviewEpoch", "FirstReviewTime")
+        record.merged = merged = _epoch(get, "MergedEpoch", "MergedDate")
+        review_wait = stored_float(pr, "ReviewWaitHours")
+        record.review_wait_hours = duration_hours(review_requested, first_review) if review_wait is None else review_wait
+        created_to_merge = stored_float(pr, "CreatedToMergeHours")
+        record.created_to_merge_hours = duration_hours(created, merged) if created_to_merge is None else created_to_merge
+        created_day = get("CreatedDay")
+        if not created_day and created is not None:
+            created_day = epoch_to_day(created)
+        record.created_day = intern_name(created_day)
+
+        record.pr_size = record.reviewers = record.first_reviewer = None
+        record.pr_id = record.author = record.iterations = record.change_requestors = None
+        if fields & SIZE_FIELDS:
+            record.pr_size = native_number(get("PR_Size", 0))
+        if fields & REVIEW_FIELDS:
+            record.reviewers = tuple(map(intern_name, reviewer_names(pr)))
+            record.first_reviewer = intern_name(get("FirstReviewer"))
+        if fields & CONTRIBUTOR_FIELDS:
+            record.pr_id = get("PR_ID", "Unknown")
+            record.author = intern_name(get("Author"))
+            try:
+                record.iterations = int(get("PR_Iterations", 0))
+            except Exception:
+                record.iterations = 0
+            record.change_requestors = tuple(change_requestor_names(pr))
+        return record
+
+
+def is_merged(pr):
+    """Whether a PR item or PRRecord is merged, without decoding an item"""
+    if type(pr) is PRRecord:
+        return pr.state_lower == "merged"
+    return (pr.get("State") or "").lower() == "merged"
+
+
+def as_record(pr, fields=ALL_FIELDS):
+    """pr as a PRRecord with at least the given field groups; records that have them pass through"""
+    if type(pr) is PRRecord:
+        if pr.fields & fields != fields:
+            raise ValueError(f"PRRecord decoded with field groups {pr.fields}, {fields} are needed")
+        return pr
+    return PRRecord.from_item(pr, fields)
@@ -0,0 +1,100 @@
+"""
+Helper Module: pr_times.py
+Resolves the timestamps of a PR item once so every aggregator can share them.
+
+Items written by the storage service carry precomputed epoch fields (CreatedEpoch,
+ReviewRequestedEpoch, FirstReviewEpoch, MergedEpoch), durations (ReviewWaitHours,
+CreatedToMergeHours) and CreatedDay. ISO strings are only parsed for legacy rows
+that have not been backfilled yet.
+"""
+
+from datetime import datetime, timezone
+from functools import lru_cache
+
+# ISO timestamp attribute -> precomputed epoch-seconds attribute
+EPOCH_FIELDS = {
+    "CreatedDate": "CreatedEpoch",
+    "ReviewRequestedTime": "ReviewRequestedEpoch",
+    "FirstReviewTime": "FirstReviewEpoch",
+    "MergedDate": "MergedEpoch",
+}
+TIMESTAMP_FIELDS = tuple(EPOCH_FIELDS)
+# Every attribute parse_pr_times may read
+TIME_ATTRIBUTES = TIMESTAMP_FIELDS + tuple(EPOCH_FIELDS.values()) + ("ReviewWaitHours", "CreatedToMergeHours", "CreatedDay")
+
+SECONDS_PER_DAY = 86400
+
+
+def parse_timestamp(value):
+    """Epoch seconds for an ISO timestamp (no offset means UTC), or None"""
+    try:
+        parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except Exception:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+@lru_cache(maxsize=4096)
+def _day_from_ordinal(day_number):
+    return datetime.fromtimestamp(day_number * SECONDS_PER_DAY, timezone.utc).date().isoformat()
+
+
+def epoch_to_day(epoch):
+    """UTC "YYYY-MM-DD" for an epoch timestamp"""
+    return _day_from_ordinal(int(epoch // SECONDS_PER_DAY))
+
+
+def stored_float(pr, field):
+    value = pr.get(field)
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def parse_pr_times(pr):
+    """
+    Map each timestamp field to epoch seconds (None when missing/unparseable) and add
+    the derived durations "review_wait_hours" / "created_to_merge_hours" (None when
+    either side is missing) plus "created_day".
+    """
+    times = {}
+    for field, epoch_field in EPOCH_FIELDS.items():
+        epoch = stored_float(pr, epoch_field)
+        if epoch is None:
+            value = pr.get(field)
+            epoch = parse_timestamp(value) if value else None
+        times[field] = epoch
+
+    review_wait = stored_float(pr, "ReviewWaitHours")
+    if review_wait is None:
+        review_wait = duration_hours(times["ReviewRequestedTime"], times["FirstReviewTime"])
+    times["review_wait_hours"] = review_wait
+
+    created_to_merge = stored_float(pr, "CreatedToMergeHours")
+    if created_to_merge is None:
+        created_to_merge = duration_hours(times["CreatedDate"], times["MergedDate"])
+    times["created_to_merge_hours"] = created_to_merge
+
+    created_day = pr.get("CreatedDay")
+    if not created_day and times["CreatedDate"] is not None:
+        created_day = epoch_to_day(times["CreatedDate"])
+    times["created_day"] = created_day
+    return times
+
+
+def duration_hours(start, end):
+    if start is None or end is None:
+        return None
+    return (end - start) / 3600.0
+
+
+def hours_between(start, end):
+    """Hours from start to end epoch; 0 when either side is missing"""
+    if start is None or end is None:
+        return 0
+    return (end - start) / 3600.0
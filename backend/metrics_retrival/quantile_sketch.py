@@ -0,0 +1,149 @@
+"""
+Helper Module: quantile_sketch.py
+Mergeable streaming quantile sketch (merging t-digest) for bounded-memory percentiles.
+
+A TDigest keeps about compression / 2 centroids, no matter how many values
+were added. Accuracy is best near the tails (p99) and the median error stays well
+under 1%. Two digests merge into one that answers for the union of their inputs,
+so daily partials can be combined for any date range. to_bytes() is a compact binary
+form for storing partials: 8 bytes per centroid plus a 23-byte header.
+"""
+
+import math
+import struct
+
+DEFAULT_COMPRESSION = 200
+# Values buffered before they are folded into the centroids
+BUFFER_FACTOR = 5
+SERIAL_VERSION = 1
+_HEADER = struct.Struct("<BHddI")
+
+
+def _k(q, compression):
+    """k1 scale function: small centroids at the tails, large ones near the median"""
+    return compression / (2 * math.pi) * math.asin(2 * q - 1)
+
+
+def _q_limit(k, compression):
+    if k >= compression / 4:
+        return 1.0
+    return (math.sin(k * 2 * math.pi / compression) + 1) / 2
+
+
+class TDigest:
+    """Quantile sketch fed one value at a time; merge() combines two sketches"""
+
+    __slots__ = ("compression", "means", "weights", "buffer", "count", "min", "max")
+
+    def __init__(self, compression=DEFAULT_COMPRESSION):
+        self.compression = compression
+        self.means = []
+        self.weights = []
+        self.buffer = []
+        self.count = 0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def __len__(self):
+        return self.count
+
+    def add(self, value, weight=1):
+        value = float(value)
+        self.buffer.append((value, weight))
+        self.count += weight
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+        if len(self.buffer) >= BUFFER_FACTOR * self.compression:
+            self._compress()
+        return self
+
+    def merge(self, other):
+        """Fold another digest into this one"""
+        if not other.count:
+            return self
+        other._compress()
+        self.buffer.extend(zip(other.means, other.weights))
+        self.count += other.count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        if len(self.buffer) >= BUFFER_FACTOR * self.compression:
+            self._compress()
+        return self
+
+    def _compress(self):
+        if not self.buffer:
+            return
+        points = sorted(list(zip(self.means, self.weights)) + self.buffer)
+        self.buffer = []
+        total = self.count
+        compression = self.compression
+
+        means = []
+        weights = []
+        weight_so_far = 0
+        mean, weight = points[0]
+        limit = _q_limit(_k(0, compression) + 1, compression)
+        for value, value_weight in points[1:]:
+            if (weight_so_far + weight + value_weight) / total <= limit:
+                weight += value_weight
+                mean += (value - mean) * value_weight / weight
+            else:
+                means.append(mean)
+                weights.append(weight)
+                weight_so_far += weight
+                limit = _q_limit(_k(weight_so_far / total, compression) + 1, compression)
+                mean, weight = value, value_weight
+        means.append(mean)
+        weights.append(weight)
+        self.means = means
+        self.weights = weights
+
+    def quantile(self, q):
+        """Estimated value at quantile q (0..1), or None when empty"""
+        self._compress()
+        if not self.count:
+            return None
+        means = self.means
+        weights = self.weights
+        if len(means) == 1 or q <= 0:
+            return means[0] if q > 0 else self.min
+        if q >= 1:
+            return self.max
+
+        target = q * self.count
+        # Below the first centroid's midpoint: interpolate from the minimum
+        cumulative = weights[0] / 2
+        if target < cumulative:
+            return self.min + (means[0] - self.min) * target / cumulative
+        for i in range(len(means) - 1):
+            gap = (weights[i] + weights[i + 1]) / 2
+            if cumulative + gap >= target:
+                return means[i] + (means[i + 1] - means[i]) * (target - cumulative) / gap
+            cumulative += gap
+        # Above the last centroid's midpoint: interpolate to the maximum
+        tail = weights[-1] / 2
+        return means[-1] + (self.max - means[-1]) * min((target - cumulative) / tail, 1.0)
+
+    def to_bytes(self):
+        self._compress()
+        size = len(self.means)
+        header = _HEADER.pack(SERIAL_VERSION, self.compression, self.min, self.max, size)
+        return header + struct.pack(f"<{size}f{size}I", *self.means, *self.weights)
+
+    @classmethod
+    def from_bytes(cls, data):
+        """Inverse of to_bytes; accepts the Binary wrapper boto3 returns for DynamoDB B attributes"""
+        data = bytes(getattr(data, "value", data))
+        version, compression, minimum, maximum, size = _HEADER.unpack_from(data)
+        if version != SERIAL_VERSION:
+            raise ValueError(f"Unsupported sketch version {version}")
+        values = struct.unpack_from(f"<{size}f{size}I", data, _HEADER.size)
+        digest = cls(compression)
+        digest.means = list(values[:size])
+        digest.weights = list(values[size:])
+        digest.count = sum(digest.weights)
+        digest.min = minimum
+        digest.max = maximum
+        return digest
@@ -0,0 +1,253 @@
+"""
+Helper Module: query_planner.py
+Answers date-range reads with secondary-index queries instead of full-table scans.
+
+Indexes (all use CreatedDate as the sort key):
+- CreatedMonthIndex: partition key CreatedMonth ("YYYY-MM"), one query per month in range
+- SquadIndex: partition key Squad
+- TechStackIndex: partition key TechStack
+
+The planner picks the index that touches the fewest partitions for a request and
+applies any remaining filters as a FilterExpression. When an index is missing the
+request falls back to the paginated parallel scan. Tables that answer date ranges
+themselves (the SQLite backend's read_by_date) bypass the planner.
+"""
+
+import os
+import time
+from datetime import date, timedelta
+from concurrent.futures import ThreadPoolExecutor
+from boto3.dynamodb.conditions import Key, Attr
+from botocore.exceptions import ClientError
+from parallel_scan import parallel_scan
+
+QUERY_PLANNER_ENABLED = os.environ.get("QUERY_PLANNER_ENABLED", "true").lower() == "true"
+MONTH_INDEX_NAME = os.environ.get("MONTH_INDEX_NAME", "CreatedMonthIndex")
+SQUAD_INDEX_NAME = os.environ.get("SQUAD_INDEX_NAME", "SquadIndex")
+STACK_INDEX_NAME = os.environ.get("STACK_INDEX_NAME", "TechStackIndex")
+QUERY_MAX_WORKERS = int(os.environ.get("QUERY_MAX_WORKERS", "8"))
+
+# Indexes that returned a ValidationException in this container; skipped afterwards
+_missing_indexes = set()
+
+
+def month_buckets(start, end):
+    """List every "YYYY-MM" bucket between two ISO timestamps, inclusive"""
+    year, month = int(start[:4]), int(start[5:7])
+    end_year, end_month = int(end[:4]), int(end[5:7])
+    buckets = []
+    while (year, month) <= (end_year, end_month):
+        buckets.append(f"{year:04d}-{month:02d}")
+        month += 1
+        if month > 12:
+            year, month = year + 1, 1
+    return buckets
+
+
+def day_buckets(start, end):
+    """List every "YYYY-MM-DD" day between two ISO timestamps, inclusive"""
+    day = date.fromisoformat(start[:10])
+    last = date.fromisoformat(end[:10])
+    days = []
+    while day <= last:
+        days.append(day.isoformat())
+        day += timedelta(days=1)
+    return days
+
+
+def plan_query(start, end, squad=None, stack=None):
+    """Choose the cheapest access path for a CreatedDate range with optional squad/stack filters"""
+    date_range = Key("CreatedDate").between(start, end)
+
+    if squad and SQUAD_INDEX_NAME not in _missing_indexes:
+        return {
+            "index": SQUAD_INDEX_NAME,
+            "key_conditions": [Key("Squad").eq(squad) & date_range],
+            "filter": Attr("TechStack").eq(stack) if stack else None,
+        }
+
+    if stack and STACK_INDEX_NAME not in _missing_indexes:
+        return {
+            "index": STACK_INDEX_NAME,
+            "key_conditions": [Key("TechStack").eq(stack) & date_range],
+            "filter": Attr("Squad").eq(squad) if squad else None,
+        }
+
+    if MONTH_INDEX_NAME not in _missing_indexes:
+        filter_exp = None
+        if squad:
+            filter_exp = Attr("Squad").eq(squad)
+        if stack:
+            stack_exp = Attr("TechStack").eq(stack)
+            filter_exp = filter_exp & stack_exp if filter_exp else stack_exp
+        return {
+            "index": MONTH_INDEX_NAME,
+            "key_conditions": [
+                Key("CreatedMonth").eq(bucket) & date_range
+                for bucket in month_buckets(start, end)
+            ],
+            "filter": filter_exp,
+        }
+
+    return None
+
+
+def query_partition(table, index_name, key_condition, filter_exp=None, **query_kwargs):
+    """Read every page of one index partition (or of a base-table partition when index_name is None)"""
+    kwargs = dict(query_kwargs, KeyConditionExpression=key_condition)
+    if "ExpressionAttributeNames" in kwargs:
+        # boto3 merges the condition placeholders into this dict; keep partitions from sharing it
+        kwargs["ExpressionAttributeNames"] = dict(kwargs["ExpressionAttributeNames"])
+    if index_name:
+        kwargs["IndexName"] = index_name
+    if filter_exp is not None:
+        kwargs["FilterExpression"] = filter_exp
+
+    items = []
+    pages = 0
+    scanned = 0
+    while True:
+        response = table.query(**kwargs)
+        pages += 1
+        scanned += response.get("ScannedCount", 0)
+        items.extend(response.get("Items", []))
+        last_key = response.get("LastEvaluatedKey")
+        if not last_key:
+            break
+        kwargs["ExclusiveStartKey"] = last_key
+
+    return items, {"pages": pages, "scanned_count": scanned}
+
+
+def execute_plan(table, plan, **query_kwargs):
+    """Fan out over the plan's partitions and return (items, stats)"""
+    started = time.perf_counter()
+    partitions = plan["key_conditions"]
+    if len(partitions) == 1:
+        results = [query_partition(table, plan["index"], partitions[0], plan["filter"], **query_kwargs)]
+    else:
+        with ThreadPoolExecutor(max_workers=max(1, min(QUERY_MAX_WORKERS, len(partitions)))) as pool:
+            futures = [
+                pool.submit(query_partition, table, plan["index"], key_condition, plan["filter"], **query_kwargs)
+                for key_condition in partitions
+            ]
+            results = [future.result() for future in futures]
+
+    items = []
+    stats = {"index": plan["index"], "partitions": len(partitions), "pages": 0, "scanned_count": 0}
+    for partition_items, partition_stats in results:
+        items.extend(partition_items)
+        stats["pages"] += partition_stats["pages"]
+        stats["scanned_count"] += partition_stats["scanned_count"]
+    stats["returned_count"] = len(items)
+    stats["wall_time_ms"] = round((time.perf_counter() - started) * 1000, 2)
+    return items, stats
+
+
+def read_by_date(table, start, end, squad=None, stack=None, **read_kwargs):
+    """Return (items, stats) for a date range, using an index when one is available"""
+    if hasattr(table, "read_by_date"):
+        return table.read_by_date(start, end, squad, stack, **read_kwargs)
+    plan = plan_query(start, end, squad, stack) if QUERY_PLANNER_ENABLED else None
+    if plan:
+        try:
+            return execute_plan(table, plan, **read_kwargs)
+        except ClientError as e:
+            error = e.response.get("Error", {})
+            if error.get("Code") != "ValidationException" or "index" not in error.get("Message", "").lower():
+                raise
+            print(f"Index {plan['index']} unavailable, falling back to scan: {e}")
+            _missing_indexes.add(plan["index"])
+            return read_by_date(table, start, end, squad, stack, **read_kwargs)
+
+    items, stats = parallel_scan(table, FilterExpression=scan_filter(start, end, squad, stack), **read_kwargs)
+    stats["index"] = None
+    return items, stats
+
+
+def scan_filter(start, end, squad=None, stack=None):
+    """FilterExpression used when no index serves the request"""
+    filter_exp = Attr("CreatedDate").gte(start) & Attr("CreatedDate").lte(end)
+    if squad:
+        filter_exp &= Attr("Squad").eq(squad)
+    if stack:
+        filter_exp &= Attr("TechStack").eq(stack)
+    return filter_exp
+
+
+def read_page(table, start, end, squad=None, stack=None, limit=100, position=None, **read_kwargs):
+    """
+    Read up to limit items in plan order, resuming at position
+    ({"index", "partition", "key"} from a previous call).
+    Returns (items, next_position); next_position is None once every partition is read.
+    Limit is passed to DynamoDB as the remaining count, so a page never reads past
+    the items it returns and LastEvaluatedKey is always a valid resume point.
+    A position on an index found missing (in this call or an earlier one) cannot
+    resume another access path, so reading restarts from the first page of the new plan.
+    """
+    if position and position.get("index") in _missing_indexes:
+        print(f"Cursor index {position['index']} unavailable, restarting from the first page")
+        position = None
+    plan = plan_query(start, end, squad, stack) if QUERY_PLANNER_ENABLED else None
+    index = plan["index"] if plan else None
+    resume = position or {"index": index, "partition": 0, "key": None}
+    if "partition" not in resume or resume.get("index") != index:
+        raise ValueError("Cursor does not match the current access path")
+
+    partitions = plan["key_conditions"] if plan else [None]
+    partition = resume.get("partition", 0)
+    start_key = resume.get("key")
+    items = []
+    try:
+        while partition < len(partitions) and len(items) < limit:
+            kwargs = dict(read_kwargs, Limit=limit - len(items))
+            if "ExpressionAttributeNames" in kwargs:
+                kwargs["ExpressionAttributeNames"] = dict(kwargs["ExpressionAttributeNames"])
+            if start_key:
+                kwargs["ExclusiveStartKey"] = start_key
+            if plan:
+                kwargs["KeyConditionExpression"] = partitions[partition]
+                kwargs["IndexName"] = index
+                if plan["filter"] is not None:
+                    kwargs["FilterExpression"] = plan["filter"]
+                response = table.query(**kwargs)
+            else:
+                kwargs["FilterExpression"] = scan_filter(start, end, squad, stack)
+                response = table.scan(**kwargs)
+            items.extend(response.get("Items", []))
+            start_key = response.get("LastEvaluatedKey")
+            if not start_key:
+                partition += 1
+    except ClientError as e:
+        error = e.response.get("Error", {})
+        if not plan or error.get("Code") != "ValidationException" or "index" not in error.get("Message", "").lower():
+            raise
+        print(f"Index {index} unavailable, falling back to scan: {e}")
+        _missing_indexes.add(index)
+        return read_page(table, start, end, squad, stack, limit, None, **read_kwargs)
+
+    if partition >= len(partitions):
+        return items, None
+    return items, {"index": index, "partition": partition, "key": start_key}
+
+
+def build_projection(attributes):
+    """ProjectionExpression kwargs for a list of attribute names (placeholders avoid reserved words)"""
+    attributes = list(dict.fromkeys(attributes))
+    return {
+        "ProjectionExpression": ", ".join(f"#f{i}" for i in range(len(attributes))),
+        "ExpressionAttributeNames": {f"#f{i}": name for i, name in enumerate(attributes)},
+    }
+
+
+def read_rollup_days(rollup_table, start, end, prefix=None):
+    """Return (rows, stats) for every daily rollup row between two ISO timestamps, optionally only RollupKeys starting with prefix"""
+    plan = {
+        "index": None,
+        "key_conditions": [
+            Key("Day").eq(day) & Key("RollupKey").begins_with(prefix) if prefix else Key("Day").eq(day)
+            for day in day_buckets(start, end)
+        ],
+        "filter": None,
+    }
+    return execute_plan(rollup_table, plan)
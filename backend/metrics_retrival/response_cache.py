@@ -0,0 +1,147 @@
+"""
+Helper Module: response_cache.py
+Two-tier response cache for the metrics endpoints plus ETag / If-None-Match handling.
+
+- Tier 1: in-process LRU with per-entry TTL, reused while the Lambda container is warm
+- Tier 2: pluggable store (DiskCache is a local-disk stand-in, e.g. under /tmp)
+
+Ranges that end before today cannot change any more and are cached much longer
+than ranges that include today.
+"""
+
+import os
+import json
+import time
+import hashlib
+from collections import OrderedDict
+from datetime import datetime
+
+RESPONSE_CACHE_ENABLED = os.environ.get("RESPONSE_CACHE_ENABLED", "true").lower() == "true"
+RESPONSE_CACHE_MAX_ENTRIES = int(os.environ.get("RESPONSE_CACHE_MAX_ENTRIES", "128"))
+RESPONSE_CACHE_DIR = os.environ.get("RESPONSE_CACHE_DIR")
+CLOSED_RANGE_TTL_SECONDS = int(os.environ.get("CLOSED_RANGE_TTL_SECONDS", "86400"))
+OPEN_RANGE_TTL_SECONDS = int(os.environ.get("OPEN_RANGE_TTL_SECONDS", "60"))
+
+
+class LRUCache:
+    """Bounded in-memory cache; entries expire after their own TTL"""
+
+    def __init__(self, max_entries=RESPONSE_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+
+    def get(self, key):
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at <= time.time():
+            del self.entries[key]
+            return None
+        self.entries.move_to_end(key)
+        return value
+
+    def set(self, key, value, ttl):
+        self.entries[key] = (time.time() + ttl, value)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+
+class DiskCache:
+    """Second-tier cache storing one JSON file per key; any object with get/set(key, value, ttl) can replace it"""
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, hashlib.sha256(key.encode()).hexdigest() + ".json")
+
+    def get(self, key):
+        try:
+            with open(self._path(key)) as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if entry.get("expires_at", 0) <= time.time():
+            return None
+        return entry.get("value")
+
+    def set(self, key, value, ttl):
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, "w") as f:
+                json.dump({"expires_at": time.time() + ttl, "value": value}, f)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"Failed to write response cache entry: {e}")
+
+
+class ResponseCache:
+    """Looks up tier 1, then tier 2 (promoting hits into tier 1)"""
+
+    def __init__(self, memory, second_tier=None):
+        self.memory = memory
+        self.second_tier = second_tier
+
+    def get(self, key):
+        value = self.memory.get(key)
+        if value is not None or self.second_tier is None:
+            return value
+        value = self.second_tier.get(key)
+        if value is not None:
+            self.memory.set(key, value, OPEN_RANGE_TTL_SECONDS)
+        return value
+
+    def set(self, key, value, ttl):
+        self.memory.set(key, value, ttl)
+        if self.second_tier is not None:
+            self.second_tier.set(key, value, ttl)
+
+
+def build_cache_key(endpoint, query):
+    """Key on the endpoint name and the query parameters in a canonical order"""
+    params = sorted((name, value) for name, value in query.items() if value not in (None, ""))
+    return json.dumps([endpoint, params], separators=(",", ":"))
+
+
+def ttl_for_range(end_date_raw, now=None):
+    """Closed historical ranges (ending before today, UTC) get the long TTL"""
+    today = (now or datetime.utcnow()).strftime("%Y%m%d")
+    return CLOSED_RANGE_TTL_SECONDS if end_date_raw < today else OPEN_RANGE_TTL_SECONDS
+
+
+def compute_etag(body):
+    return '"' + hashlib.sha256(body.encode()).hexdigest()[:32] + '"'
+
+
+def get_header(event, name):
+    """Case-insensitive request header lookup"""
+    for header, value in (event.get("headers") or {}).items():
+        if header.lower() == name:
+            return value
+    return None
+
+
+def conditional_response(result, if_none_match):
+    """Attach the ETag and turn a matching If-None-Match into a 304"""
+    headers = dict(result.get("headers", {}))
+    etag = headers.get("ETag") or compute_etag(result["body"])
+    headers["ETag"] = etag
+    headers["Cache-Control"] = "no-cache"
+
+    if if_none_match:
+        candidates = [tag.strip() for tag in if_none_match.split(",")]
+        if etag in candidates or f"W/{etag}" in candidates or "*" in candidates:
+            return {"statusCode": 304, "body": "", "headers": headers}
+
+    return dict(result, headers=headers)
+
+
+def create_response_cache():
+    if not RESPONSE_CACHE_ENABLED:
+        return None
+    second_tier = DiskCache(RESPONSE_CACHE_DIR) if RESPONSE_CACHE_DIR else None
+    return ResponseCache(LRUCache(), second_tier)
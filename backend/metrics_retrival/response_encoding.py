@@ -0,0 +1,42 @@
+"""
+Helper Module: response_encoding.py
+JSON encoding of response bodies.
+
+Bodies are encoded by json.dumps by default (JSON_ENCODER=json). With JSON_ENCODER=auto
+and the optional orjson package installed, orjson encodes dicts, lists, strings and
+native numbers in C; only values it cannot encode itself (Decimals from resource
+reads, string sets) reach decimal_default. orjson emits compact JSON (no spaces after
+separators), so its bodies, and the ETags computed from them, differ byte-for-byte
+from json.dumps output. Switching encoders invalidates every client's cached ETag once.
+"""
+
+import os
+import json
+from decimal import Decimal
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+JSON_ENCODER = os.environ.get("JSON_ENCODER", "json").lower()
+
+
+def decimal_default(obj):
+    if isinstance(obj, Decimal):
+        return int(obj) if obj % 1 == 0 else float(obj)
+    if isinstance(obj, (set, frozenset)):
+        # String sets (e.g. ReviewerSet) come back from DynamoDB as Python sets
+        return sorted(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def use_orjson():
+    return orjson is not None and JSON_ENCODER == "auto"
+
+
+def encode_body(body):
+    """JSON text for a response body"""
+    if use_orjson():
+        return orjson.dumps(body, default=decimal_default, option=orjson.OPT_NON_STR_KEYS).decode()
+    return json.dumps(body, default=decimal_default)
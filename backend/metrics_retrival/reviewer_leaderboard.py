@@ -0,0 +1,64 @@
+"""
+Helper Module: reviewer_leaderboard.py
+Reviewer leaderboards for /contributors built from the per-reviewer, per-day rows
+the storage service keeps in the rollup table ("@reviewer#<login>" RollupKeys).
+Cost grows with reviewers x days in range instead of with PRs.
+
+The leaderboard fields match calculate_contributor_metrics (same shapes, ordering
+and tie-breaks). Fields that need individual PRs (impactful_contributors,
+review_coverage, avg_reviewers_per_pr, review_speed_chart) are not included here;
+/contributors merges these leaderboards into the item-computed response.
+"""
+
+import heapq
+from collections import defaultdict
+
+REVIEWER_ROLLUP_PREFIX = "@reviewer#"
+LEADERBOARD_FIELDS = (
+    "top_reviewers", "fastest_reviewers", "code_quality_champions",
+    "cross_repo_champions", "new_reviewers", "total_reviewers",
+)
+TOP_K = 5
+
+
+def calculate_leaderboards_from_rollups(rows, k=TOP_K):
+    reviews = defaultdict(int)
+    response_sums = defaultdict(float)
+    response_counts = defaultdict(int)
+    change_requests = defaultdict(int)
+    repos = defaultdict(set)
+
+    for row in rows:
+        login = row.get("Reviewer") or row.get("RollupKey", "")[len(REVIEWER_ROLLUP_PREFIX):]
+        review_count = int(row.get("review_count", 0))
+        if review_count > 0:
+            reviews[login] += review_count
+            repos[login].update(row.get("Repos") or ())
+        if int(row.get("response_time_count", 0)) > 0:
+            response_sums[login] += float(row.get("response_time_sum", 0))
+            response_counts[login] += int(row.get("response_time_count", 0))
+        if int(row.get("change_request_count", 0)) > 0:
+            change_requests[login] += int(row.get("change_request_count", 0))
+
+    # Reviewers whose PRs in range were all withdrawn keep rows with zero counts
+    reviewers = sorted(login for login, count in reviews.items() if count > 0)
+    return {
+        "top_reviewers": [
+            {"name": login, "reviews": reviews[login]}
+            for login in heapq.nsmallest(k, reviewers, key=lambda r: (-reviews[r], r))
+        ],
+        "fastest_reviewers": heapq.nsmallest(k, (
+            {"name": login, "avg_response_time_hrs": round(response_sums[login] / count, 2)}
+            for login, count in response_counts.items() if count > 0
+        ), key=lambda x: (x["avg_response_time_hrs"], x["name"])),
+        "code_quality_champions": [
+            {"name": login, "prs_flagged": change_requests[login]}
+            for login in heapq.nsmallest(k, change_requests, key=lambda r: (-change_requests[r], r))
+        ],
+        "cross_repo_champions": heapq.nsmallest(k, (
+            {"name": login, "unique_repos_reviewed": len(repos[login])}
+            for login in reviewers if len(repos[login]) > 1
+        ), key=lambda x: (-x["unique_repos_reviewed"], x["name"])),
+        "new_reviewers": reviewers[:3],
+        "total_reviewers": len(reviewers),
+    }
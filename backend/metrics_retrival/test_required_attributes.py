@@ -0,0 +1,172 @@
+"""
+Every aggregator declares the item attributes it reads in REQUIRED_ATTRIBUTES and the
+retrieval layer projects DynamoDB reads down to them. These tests fail when an
+aggregator reads an attribute it did not declare, or when its result changes once
+items are projected.
+"""
+
+import pytest
+
+import calculate_summary_metrics
+import contributor_metrics
+import dashboard_metrics
+import columnar_metrics
+import percentile_metrics
+import day_partials
+from pr_record import PRRecord
+from response_cache import LRUCache
+
+
+class RecordingItem(dict):
+    """dict that records every key looked up on it"""
+
+    def __init__(self, data, accessed):
+        super().__init__(data)
+        self.accessed = accessed
+
+    def get(self, key, default=None):
+        self.accessed.add(key)
+        return super().get(key, default)
+
+    def __getitem__(self, key):
+        self.accessed.add(key)
+        return super().__getitem__(key)
+
+    def __contains__(self, key):
+        self.accessed.add(key)
+        return super().__contains__(key)
+
+
+def sample_items():
+    """Covers merged/open/closed PRs, develop/main branches, legacy ISO-only rows and both reviewer encodings"""
+    noise = {"Jira_URL": "https://jira/ABC-1", "PR_URL": "https://github/pr", "sender": "bot", "action": "closed"}
+    return [
+        dict(noise, PR_ID="api_1", repository="api", Author="ana", State="Merged", TargetBranch="develop",
+             PR_Size=120, Squad="core", TechStack="Python", PR_Iterations=2,
+             CreatedDate="2025-05-01T09:00:00Z", ReviewRequestedTime="2025-05-01T09:00:00Z",
+             FirstReviewTime="2025-05-01T13:30:00Z", MergedDate="2025-05-02T10:00:00Z",
+             CreatedEpoch=1746090000, ReviewRequestedEpoch=1746090000, FirstReviewEpoch=1746106200,
+             MergedEpoch=1746180000, ReviewWaitHours=4.5, CreatedToMergeHours=25, CreatedDay="2025-05-01",
+             FirstReviewer="bo", Reviewers=["bo", "cy"], ChangeRequestors=["cy"]),
+        dict(noise, PR_ID="api_2", repository="api", Author="bo", State="Merged", TargetBranch="main",
+             PR_Size=40, Squad="core", TechStack="Python",
+             CreatedDate="2025-05-03T08:00:00Z", ReviewRequestedTime="2025-05-03T08:00:00Z",
+             MergedDate="2025-05-03T12:00:00Z"),
+        dict(noise, PR_ID="web_7", repository="Web ", Author="cy", State="Merged", TargetBranch="develop",
+             PR_Size=15, Squad="growth", TechStack="JavaScript", PR_Iterations=1,
+             CreatedDate="2025-05-04T10:00:00+00:00", ReviewRequestedTime="2025-05-04T11:00:00",
+             FirstReviewTime="2025-05-04T12:00:00", MergedDate="2025-05-05T10:00:00Z",
+             FirstReviewer="ana", Reviewers='["ana"]', ReviewerSet={"ana", "dee"}, ChangeRequestors='["ana"]'),
+        dict(noise, PR_ID="web_8", repository="web", Author="dee", State="Review in Progress", TargetBranch="develop",
+             PR_Size=300, Squad="growth", TechStack="JavaScript",
+             CreatedDate="2025-05-06T10:00:00Z", ReviewRequestedTime="2025-05-06T10:00:00Z",
+             FirstReviewTime="2025-05-06T18:00:00Z", ReviewerSet={"bo"}, ChangeRequestorSet={"bo"}),
+        dict(noise, PR_ID="web_9", repository="web", Author="ana", State="Open", TargetBranch="develop",
+             PR_Size=0, Squad="growth", TechStack="JavaScript", CreatedDate="2025-05-07T10:00:00Z"),
+    ]
+
+
+def run_recording(aggregate, declared):
+    accessed = set()
+    aggregate([RecordingItem(item, accessed) for item in sample_items()])
+    return accessed - set(declared)
+
+
+def project(items, attributes):
+    return [{name: value for name, value in item.items() if name in attributes} for item in items]
+
+
+AGGREGATORS = [
+    ("summary", calculate_summary_metrics.calculate_summary_metrics, calculate_summary_metrics.REQUIRED_ATTRIBUTES),
+    ("contributors", contributor_metrics.calculate_contributor_metrics, contributor_metrics.REQUIRED_ATTRIBUTES),
+    ("dashboard", lambda items: dashboard_metrics.calculate_dashboard_metrics(items, squad="growth"),
+     dashboard_metrics.REQUIRED_ATTRIBUTES),
+    ("percentiles", percentile_metrics.calculate_percentile_metrics, percentile_metrics.REQUIRED_ATTRIBUTES),
+    ("percentile partials", percentile_metrics.build_daily_partials, percentile_metrics.REQUIRED_ATTRIBUTES),
+]
+
+COLUMNAR_AGGREGATORS = [
+    ("columnar summary", columnar_metrics.calculate_summary_metrics_columnar, columnar_metrics.REQUIRED_ATTRIBUTES),
+    ("columnar contributors", columnar_metrics.calculate_contributor_metrics_columnar, columnar_metrics.REQUIRED_ATTRIBUTES),
+    ("columnar dashboard", lambda items: columnar_metrics.calculate_dashboard_metrics_columnar(items, squad="growth"),
+     columnar_metrics.REQUIRED_ATTRIBUTES),
+]
+
+needs_numpy = pytest.mark.skipif(not columnar_metrics.numpy_available(), reason="NumPy not installed")
+
+
+@pytest.mark.parametrize("name,aggregate,declared", AGGREGATORS)
+def test_reads_only_declared_attributes(name, aggregate, declared):
+    assert run_recording(aggregate, declared) == set(), f"{name} reads undeclared attributes"
+
+
+@pytest.mark.parametrize("name,aggregate,declared", AGGREGATORS)
+def test_projected_items_give_same_result(name, aggregate, declared):
+    assert aggregate(project(sample_items(), declared)) == aggregate(sample_items())
+
+
+@pytest.mark.parametrize("name,aggregate", [
+    ("summary", calculate_summary_metrics.calculate_summary_metrics),
+    ("contributors", contributor_metrics.calculate_contributor_metrics),
+    ("percentiles", percentile_metrics.calculate_percentile_metrics),
+])
+def test_records_give_same_result(name, aggregate):
+    assert aggregate([PRRecord.from_item(item) for item in sample_items()]) == aggregate(sample_items())
+
+
+@pytest.mark.parametrize("granularity", ["day", "week"])
+def test_merged_day_partials_give_same_result(granularity):
+    def read_range(start, end):
+        return [item for item in sample_items() if start <= item.get("CreatedDate", "") <= end]
+
+    start, end = "2025-05-01T00:00:00Z", "2025-05-31T23:59:59Z"
+    cache = LRUCache()
+    for _ in range(2):  # first pass fills the cache, second merges cached partials only
+        summary, _ = day_partials.summary_from_partials(start, end, read_range, cache=cache)
+        contributors, stats = day_partials.contributors_from_partials(start, end, None, granularity, read_range, cache=cache)
+        assert summary == calculate_summary_metrics.calculate_summary_metrics(read_range(start, end))
+        assert contributors == contributor_metrics.calculate_contributor_metrics(read_range(start, end), granularity)
+    assert stats["cached_days"] == stats["days"]
+
+
+@needs_numpy
+@pytest.mark.parametrize("name,aggregate,declared", COLUMNAR_AGGREGATORS)
+def test_columnar_reads_only_declared_attributes(name, aggregate, declared):
+    assert run_recording(aggregate, declared) == set(), f"{name} reads undeclared attributes"
+
+
+@needs_numpy
+@pytest.mark.parametrize("name,aggregate,declared", COLUMNAR_AGGREGATORS)
+def test_columnar_projected_items_give_same_result(name, aggregate, declared):
+    assert aggregate(project(sample_items(), declared)) == aggregate(sample_items())
+
+
+def sparse_items():
+    """Rows with null or missing attributes, as written by older processors or repos without metadata"""
+    return [
+        dict(PR_ID="ops_1", repository=None, Author=None, State=None, TargetBranch=None, PR_Size=5,
+             Squad="growth", CreatedDate="2025-05-08T10:00:00Z"),
+        dict(PR_ID="ops_2", repository="ops", Author="eve", State="Merged", TargetBranch="develop", PR_Size=10,
+             Squad="growth", CreatedDate="2025-05-09T10:00:00Z", ReviewRequestedTime="2025-05-09T10:00:00Z",
+             FirstReviewTime="2025-05-09T15:00:00Z", MergedDate="2025-05-10T10:00:00Z",
+             FirstReviewer=None, Reviewers=["x", "y"]),
+        dict(PR_ID="ops_3", State="Closed", PR_Size=1),
+    ]
+
+
+COLUMNAR_EQUIVALENTS = [
+    ("summary", calculate_summary_metrics.calculate_summary_metrics,
+     columnar_metrics.calculate_summary_metrics_columnar),
+    ("contributors", contributor_metrics.calculate_contributor_metrics,
+     columnar_metrics.calculate_contributor_metrics_columnar),
+    ("dashboard", lambda items: dashboard_metrics.calculate_dashboard_metrics(items, squad="growth"),
+     lambda items: columnar_metrics.calculate_dashboard_metrics_columnar(items, squad="growth")),
+]
+
+
+@needs_numpy
+@pytest.mark.parametrize("name,python_engine,columnar_engine", COLUMNAR_EQUIVALENTS)
+@pytest.mark.parametrize("items", [sample_items, sparse_items, lambda: sample_items() + sparse_items()],
+                         ids=["sample", "sparse", "mixed"])
+def test_columnar_matches_python(name, python_engine, columnar_engine, items):
+    assert columnar_engine(items()) == python_engine(items()), f"columnar {name} differs"
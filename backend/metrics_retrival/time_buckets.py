@@ -0,0 +1,47 @@
+"""
+Helper Module: time_buckets.py
+Chart granularity for the review_speed_chart time series.
+
+A bucket is labelled by its first day ("YYYY-MM-DD"):
+- day: the day itself
+- week: the ISO week's Monday
+- month: the first of the month
+
+"auto" picks the finest granularity that keeps a request's range within
+CHART_MAX_POINTS buckets. Payload size and per-bucket state therefore stay
+bounded however long the range is.
+"""
+
+import os
+from datetime import date, timedelta
+from functools import lru_cache
+
+GRANULARITIES = ("day", "week", "month")
+CHART_MAX_POINTS = int(os.environ.get("CHART_MAX_POINTS", "120"))
+
+
+def resolve_granularity(granularity, start, end):
+    """Concrete granularity for a request; start/end are ISO dates or timestamps. Raises ValueError"""
+    granularity = (granularity or "auto").lower()
+    if granularity in GRANULARITIES:
+        return granularity
+    if granularity != "auto":
+        raise ValueError(f"granularity must be one of {', '.join(GRANULARITIES + ('auto',))}")
+
+    span_days = (date.fromisoformat(end[:10]) - date.fromisoformat(start[:10])).days + 1
+    if span_days <= CHART_MAX_POINTS:
+        return "day"
+    if -(-span_days // 7) <= CHART_MAX_POINTS:
+        return "week"
+    return "month"
+
+
+@lru_cache(maxsize=4096)
+def bucket_start(day, granularity):
+    """First day of the bucket holding "YYYY-MM-DD" day"""
+    if granularity == "day":
+        return day
+    if granularity == "month":
+        return day[:8] + "01"
+    parsed = date.fromisoformat(day)
+    return (parsed - timedelta(days=parsed.weekday())).isoformat()
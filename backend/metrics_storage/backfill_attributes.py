@@ -0,0 +1,122 @@
+"""
+Backfill job: adds derived attributes to PR items written before they existed.
+
+Derives:
+- the index bucket keys from get_bucket_attributes (CreatedMonth), so legacy rows
+  become visible to the CreatedMonthIndex query path
+- the epoch, duration and created-day fields from get_epoch_attributes, so the
+  metrics service does not have to parse ISO timestamps for legacy rows
+- TechStack "Unknown" where it was stored as NULL (repos without a detected
+  language), which DynamoDB cannot index under TechStackIndex
+
+Usage:
+    python backfill_attributes.py --table pr-metrics [--segments 4] [--dry-run]
+"""
+
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+import boto3
+from metrics_processor_storage import get_bucket_attributes, get_epoch_attributes
+
+# Attributes read to derive the backfilled values
+SOURCE_ATTRIBUTES = [
+    "PR_ID", "CreatedDate", "ReviewRequestedTime", "FirstReviewTime", "MergedDate",
+    "CreatedMonth", "CreatedDay", "CreatedEpoch", "ReviewRequestedEpoch", "FirstReviewEpoch",
+    "MergedEpoch", "ReviewWaitHours", "CreatedToMergeHours", "TechStack",
+]
+
+
+def derive_missing_attributes(item):
+    """Return only the derived attributes that the item does not already have"""
+    derived = {}
+    derived.update(get_bucket_attributes(item))
+    derived.update(get_epoch_attributes(item))
+    if "TechStack" in item and item["TechStack"] is None:
+        derived["TechStack"] = "Unknown"
+    return {name: value for name, value in derived.items() if item.get(name) != value}
+
+
+def apply_update(table, pr_id, updates):
+    """SET the derived attributes on an existing item"""
+    names = {f"#a{i}": name for i, name in enumerate(updates)}
+    values = {f":v{i}": value for i, value in enumerate(updates.values())}
+    table.update_item(
+        Key={"PR_ID": pr_id},
+        UpdateExpression="SET " + ", ".join(f"#a{i} = :v{i}" for i in range(len(updates))),
+        ExpressionAttributeNames=names,
+        ExpressionAttributeValues=values,
+        ConditionExpression="attribute_exists(PR_ID)"
+    )
+
+
+def backfill_segment(table, segment, total_segments, dry_run=False):
+    """Scan one segment and backfill every item missing derived attributes"""
+    scan_kwargs = {
+        "ProjectionExpression": ", ".join(f"#p{i}" for i in range(len(SOURCE_ATTRIBUTES))),
+        "ExpressionAttributeNames": {f"#p{i}": name for i, name in enumerate(SOURCE_ATTRIBUTES)},
+        "Segment": segment,
+        "TotalSegments": total_segments,
+    }
+    scanned = 0
+    updated = 0
+    failed = 0
+    while True:
+        response = table.scan(**scan_kwargs)
+        for item in response.get("Items", []):
+            scanned += 1
+            updates = derive_missing_attributes(item)
+            if not updates:
+                continue
+            if dry_run:
+                updated += 1
+                continue
+            try:
+                apply_update(table, item["PR_ID"], updates)
+                updated += 1
+            except Exception as e:
+                failed += 1
+                print(f"Failed to backfill PR {item.get('PR_ID')}: {e}")
+        last_key = response.get("LastEvaluatedKey")
+        if not last_key:
+            break
+        scan_kwargs["ExclusiveStartKey"] = last_key
+
+    return {"scanned": scanned, "updated": updated, "failed": failed}
+
+
+def run_backfill(table, total_segments=4, dry_run=False):
+    """Backfill the whole table using parallel segmented scans"""
+    with ThreadPoolExecutor(max_workers=total_segments) as pool:
+        futures = [
+            pool.submit(backfill_segment, table, segment, total_segments, dry_run)
+            for segment in range(total_segments)
+        ]
+        results = [future.result() for future in futures]
+
+    totals = {"scanned": 0, "updated": 0, "failed": 0}
+    for result in results:
+        for name, value in result.items():
+            totals[name] += value
+    return totals
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backfill derived attributes on existing PR items")
+    parser.add_argument("--table", required=True, help="DynamoDB table name")
+    parser.add_argument("--segments", type=int, default=4, help="Parallel scan segments")
+    parser.add_argument("--endpoint-url", help="Override the DynamoDB endpoint (e.g. DynamoDB Local)")
+    parser.add_argument("--sqlite", metavar="PATH", help="Backfill a local SQLite database instead")
+    parser.add_argument("--dry-run", action="store_true", help="Count items that need a backfill without writing")
+    args = parser.parse_args()
+
+    if args.sqlite:
+        from sqlite_backend import SQLiteResource
+        table = SQLiteResource(args.sqlite).Table(args.table)
+    else:
+        table = boto3.resource("dynamodb", endpoint_url=args.endpoint_url).Table(args.table)
+    totals = run_backfill(table, max(1, args.segments), args.dry_run)
+    print(f"Backfill complete: {totals}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,331 @@
+"""
+Batched webhook ingest with per-PR event coalescing.
+
+store_events_batch takes a list of SQS or EventBridge records, groups them by PR_ID,
+orders each PR's events by event time and folds them in memory into one final
+item state, applying the same rules as the single-event handlers in
+metrics_processor_storage. Existing items are loaded with one consistent
+BatchGetItem per 100 PRs, and each changed PR is then written once:
+- PRs created by the batch: a put conditional on attribute_not_exists(PR_ID)
+- PRs deleted by the batch (moved back to draft): a delete
+- existing PRs that changed: one UpdateItem, with SET for changed attributes and
+  ADD for new members of string sets
+Deletes and updates are conditional on the event_timestamp that was loaded. A PR
+changed by a concurrent event in the meantime is re-read and its events folded again.
+
+Records are deduplicated like single events: their message or event id is checked
+against the dedup table before folding. Each PR's write goes through IdempotentTable,
+so it commits in one transaction with the PR's rollup delta and the dedup records
+of its events.
+
+The return value uses the SQS partial batch response shape, listing only the
+records whose PR could not be written so only those messages are retried.
+"""
+
+import json
+import copy
+import time
+from collections import defaultdict
+from datetime import datetime
+from decimal import Decimal
+from botocore.exceptions import ClientError
+from metrics_processor_storage import (
+    extract_pr_base_info,
+    create_pr_base_item,
+    calculate_cycle_time_hours,
+    format_cycle_time_readable,
+    get_epoch_attributes,
+    apply_review_to_item,
+    is_pr_event,
+    version_condition,
+    is_conditional_failure,
+    WRITE_CONFLICT_RETRIES,
+)
+from daily_rollups import apply_rollup_delta
+from dedup import delivery_key, seen_deliveries, recorded_keys, IdempotentTable, DuplicateDelivery
+from ingest_metrics import EventMetrics, instrument, log_payload
+from write_throttle import throttle, backoff_delay
+
+BATCH_GET_LIMIT = 100
+MAX_UNPROCESSED_RETRIES = 3
+
+
+def parse_record(record, index):
+    """Return (record_id, delivery_id, detail_type, payload) for an SQS or EventBridge record"""
+    record_id = record.get("messageId") or record.get("id") or str(index)
+    event = record
+    if "body" in record:
+        event = json.loads(record["body"]) if isinstance(record["body"], str) else record["body"]
+
+    detail_type = event.get("detail-type") or event.get("detail_type") or ""
+    payload = event.get("detail", {})
+    if isinstance(payload, str):
+        payload = json.loads(payload)
+    # The EventBridge event id survives being re-sent through SQS; the message id is the fallback
+    delivery_id = event.get("id") or record.get("messageId")
+    return record_id, delivery_id, detail_type, payload
+
+
+def event_time(detail_type, payload):
+    """Best available time of the change an event describes, used to order a PR's events"""
+    if detail_type == "pull_request_review":
+        return payload.get("review", {}).get("submitted_at") or ""
+    return payload.get("pull_request", {}).get("updated_at") or ""
+
+
+def fold_pr_event(item, pr_info, timestamp):
+    """Apply one pull_request event to the in-memory item (None = not stored)"""
+    pr = pr_info["pr"]
+    action = pr_info["action"]
+
+    if action == "converted_to_draft":
+        return None
+
+    if action == "synchronize":
+        if item is not None and item.get("State") == "Changes Requested":
+            item["State"] = "Review in Progress"
+            item["event_timestamp"] = timestamp
+        return item
+
+    if action not in ["opened", "reopened", "ready_for_review", "closed"] or pr.get("draft", False):
+        return item
+
+    if item is None:
+        return create_pr_base_item(pr_info, action, timestamp)
+
+    if action == "closed" and pr.get("merged"):
+        merged_at = pr.get("merged_at")
+        cycle_time_hours = calculate_cycle_time_hours(item.get("ReviewRequestedTime"), merged_at)
+        merged_by_user = pr.get("merged_by", {})
+        item.update({
+            "MergedDate": merged_at,
+            "CycleTimeHours": Decimal(str(cycle_time_hours)),
+            "CycleTimeDisplay": format_cycle_time_readable(cycle_time_hours),
+            "State": "Merged",
+            "merged_by": merged_by_user.get("login") if merged_by_user else "",
+        })
+        item.update(get_epoch_attributes({"CreatedDate": item.get("CreatedDate"), "MergedDate": merged_at}))
+    elif action == "closed":
+        item["State"] = "Closed"
+
+    item["event_timestamp"] = timestamp
+    item["action"] = action
+    return item
+
+
+def group_events(records):
+    """Parse records and group the relevant ones by PR_ID, ordered by event time"""
+    events_by_pr = defaultdict(list)
+    keys = set()
+    for index, record in enumerate(records):
+        try:
+            record_id, delivery_id, detail_type, payload = parse_record(record, index)
+        except Exception as e:
+            # A malformed message will never parse; retrying it would only block the queue
+            print(f"Skipping unparseable record {index}: {e}")
+            continue
+        if not is_pr_event(detail_type):
+            continue
+        key = delivery_key(delivery_id, detail_type, json.dumps(payload, sort_keys=True))
+        if key in keys:
+            print(f"Skipping repeated record {record_id} in batch")
+            continue
+        keys.add(key)
+        log_payload(payload)
+        pr_info = extract_pr_base_info(payload, detail_type)
+        events_by_pr[pr_info["pr_id"]].append({
+            "record_id": record_id,
+            "key": key,
+            "detail_type": detail_type,
+            "payload": payload,
+            "pr_info": pr_info,
+            "order": (event_time(detail_type, payload), index),
+        })
+
+    for events in events_by_pr.values():
+        events.sort(key=lambda event: event["order"])
+    return events_by_pr
+
+
+def batch_get_items(table, pr_ids):
+    """Load existing items for pr_ids; returns ({pr_id: item}, failed_pr_ids)"""
+    client = table.meta.client
+    found = {}
+    failed = set()
+    pr_ids = list(pr_ids)
+    for start in range(0, len(pr_ids), BATCH_GET_LIMIT):
+        # Writes are conditional on these items, so the read must not be stale
+        request = {table.name: {"Keys": [{"PR_ID": pr_id} for pr_id in pr_ids[start:start + BATCH_GET_LIMIT]], "ConsistentRead": True}}
+        try:
+            for attempt in range(MAX_UNPROCESSED_RETRIES + 1):
+                response = client.batch_get_item(RequestItems=request)
+                for item in response.get("Responses", {}).get(table.name, []):
+                    found[item["PR_ID"]] = item
+                request = response.get("UnprocessedKeys") or {}
+                if not request or attempt == MAX_UNPROCESSED_RETRIES:
+                    break
+                time.sleep(backoff_delay(attempt))
+            for key in request.get(table.name, {}).get("Keys", []):
+                failed.add(key["PR_ID"])
+        except Exception as e:
+            print(f"Error loading PR batch: {e}")
+            failed.update(pr_ids[start:start + BATCH_GET_LIMIT])
+    return found, failed
+
+
+def fold_events(item, events, timestamp):
+    """Final item state after a PR's events, in order (None = not stored)"""
+    item = copy.deepcopy(item)
+    for event in events:
+        if event["detail_type"] == "pull_request":
+            item = fold_pr_event(item, event["pr_info"], timestamp)
+        else:
+            item = apply_review_to_item(item, event["pr_info"], event["payload"].get("review", {}), timestamp)
+    return item
+
+
+def update_changed_attributes(table, pr_id, before, after):
+    """
+    One UpdateItem moving the stored item from before to after, conditional on the
+    item still being before. String sets that only grew get ADD for their new
+    members; other changed attributes are SET, and attributes after lacks (a PR
+    folded back out of draft) are removed.
+    """
+    changed = {}
+    added = {}
+    for name, value in after.items():
+        if name == "PR_ID" or before.get(name) == value:
+            continue
+        previous = before.get(name)
+        if isinstance(value, (set, frozenset)) and isinstance(previous, (set, frozenset)) and previous <= value:
+            added[name] = set(value) - previous
+        else:
+            changed[name] = value
+    removed = [name for name in before if name not in after]
+    if not changed and not added and not removed:
+        return
+
+    condition, values = version_condition(before)
+    names = {}
+    clauses = []
+    for prefix, attributes in (("a", changed), ("s", added)):
+        for i, (name, value) in enumerate(attributes.items()):
+            names[f"#{prefix}{i}"] = name
+            values[f":{prefix}{i}"] = value
+    for i, name in enumerate(removed):
+        names[f"#r{i}"] = name
+    if changed:
+        clauses.append("SET " + ", ".join(f"#a{i} = :a{i}" for i in range(len(changed))))
+    if added:
+        clauses.append("ADD " + ", ".join(f"#s{i} :s{i}" for i in range(len(added))))
+    if removed:
+        clauses.append("REMOVE " + ", ".join(f"#r{i}" for i in range(len(removed))))
+    # A REMOVE-only change on an item without event_timestamp has no values, and
+    # DynamoDB rejects an empty ExpressionAttributeValues
+    table.update_item(
+        Key={"PR_ID": pr_id},
+        UpdateExpression=" ".join(clauses),
+        ExpressionAttributeNames=names,
+        ConditionExpression=condition,
+        **({"ExpressionAttributeValues": values} if values else {})
+    )
+
+
+def write_final_state(table, pr_id, before, after):
+    """The single conditional write that takes the stored PR from before to after"""
+    if before is None:
+        if after is not None:
+            table.put_item(Item=after, ConditionExpression="attribute_not_exists(PR_ID)")
+    elif after is None:
+        condition, values = version_condition(before)
+        table.delete_item(Key={"PR_ID": pr_id}, ConditionExpression=condition, **({"ExpressionAttributeValues": values} if values else {}))
+    else:
+        update_changed_attributes(table, pr_id, before, after)
+
+
+def write_pr(table, rollup_table, dedup_table, pr_id, before, events, timestamp):
+    """
+    Fold a PR's events onto before and write the result, committed together with its
+    rollup delta and its events' dedup records. A concurrent change fails the write's
+    condition; the PR is then re-read and folded again. Returns True once written.
+    """
+    for attempt in range(WRITE_CONFLICT_RETRIES + 1):
+        after = fold_events(before, events, timestamp)
+        guarded = IdempotentTable(table, dedup_table, [event["key"] for event in events], rollup_table)
+        apply_rollup_delta(guarded.rollups, before, after)
+        try:
+            write_final_state(guarded, pr_id, before, after)
+            return True
+        except DuplicateDelivery:
+            # Another container applied some of these events; fold only the rest
+            recorded = recorded_keys(dedup_table, [event["key"] for event in events])
+            events = [event for event in events if event["key"] not in recorded]
+            if not events:
+                return True
+        except ClientError as e:
+            if not is_conditional_failure(e):
+                raise
+        print(f"PR {pr_id} changed since it was read, folding its events again")
+        before = table.get_item(Key={"PR_ID": pr_id}, ConsistentRead=True).get("Item")
+    return False
+
+
+def store_events_batch(records, table, rollup_table=None, dedup_table=None):
+    """Process a batch of webhook records; returns {"batchItemFailures": [...]}"""
+    metrics = EventMetrics(DetailType="batch")
+    try:
+        return process_batch(
+            records,
+            throttle(instrument(table, metrics), metrics),
+            throttle(instrument(rollup_table, metrics), metrics),
+            throttle(instrument(dedup_table, metrics), metrics),
+            metrics,
+        )
+    finally:
+        metrics.emit()
+
+
+def process_batch(records, table, rollup_table, dedup_table, metrics):
+    with metrics.timer("Parse"):
+        events_by_pr = group_events(records)
+    with metrics.timer("Dedup"):
+        keys = [event["key"] for events in events_by_pr.values() for event in events]
+        duplicates = {key for key in keys if key in seen_deliveries} | recorded_keys(dedup_table, keys)
+        if duplicates:
+            print(f"Dropping {len(duplicates)} duplicate deliveries")
+            metrics.add("DuplicateDeliveries", len(duplicates))
+        pending = {}
+        for pr_id, events in events_by_pr.items():
+            events = [event for event in events if event["key"] not in duplicates]
+            if events:
+                pending[pr_id] = events
+    with metrics.timer("Load"):
+        existing, failed_prs = batch_get_items(table, pending.keys())
+    timestamp = datetime.utcnow().isoformat()
+
+    with metrics.timer("Write"):
+        for pr_id, events in pending.items():
+            if pr_id in failed_prs:
+                continue
+            try:
+                written = write_pr(table, rollup_table, dedup_table, pr_id, existing.get(pr_id), events, timestamp)
+            except Exception as e:
+                print(f"Error writing PR {pr_id}: {e}")
+                written = False
+            if not written:
+                failed_prs.add(pr_id)
+                continue
+            print(f"Coalesced {len(events)} events for PR {pr_id}")
+            for event in events:
+                seen_deliveries.add(event["key"])
+
+    failures = [
+        {"itemIdentifier": event["record_id"]}
+        for pr_id in failed_prs
+        for event in events_by_pr.get(pr_id, [])
+    ]
+    metrics.add("Records", len(records))
+    metrics.add("PRs", len(events_by_pr))
+    metrics.add("FailedRecords", len(failures))
+    print(f"Processed {len(records)} records for {len(events_by_pr)} PRs; {len(failures)} failed")
+    return {"batchItemFailures": failures}
@@ -0,0 +1,394 @@
+"""
+Bulk import of historical PRs from exported GitHub archives.
+
+Reads PR and review objects as returned by the GitHub REST API (`/pulls`,
+`/pulls/{number}/reviews`) from .json / .ndjson / .jsonl files (optionally .gz).
+A .json file may hold one object, a list, or {"pull_requests": [...], "reviews": [...]};
+PR objects may also embed their reviews under "reviews".
+
+Items are built with the same functions the webhook handlers use, so imported rows
+match webhook-written ones:
+- create_pr_base_item
+- apply_review_to_item for each review, in submitted order
+- the merged/closed update
+Draft PRs are skipped, as the webhook path does.
+
+Pipeline:
+1. Parse archives on a process pool.
+2. Join reviews to their PRs and build items on the pool.
+3. Write with parallel TransactWriteItems workers. Each transaction puts a group of
+   PRs with attribute_not_exists(PR_ID), together with the group's summed rollup
+   updates. A PR that is already stored (written by the webhook path, or by an
+   earlier run) is left as it is and adds nothing to the rollups; the group is
+   retried without it.
+4. After every committed transaction, append its PR_IDs to the checkpoint file.
+A rerun with the same checkpoint skips everything already written. Since the puts and
+rollups commit together and the puts are conditional, a rerun after a crash between a
+commit and its checkpoint cannot count a PR twice.
+
+Usage:
+    python bulk_import.py --table pr-metrics [--rollup-table pr-daily-rollups] \\
+        [--checkpoint import.ckpt] [--processes 4] [--writers 8] [--endpoint-url URL | --sqlite metrics.db] PATH [PATH ...]
+"""
+
+import os
+import re
+import json
+import gzip
+import time
+import argparse
+import threading
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime
+import boto3
+from metrics_processor_storage import apply_review_to_item
+from batch_ingest import fold_pr_event
+from daily_rollups import rollup_contribution, add_to_rollup, reviewer_contributions, add_to_reviewer_rollup
+from dedup import StagedTable, transact_item, TRANSACT_MAX_ITEMS
+from write_throttle import classify_error, backoff_delay
+from botocore.exceptions import ClientError
+
+ARCHIVE_SUFFIXES = (".json", ".ndjson", ".jsonl")
+PULL_URL = re.compile(r"/repos/[^/]+/([^/]+)/pulls/(\d+)")
+MAX_WRITE_ATTEMPTS = 6
+BUILD_CHUNK_SIZE = 2000
+
+# PR fields kept after parsing; everything else in an export is dropped before pickling
+PR_FIELDS = ("number", "created_at", "updated_at", "merged_at", "closed_at", "state", "draft", "html_url")
+
+
+def find_archives(paths):
+    """Expand directories into the archive files they contain"""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, names in os.walk(path):
+                files.extend(os.path.join(root, name) for name in sorted(names) if is_archive(name))
+        else:
+            files.append(path)
+    return sorted(files)
+
+
+def is_archive(name):
+    return name.removesuffix(".gz").endswith(ARCHIVE_SUFFIXES)
+
+
+def iter_records(path):
+    """Yield every JSON object in an archive file"""
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rt", encoding="utf-8") as f:
+        if path.removesuffix(".gz").endswith(".json"):
+            data = json.load(f)
+            if isinstance(data, dict) and ("pull_requests" in data or "reviews" in data):
+                yield from data.get("pull_requests", [])
+                yield from data.get("reviews", [])
+            elif isinstance(data, list):
+                yield from data
+            else:
+                yield data
+        else:
+            for line in f:
+                line = line.strip()
+                if line:
+                    yield json.loads(line)
+
+
+def repo_of(pr):
+    """Repository object of a PR (name, language), falling back to its URL"""
+    repo = (pr.get("base") or {}).get("repo") or pr.get("repository") or {}
+    if repo.get("name"):
+        return {"name": repo["name"], "language": repo.get("language") or "Unknown"}
+    match = PULL_URL.search(pr.get("url") or "") or re.search(r"github\.com/[^/]+/([^/]+)/pull/", pr.get("html_url") or "")
+    return {"name": match.group(1) if match else None, "language": "Unknown"}
+
+
+def review_pr_id(review):
+    """PR_ID ("<repo>_<number>") a standalone review belongs to, or None"""
+    match = PULL_URL.search(review.get("pull_request_url") or "")
+    if match:
+        return f"{match.group(1)}_{match.group(2)}"
+    if review.get("repository") and review.get("pr_number"):
+        return f"{review['repository']}_{review['pr_number']}"
+    return None
+
+
+def compact_pr(record):
+    """The parts of an exported PR the item builders read, with nulls replaced by defaults"""
+    pr = {name: record.get(name) for name in PR_FIELDS}
+    pr["user"] = {"login": (record.get("user") or {}).get("login")}
+    pr["merged_by"] = {"login": (record.get("merged_by") or {}).get("login")} if record.get("merged_by") else {}
+    pr["head"] = {"ref": (record.get("head") or {}).get("ref") or ""}
+    pr["base"] = {"ref": (record.get("base") or {}).get("ref")}
+    pr["additions"] = record.get("additions") or 0
+    pr["deletions"] = record.get("deletions") or 0
+    return pr
+
+
+def compact_review(review):
+    return {
+        "state": (review.get("state") or "").lower(),
+        "user": {"login": (review.get("user") or {}).get("login")},
+        "submitted_at": review.get("submitted_at"),
+    }
+
+
+def parse_archive(path):
+    """Worker: return (prs, reviews, errors) where prs are (pr_id, pr, repo) and reviews (pr_id, review)"""
+    prs = []
+    reviews = []
+    errors = 0
+    try:
+        for record in iter_records(path):
+            if not isinstance(record, dict):
+                errors += 1
+            elif "head" in record or "base" in record:
+                repo = repo_of(record)
+                pr_id = f"{repo['name']}_{record.get('number')}"
+                prs.append((pr_id, compact_pr(record), repo))
+                for review in record.get("reviews") or []:
+                    reviews.append((pr_id, compact_review(review)))
+            elif "submitted_at" in record:
+                pr_id = review_pr_id(record)
+                if pr_id:
+                    reviews.append((pr_id, compact_review(record)))
+                else:
+                    errors += 1
+    except (OSError, ValueError) as e:
+        print(f"Failed to read {path}: {e}")
+        errors += 1
+    return prs, reviews, errors
+
+
+def last_activity(pr, timestamp):
+    """When the PR last changed on GitHub, in event_timestamp's format; timestamp if unknown"""
+    for name in ("updated_at", "closed_at", "merged_at"):
+        if pr.get(name):
+            return pr[name].rstrip("Z")
+    return timestamp
+
+
+def build_item(pr_id, pr, repo, reviews, timestamp):
+    """Build the stored item for one historical PR, or None for drafts"""
+    if pr.get("draft"):
+        return None
+    pr_info = {
+        "pr": pr,
+        "repo": repo,
+        "pr_number": pr.get("number"),
+        "pr_id": pr_id,
+        "action": "opened",
+        "sender": (pr.get("user") or {}).get("login"),
+    }
+    pr_opened = dict(pr, state="open")
+    item = fold_pr_event(None, dict(pr_info, pr=pr_opened), timestamp)
+
+    for review in sorted(reviews, key=lambda r: r.get("submitted_at") or ""):
+        if review["state"] not in ("approved", "changes_requested", "commented", "dismissed"):
+            continue
+        item = apply_review_to_item(item, dict(pr_info, action="submitted"), review, review.get("submitted_at") or timestamp)
+
+    if pr.get("state") == "closed":
+        item = fold_pr_event(item, dict(pr_info, action="closed", pr=dict(pr, merged=bool(pr.get("merged_at")))), timestamp)
+    # The import time would keep every imported PR out of the cold tier for its first month
+    item["event_timestamp"] = last_activity(pr, timestamp)
+    return item
+
+
+def build_items(chunk, timestamp):
+    """Worker: build items for a chunk of (pr_id, pr, repo, reviews)"""
+    items = []
+    for pr_id, pr, repo, reviews in chunk:
+        item = build_item(pr_id, pr, repo, reviews, timestamp)
+        if item is not None:
+            items.append(item)
+    return items
+
+
+class Checkpoint:
+    """Append-only file of PR_IDs that are stored (imported, or found already present)"""
+
+    def __init__(self, path):
+        self.path = path
+        self.done = set()
+        self.lock = threading.Lock()
+        if path and os.path.exists(path):
+            with open(path) as f:
+                self.done = {line.strip() for line in f if line.strip()}
+        self.file = open(path, "a") if path else None
+
+    def record(self, pr_ids):
+        if not self.file:
+            return
+        with self.lock:
+            self.file.write("".join(f"{pr_id}\n" for pr_id in pr_ids))
+            self.file.flush()
+
+    def close(self):
+        if self.file:
+            self.file.close()
+
+
+def transact_group(client, table_name, rollup_table, items):
+    """
+    Put items with attribute_not_exists(PR_ID) and ADD their summed rollup updates in
+    one transaction, halving the group while it exceeds TRANSACT_MAX_ITEMS.
+    Returns (created, existing); existing PRs are not written and not counted.
+    """
+    updates = []
+    if rollup_table is not None:
+        staged = StagedTable(rollup_table)
+        apply_rollups(staged, items)
+        updates = staged.take()
+    if len(items) + len(updates) > TRANSACT_MAX_ITEMS and len(items) > 1:
+        middle = len(items) // 2
+        first = transact_group(client, table_name, rollup_table, items[:middle])
+        second = transact_group(client, table_name, rollup_table, items[middle:])
+        return first[0] + second[0], first[1] + second[1]
+
+    actions = [
+        {"Put": {"TableName": table_name, "Item": item, "ConditionExpression": "attribute_not_exists(PR_ID)"}}
+        for item in items
+    ]
+    actions += [transact_item("update_item", rollup_table.name, update) for update in updates]
+    for attempt in range(MAX_WRITE_ATTEMPTS):
+        try:
+            client.transact_write_items(TransactItems=actions)
+            return items, []
+        except ClientError as e:
+            kind = classify_error(e)
+            if kind == "conditional":
+                reasons = e.response.get("CancellationReasons") or []
+                stored = {items[i]["PR_ID"] for i, reason in enumerate(reasons[:len(items)]) if reason.get("Code") == "ConditionalCheckFailed"}
+                if not stored:
+                    raise
+                existing = [item for item in items if item["PR_ID"] in stored]
+                remaining = [item for item in items if item["PR_ID"] not in stored]
+                created, also_existing = transact_group(client, table_name, rollup_table, remaining) if remaining else ([], [])
+                return created, existing + also_existing
+            if kind != "throttle" or attempt + 1 == MAX_WRITE_ATTEMPTS:
+                raise
+            time.sleep(backoff_delay(attempt))
+
+
+def apply_rollups(rollup_table, items):
+    """Add the batch's rollup and reviewer contributions, summed per row"""
+    totals = defaultdict(dict)
+    for item in items:
+        contribution = rollup_contribution(item)
+        if contribution is None:
+            continue
+        key, counters = contribution
+        row = totals[key]
+        for name, value in counters.items():
+            row[name] = row.get(name, 0) + value
+    for key, counters in totals.items():
+        add_to_rollup(rollup_table, key, counters)
+
+    reviewer_totals = defaultdict(lambda: ({}, set()))
+    for item in items:
+        contribution = reviewer_contributions(item)
+        if contribution is None:
+            continue
+        day, repo, per_reviewer = contribution
+        for login, counters in per_reviewer.items():
+            row, repos = reviewer_totals[(day, login)]
+            for name, value in counters.items():
+                row[name] = row.get(name, 0) + value
+            if "review_count" in counters:
+                repos.add(repo)
+    for (day, login), (counters, repos) in reviewer_totals.items():
+        add_to_reviewer_rollup(rollup_table, day, login, counters, repos)
+
+
+def write_items(table, items, checkpoint, rollup_table=None, writers=8):
+    """Write items with parallel TransactWriteItems workers; returns (written, existing, failed)"""
+    client = table.meta.client
+    groups = [items[start:start + TRANSACT_MAX_ITEMS] for start in range(0, len(items), TRANSACT_MAX_ITEMS)]
+
+    def write(group):
+        try:
+            created, existing = transact_group(client, table.name, rollup_table, group)
+        except Exception as e:
+            print(f"Transaction failed: {e}")
+            return 0, 0, len(group)
+        checkpoint.record(item["PR_ID"] for item in created + existing)
+        return len(created), len(existing), 0
+
+    written = existing = failed = 0
+    with ThreadPoolExecutor(max_workers=max(1, writers)) as pool:
+        for group_written, group_existing, group_failed in pool.map(write, groups):
+            written += group_written
+            existing += group_existing
+            failed += group_failed
+    return written, existing, failed
+
+
+def run_import(paths, table, rollup_table=None, checkpoint_path=None, processes=None, writers=8):
+    """Import every archive under paths; returns a stats dict"""
+    started = time.perf_counter()
+    files = find_archives(paths)
+    checkpoint = Checkpoint(checkpoint_path)
+    timestamp = datetime.utcnow().isoformat()
+    stats = {"files": len(files), "prs": 0, "reviews": 0, "parse_errors": 0, "skipped": 0, "written": 0, "existing": 0, "failed": 0}
+
+    try:
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            prs = {}
+            reviews = defaultdict(list)
+            for file_prs, file_reviews, errors in pool.map(parse_archive, files):
+                stats["parse_errors"] += errors
+                stats["reviews"] += len(file_reviews)
+                for pr_id, pr, repo in file_prs:
+                    prs[pr_id] = (pr, repo)
+                for pr_id, review in file_reviews:
+                    reviews[pr_id].append(review)
+            stats["prs"] = len(prs)
+
+            pending = [
+                (pr_id, pr, repo, reviews.get(pr_id, []))
+                for pr_id, (pr, repo) in prs.items()
+                if pr_id not in checkpoint.done
+            ]
+            stats["skipped"] = len(prs) - len(pending)
+            chunks = [pending[start:start + BUILD_CHUNK_SIZE] for start in range(0, len(pending), BUILD_CHUNK_SIZE)]
+            items = []
+            for chunk_items in pool.map(build_items, chunks, [timestamp] * len(chunks)):
+                items.extend(chunk_items)
+
+        stats["written"], stats["existing"], stats["failed"] = write_items(table, items, checkpoint, rollup_table, writers)
+    finally:
+        checkpoint.close()
+
+    elapsed = time.perf_counter() - started
+    stats["seconds"] = round(elapsed, 2)
+    stats["prs_per_minute"] = round(stats["written"] / elapsed * 60) if elapsed else 0
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import historical PRs from exported GitHub archives")
+    parser.add_argument("paths", nargs="+", help="Archive files or directories")
+    parser.add_argument("--table", required=True, help="DynamoDB table name")
+    parser.add_argument("--rollup-table", help="Daily rollup table to update (only for PRs not already stored)")
+    parser.add_argument("--checkpoint", help="File recording written PR_IDs so an interrupted import can resume")
+    parser.add_argument("--processes", type=int, help="Parser processes (default: CPU count)")
+    parser.add_argument("--writers", type=int, default=8, help="Parallel TransactWriteItems workers")
+    parser.add_argument("--endpoint-url", help="Override the DynamoDB endpoint (e.g. DynamoDB Local)")
+    parser.add_argument("--sqlite", metavar="PATH", help="Import into a local SQLite database instead; missing tables are created")
+    args = parser.parse_args()
+
+    if args.sqlite:
+        from sqlite_backend import SQLiteResource, create_pipeline_tables
+        dynamodb = SQLiteResource(args.sqlite)
+        create_pipeline_tables(dynamodb, table=args.table, rollup_table=args.rollup_table)
+    else:
+        dynamodb = boto3.resource("dynamodb", endpoint_url=args.endpoint_url)
+    table = dynamodb.Table(args.table)
+    rollup_table = dynamodb.Table(args.rollup_table) if args.rollup_table else None
+    stats = run_import(args.paths, table, rollup_table, args.checkpoint, args.processes, args.writers)
+    print(f"Import complete: {stats}")
+
+
+if __name__ == "__main__":
+    main()
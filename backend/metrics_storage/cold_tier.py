@@ -0,0 +1,356 @@
+"""
+Cold tier: monthly Parquet segments for merged PRs that no longer change.
+
+Merged PRs whose last event (event_timestamp) is older than a cutoff are compacted out of the hot table into compressed Parquet files, one new
+segment per month per run:
+
+    <COLD_TIER_DIR>/<table>/CreatedMonth=YYYY-MM/part-<run>.parquet
+
+Rows in a segment are sorted by CreatedDate, so row-group statistics let a date
+range skip most of a file. The metrics service reads the months in a request's
+range with column pushdown (the aggregator's REQUIRED_ATTRIBUTES) and predicate
+pushdown (CreatedDate range, Squad, TechStack) and merges them with the live
+rows from the hot table. A PR present in both tiers is served from the hot one.
+Closed PRs stay hot: they can be reopened, and a reopened PR must keep its history
+and reviewers instead of being rebuilt from the reopen event.
+
+Compaction writes each segment before deleting the rows it holds. Each delete
+is conditional on the State and event_timestamp that were compacted, so a row
+updated in the meantime stays hot. The daily rollups are left untouched, since
+they still count compacted PRs.
+
+pyarrow is only needed where the cold tier is used; without it pyarrow_available()
+is False and COLD_TIER_DIR must stay unset.
+
+Usage:
+    python cold_tier.py --table pr-metrics --cold-dir /mnt/cold [--older-than-days 30] [--segments 4] [--dry-run]
+"""
+
+import os
+import json
+import time
+import uuid
+import argparse
+from decimal import Decimal
+from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = ds = pq = None
+
+COLD_TIER_MIN_AGE_DAYS = int(os.environ.get("COLD_TIER_MIN_AGE_DAYS", "30"))
+COLD_ROW_GROUP_SIZE = int(os.environ.get("COLD_ROW_GROUP_SIZE", "10000"))
+COLD_TIER_COMPRESSION = os.environ.get("COLD_TIER_COMPRESSION", "zstd")
+COLD_READ_WORKERS = int(os.environ.get("COLD_READ_WORKERS", "4"))
+
+# States after which handle_pr_creation_or_update no longer changes a PR ("Closed" can be reopened)
+COMPACTABLE_STATES = ("Merged",)
+# Schema metadata key holding {column: kind}; kinds restore Python types on read
+KINDS_METADATA_KEY = b"cold_tier.kinds"
+MONTH_DIR_PREFIX = "CreatedMonth="
+INT64_MIN, INT64_MAX = -2 ** 63, 2 ** 63 - 1
+
+
+def pyarrow_available():
+    return pq is not None
+
+
+def require_pyarrow():
+    if pq is None:
+        raise RuntimeError("The cold tier needs pyarrow (pip install pyarrow)")
+
+
+def _json_default(obj):
+    if isinstance(obj, Decimal):
+        return int(obj) if obj % 1 == 0 else float(obj)
+    if isinstance(obj, (set, frozenset)):
+        return sorted(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def _is_number(value):
+    return isinstance(value, (int, float, Decimal)) and not isinstance(value, bool)
+
+
+def _is_int64(value):
+    if isinstance(value, float):
+        return value.is_integer() and INT64_MIN <= value <= INT64_MAX
+    return value % 1 == 0 and INT64_MIN <= value <= INT64_MAX
+
+
+def column_kind(values):
+    """Storage kind for one attribute's values (None where a row lacks it)"""
+    present = [value for value in values if value is not None]
+    if all(isinstance(value, bool) for value in present):
+        return "bool"
+    if all(_is_number(value) for value in present):
+        return "int" if all(_is_int64(value) for value in present) else "float"
+    if all(isinstance(value, str) for value in present):
+        return "string"
+    if all(isinstance(value, (set, frozenset)) and all(isinstance(v, str) for v in value) for value in present):
+        return "set"
+    if all(isinstance(value, list) and all(isinstance(v, str) for v in value) for value in present):
+        return "list"
+    # Maps, mixed types (e.g. Reviewers as a list on some rows and a JSON string on others)
+    return "json"
+
+
+def arrow_type(kind):
+    if kind in ("set", "list"):
+        return pa.list_(pa.string())
+    return {"bool": pa.bool_(), "int": pa.int64(), "float": pa.float64()}.get(kind, pa.string())
+
+
+ENCODERS = {
+    "bool": bool,
+    "int": int,
+    "float": float,
+    "string": str,
+    "set": sorted,
+    "list": list,
+    "json": lambda value: json.dumps(value, default=_json_default),
+}
+
+DECODERS = {
+    # Whole numbers in a fractional column come back as int, as Decimals would serialize
+    "float": lambda value: int(value) if value.is_integer() else value,
+    "set": set,
+    "json": json.loads,
+}
+
+
+def items_to_table(items):
+    """Arrow table for DynamoDB items; Decimals become int64/float64 so reads skip Decimal entirely"""
+    require_pyarrow()
+    names = list(dict.fromkeys(name for item in items for name in item))
+    arrays = []
+    kinds = {}
+    for name in names:
+        values = [item.get(name) for item in items]
+        kind = kinds[name] = column_kind(values)
+        encode = ENCODERS[kind]
+        arrays.append(pa.array([None if value is None else encode(value) for value in values], type=arrow_type(kind)))
+    schema = pa.schema([pa.field(name, array.type) for name, array in zip(names, arrays)],
+                       metadata={KINDS_METADATA_KEY: json.dumps(kinds).encode()})
+    return pa.Table.from_arrays(arrays, schema=schema)
+
+
+def table_to_items(table):
+    """Items from an Arrow table, without the attributes a row did not have"""
+    metadata = table.schema.metadata or {}
+    kinds = json.loads(metadata.get(KINDS_METADATA_KEY, b"{}"))
+    columns = []
+    for name in table.column_names:
+        values = table.column(name).to_pylist()
+        decode = DECODERS.get(kinds.get(name))
+        if decode:
+            values = [None if value is None else decode(value) for value in values]
+        columns.append((name, values))
+
+    items = []
+    for row in range(table.num_rows):
+        item = {}
+        for name, values in columns:
+            value = values[row]
+            if value is not None:
+                item[name] = value
+        items.append(item)
+    return items
+
+
+def month_of(item):
+    return item.get("CreatedMonth") or item["CreatedDate"][:7]
+
+
+def table_dir(root, table_name):
+    return os.path.join(root, table_name)
+
+
+def write_segment(root, table_name, month, items, run_id):
+    """Write one month's rows as a new segment; the file appears atomically"""
+    directory = os.path.join(table_dir(root, table_name), MONTH_DIR_PREFIX + month)
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"part-{run_id}.parquet")
+    rows = sorted(items, key=lambda item: (item["CreatedDate"], str(item["PR_ID"])))
+    temp_path = path + ".tmp"
+    pq.write_table(items_to_table(rows), temp_path, compression=COLD_TIER_COMPRESSION, row_group_size=COLD_ROW_GROUP_SIZE)
+    os.replace(temp_path, path)
+    return path
+
+
+def segment_paths(root, table_name, start, end):
+    """Segment files for every month between two ISO timestamps, oldest run first within a month"""
+    base = table_dir(root, table_name)
+    if not os.path.isdir(base):
+        return []
+    paths = []
+    for entry in sorted(os.listdir(base)):
+        month = entry[len(MONTH_DIR_PREFIX):]
+        if not entry.startswith(MONTH_DIR_PREFIX) or not start[:7] <= month <= end[:7]:
+            continue
+        directory = os.path.join(base, entry)
+        paths.extend(os.path.join(directory, name) for name in sorted(os.listdir(directory)) if name.endswith(".parquet"))
+    return paths
+
+
+def read_segment(path, start, end, squad=None, stack=None, attributes=None):
+    """Rows of one segment in the date range; only the requested columns are decoded"""
+    names = pq.read_schema(path).names
+    equalities = [(name, value) for name, value in (("Squad", squad), ("TechStack", stack)) if value]
+    if "CreatedDate" not in names or any(name not in names for name, _ in equalities):
+        return []
+
+    predicate = (ds.field("CreatedDate") >= start) & (ds.field("CreatedDate") <= end)
+    for name, value in equalities:
+        predicate &= ds.field(name) == value
+    # PR_ID is always read: rows are deduplicated and merged with the hot tier by it
+    columns = [name for name in dict.fromkeys(["PR_ID", *attributes]) if name in names] if attributes else None
+    return table_to_items(pq.read_table(path, columns=columns, filters=predicate))
+
+
+def read_cold_range(root, table_name, start, end, squad=None, stack=None, attributes=None):
+    """Return (items, stats) for the compacted PRs in a date range; attributes=None reads every column"""
+    require_pyarrow()
+    started = time.perf_counter()
+    paths = segment_paths(root, table_name, start, end)
+    if len(paths) > 1:
+        with ThreadPoolExecutor(max_workers=max(1, min(COLD_READ_WORKERS, len(paths)))) as pool:
+            parts = list(pool.map(lambda path: read_segment(path, start, end, squad, stack, attributes), paths))
+    else:
+        parts = [read_segment(path, start, end, squad, stack, attributes) for path in paths]
+
+    # A PR compacted twice (a run interrupted before its deletes) keeps its latest copy
+    rows = {}
+    for part in parts:
+        for item in part:
+            rows[item["PR_ID"]] = item
+    stats = {
+        "tier": "cold",
+        "segments": len(paths),
+        "returned_count": len(rows),
+        "wall_time_ms": round((time.perf_counter() - started) * 1000, 2),
+    }
+    return list(rows.values()), stats
+
+
+def merge_tiers(hot_items, cold_items, drop_key=False):
+    """Hot rows plus the cold rows for PRs the hot table does not hold; drop_key removes PR_ID added only for the merge"""
+    hot_ids = {item["PR_ID"] for item in hot_items}
+    items = hot_items + [item for item in cold_items if item["PR_ID"] not in hot_ids]
+    # Index reads return rows in CreatedDate order; keep that order across both tiers
+    items.sort(key=lambda item: (item.get("CreatedDate", ""), str(item["PR_ID"])))
+    if drop_key:
+        for item in items:
+            item.pop("PR_ID", None)
+    return items
+
+
+def projected_attributes(read_kwargs):
+    """Attribute names of a ProjectionExpression built with placeholders, or None for whole items"""
+    expression = read_kwargs.get("ProjectionExpression")
+    if not expression:
+        return None
+    names = read_kwargs.get("ExpressionAttributeNames", {})
+    return [names.get(part.strip(), part.strip()) for part in expression.split(",")]
+
+
+def compaction_filter(cutoff):
+    from boto3.dynamodb.conditions import Attr
+    return (
+        Attr("State").is_in(list(COMPACTABLE_STATES))
+        & Attr("event_timestamp").lt(cutoff)
+        & Attr("CreatedDate").exists()
+    )
+
+
+def scan_compactable(table, segment, total_segments, cutoff):
+    """Every merged PR in one scan segment whose last event is older than cutoff"""
+    scan_kwargs = {
+        "FilterExpression": compaction_filter(cutoff),
+        "Segment": segment,
+        "TotalSegments": total_segments,
+    }
+    items = []
+    while True:
+        response = table.scan(**scan_kwargs)
+        items.extend(response.get("Items", []))
+        last_key = response.get("LastEvaluatedKey")
+        if not last_key:
+            return items
+        scan_kwargs["ExclusiveStartKey"] = last_key
+
+
+def delete_compacted(table, item):
+    """Delete a compacted row unless it changed after it was read; returns True when deleted"""
+    from boto3.dynamodb.conditions import Attr
+    from botocore.exceptions import ClientError
+    try:
+        table.delete_item(
+            Key={"PR_ID": item["PR_ID"]},
+            ConditionExpression=Attr("State").eq(item["State"]) & Attr("event_timestamp").eq(item["event_timestamp"])
+        )
+        return True
+    except ClientError as e:
+        if e.response.get("Error", {}).get("Code") != "ConditionalCheckFailedException":
+            raise
+        print(f"PR {item['PR_ID']} changed during compaction, keeping it in the hot table")
+        return False
+
+
+def run_compaction(table, table_name, root, older_than_days=COLD_TIER_MIN_AGE_DAYS, total_segments=4, dry_run=False):
+    """Move merged PRs idle for older_than_days from the hot table into monthly segments"""
+    require_pyarrow()
+    cutoff = (datetime.utcnow() - timedelta(days=older_than_days)).isoformat()
+    with ThreadPoolExecutor(max_workers=total_segments) as pool:
+        futures = [
+            pool.submit(scan_compactable, table, segment, total_segments, cutoff)
+            for segment in range(total_segments)
+        ]
+        items = [item for future in futures for item in future.result()]
+
+    by_month = {}
+    for item in items:
+        by_month.setdefault(month_of(item), []).append(item)
+    totals = {"compacted": len(items), "months": len(by_month), "deleted": 0, "kept": 0}
+    if dry_run or not items:
+        return totals
+
+    run_id = f"{datetime.utcnow().strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:8]}"
+    for month, month_items in sorted(by_month.items()):
+        path = write_segment(root, table_name, month, month_items, run_id)
+        print(f"Wrote {len(month_items)} PRs to {path}")
+
+    with ThreadPoolExecutor(max_workers=total_segments) as pool:
+        for deleted in pool.map(lambda item: delete_compacted(table, item), items):
+            totals["deleted" if deleted else "kept"] += 1
+    return totals
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compact closed PRs into monthly Parquet segments")
+    parser.add_argument("--table", required=True, help="PR metrics table")
+    parser.add_argument("--cold-dir", default=os.environ.get("COLD_TIER_DIR"), help="Segment root directory (default COLD_TIER_DIR)")
+    parser.add_argument("--older-than-days", type=int, default=COLD_TIER_MIN_AGE_DAYS, help="Only PRs whose last event is older than this")
+    parser.add_argument("--segments", type=int, default=4, help="Parallel scan segments")
+    parser.add_argument("--dry-run", action="store_true", help="Count compactable PRs without moving them")
+    parser.add_argument("--sqlite", metavar="PATH", help="Compact a local SQLite database instead")
+    args = parser.parse_args()
+    if not args.cold_dir:
+        parser.error("--cold-dir or COLD_TIER_DIR is required")
+
+    if args.sqlite:
+        from sqlite_backend import SQLiteResource
+        table = SQLiteResource(args.sqlite).Table(args.table)
+    else:
+        import boto3
+        table = boto3.resource("dynamodb").Table(args.table)
+    totals = run_compaction(table, args.table, args.cold_dir, args.older_than_days, args.segments, args.dry_run)
+    print(f"Compaction complete: {totals}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,236 @@
+"""
+Per-day, per-repo, per-target-branch rollup counters maintained at write time.
+
+Each PR contributes to exactly one rollup row, keyed by its created day and
+"<repo>#<target branch>". Handlers pass the PR item before and after their write
+and only the difference is applied with atomic ADD, so moving a PR back to draft
+(delete) or changing its state undoes its earlier contribution.
+
+Rollup table keys: Day (partition, "YYYY-MM-DD") and RollupKey (sort, "<repo>#<branch>").
+
+The same table holds per-reviewer rows keyed "@reviewer#<login>". They count the
+reviewer's PRs, first-review response time, PRs they requested changes on, and the
+set of repos reviewed, all by the PR's created day. "@" cannot appear in a repository
+name, so these keys never collide with repo rows. Repos is a string set and only
+grows: a PR moved back to draft is subtracted from the counters but not from Repos.
+"""
+
+import json
+from datetime import datetime
+from decimal import Decimal
+from write_throttle import ThrottleExhausted
+
+ROLLUP_COUNTERS = (
+    "pr_count",
+    "merged_count",
+    "merged_size_sum",
+    "merged_size_pos_sum",
+    "merged_size_pos_count",
+    "cycle_time_sum",
+    "cycle_time_count",
+    "review_time_sum",
+    "review_time_count",
+)
+
+REVIEWER_KEY_PREFIX = "@reviewer#"
+REVIEWER_COUNTERS = (
+    "review_count",
+    "response_time_sum",
+    "response_time_count",
+    "change_request_count",
+)
+
+
+def hours_between(start_iso, end_iso):
+    """Hours between two ISO timestamps, parsed the same way the metrics service does"""
+    try:
+        start = datetime.fromisoformat(start_iso.replace("Z", ""))
+        end = datetime.fromisoformat(end_iso.replace("Z", ""))
+        return (end - start).total_seconds() / 3600.0
+    except Exception:
+        return 0
+
+
+def rollup_contribution(item):
+    """Return ((day, rollup_key, repo, branch), counters) for a PR item, or None"""
+    if not item or not item.get("CreatedDate"):
+        return None
+
+    repo = (item.get("repository") or "unknown").lower().strip()
+    branch = item.get("TargetBranch") or ""
+    key = (item["CreatedDate"][:10], f"{repo}#{branch}", repo, branch)
+    counters = {"pr_count": 1}
+
+    if (item.get("State") or "").lower() == "merged":
+        size = item.get("PR_Size", 0) or 0
+        counters["merged_count"] = 1
+        counters["merged_size_sum"] = size
+        if size > 0:
+            counters["merged_size_pos_sum"] = size
+            counters["merged_size_pos_count"] = 1
+
+        cycle_hours = hours_between(item.get("CreatedDate"), item.get("MergedDate"))
+        if cycle_hours > 0:
+            counters["cycle_time_sum"] = cycle_hours
+            counters["cycle_time_count"] = 1
+
+        review_hours = hours_between(item.get("ReviewRequestedTime"), item.get("FirstReviewTime"))
+        if review_hours > 0:
+            counters["review_time_sum"] = review_hours
+            counters["review_time_count"] = 1
+
+    return key, counters
+
+
+def to_decimal(value):
+    if isinstance(value, float):
+        return Decimal(str(round(value, 6)))
+    return Decimal(value)
+
+
+def add_to_rollup(rollup_table, key, counters):
+    """Atomically ADD counters to one rollup row, creating it when needed"""
+    counters = {name: value for name, value in counters.items() if value}
+    if not counters:
+        return
+
+    day, rollup_key, repo, branch = key
+    names = {"#r": "repository", "#b": "TargetBranch"}
+    values = {":repo": repo, ":branch": branch}
+    additions = []
+    for i, (name, value) in enumerate(counters.items()):
+        names[f"#c{i}"] = name
+        values[f":c{i}"] = to_decimal(value)
+        additions.append(f"#c{i} :c{i}")
+
+    try:
+        rollup_table.update_item(
+            Key={"Day": day, "RollupKey": rollup_key},
+            UpdateExpression="SET #r = :repo, #b = :branch ADD " + ", ".join(additions),
+            ExpressionAttributeNames=names,
+            ExpressionAttributeValues=values
+        )
+    except ThrottleExhausted:
+        # Dropping the delta would leave the rollup off for good; let the event be retried
+        raise
+    except Exception as e:
+        print(f"Error updating rollup {day} {rollup_key}: {e}")
+
+
+def apply_rollup_delta(rollup_table, before_item, after_item):
+    """Move a PR's rollup and reviewer contributions from its previous state to its new state"""
+    if rollup_table is None:
+        return
+
+    before = rollup_contribution(before_item)
+    after = rollup_contribution(after_item)
+
+    if before and after and before[0] == after[0]:
+        delta = {
+            name: after[1].get(name, 0) - before[1].get(name, 0)
+            for name in ROLLUP_COUNTERS
+        }
+        add_to_rollup(rollup_table, after[0], delta)
+    else:
+        if before:
+            add_to_rollup(rollup_table, before[0], {name: -value for name, value in before[1].items()})
+        if after:
+            add_to_rollup(rollup_table, after[0], after[1])
+
+    apply_reviewer_delta(rollup_table, before_item, after_item)
+
+
+def decode_names(value):
+    """Reviewer lists may be stored as a list, a string set or a JSON-encoded string"""
+    if isinstance(value, str):
+        try:
+            value = json.loads(value)
+        except ValueError:
+            return set()
+    return set(value or ())
+
+
+def first_listed(item):
+    """First name of the legacy Reviewers list, else the alphabetically first ReviewerSet entry"""
+    listed = item.get("Reviewers")
+    if isinstance(listed, str):
+        try:
+            listed = json.loads(listed)
+        except ValueError:
+            listed = None
+    if listed:
+        return listed[0]
+    return min(item.get("ReviewerSet") or (), default=None)
+
+
+def reviewer_contributions(item):
+    """Return (day, repo, {login: counters}) for a PR item, or None"""
+    if not item or not item.get("CreatedDate"):
+        return None
+
+    reviewers = decode_names(item.get("Reviewers")) | decode_names(item.get("ReviewerSet"))
+    per_reviewer = {login: {"review_count": 1} for login in reviewers}
+
+    # Same rule as the metrics service: only PRs that left the open state, credited to the first reviewer
+    first_reviewer = item.get("FirstReviewer") or (first_listed(item) if reviewers else None)
+    if (first_reviewer and (item.get("State") or "").lower() != "open"
+            and item.get("ReviewRequestedTime") and item.get("FirstReviewTime")):
+        hours = hours_between(item["ReviewRequestedTime"], item["FirstReviewTime"])
+        if hours >= 0:
+            counters = per_reviewer.setdefault(first_reviewer, {})
+            counters["response_time_sum"] = hours
+            counters["response_time_count"] = 1
+
+    for login in decode_names(item.get("ChangeRequestors")) | decode_names(item.get("ChangeRequestorSet")):
+        per_reviewer.setdefault(login, {})["change_request_count"] = 1
+
+    return item["CreatedDate"][:10], item.get("repository"), per_reviewer
+
+
+def add_to_reviewer_rollup(rollup_table, day, login, counters, repos=()):
+    """Atomically ADD counters (and repos to the Repos set) on one reviewer row"""
+    counters = {name: value for name, value in counters.items() if value}
+    repos = {repo for repo in repos if repo}
+    if not counters and not repos:
+        return
+
+    names = {"#l": "Reviewer"}
+    values = {":login": login}
+    additions = []
+    for i, (name, value) in enumerate(counters.items()):
+        names[f"#c{i}"] = name
+        values[f":c{i}"] = to_decimal(value)
+        additions.append(f"#c{i} :c{i}")
+    if repos:
+        names["#repos"] = "Repos"
+        values[":repos"] = repos
+        additions.append("#repos :repos")
+
+    try:
+        rollup_table.update_item(
+            Key={"Day": day, "RollupKey": REVIEWER_KEY_PREFIX + login},
+            UpdateExpression="SET #l = :login ADD " + ", ".join(additions),
+            ExpressionAttributeNames=names,
+            ExpressionAttributeValues=values
+        )
+    except ThrottleExhausted:
+        raise
+    except Exception as e:
+        print(f"Error updating reviewer rollup {day} {login}: {e}")
+
+
+def apply_reviewer_delta(rollup_table, before_item, after_item):
+    """Apply the change in a PR's per-reviewer contributions as ADD deltas"""
+    deltas = {}
+    for sign, contribution in ((-1, reviewer_contributions(before_item)), (1, reviewer_contributions(after_item))):
+        if contribution is None:
+            continue
+        day, repo, per_reviewer = contribution
+        for login, counters in per_reviewer.items():
+            delta, _ = deltas.setdefault((day, login), ({}, repo))
+            for name, value in counters.items():
+                delta[name] = delta.get(name, 0) + sign * value
+
+    for (day, login), (delta, repo) in deltas.items():
+        repos = [repo] if delta.get("review_count", 0) > 0 else []
+        add_to_reviewer_rollup(rollup_table, day, login, delta, repos)
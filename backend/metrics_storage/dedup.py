@@ -0,0 +1,244 @@
+"""
+Idempotency for webhook deliveries (GitHub and EventBridge both retry).
+
+Each event is keyed by its delivery ID (the X-GitHub-Delivery header or EventBridge
+event id). When neither is available, a SHA-256 of the detail type and raw payload is
+used instead. Duplicates are dropped in three places:
+- seen_deliveries: a bounded, TTL-expiring set of keys handled by this warm container.
+  It is checked before the payload is parsed.
+- is_recorded: a key-only GetItem on the dedup table, also made before parsing. It
+  catches retries that land on another container.
+- IdempotentTable: a proxy for the PR table. It turns the event's PR write into a
+  TransactWriteItems that also carries the rollup updates staged for it and puts the
+  dedup record unless an unexpired one exists. The PR change, its rollup delta and the
+  dedup record are therefore committed together: a delivery is only recorded once
+  everything it writes is applied, and a failed write leaves nothing to lose on
+  redelivery. A retry that races past the two checks above cancels the transaction
+  and raises DuplicateDelivery.
+
+Dedup table: partition key DeliveryId (string), with DynamoDB TTL enabled on ExpiresAt.
+"""
+
+import os
+import time
+import hashlib
+from collections import OrderedDict
+from botocore.exceptions import ClientError
+from boto3.dynamodb.types import TypeDeserializer
+
+DEDUP_TTL_SECONDS = int(os.environ.get("DEDUP_TTL_SECONDS", str(72 * 3600)))
+SEEN_DELIVERIES_MAX_ENTRIES = int(os.environ.get("SEEN_DELIVERIES_MAX_ENTRIES", "10000"))
+SEEN_DELIVERIES_TTL_SECONDS = int(os.environ.get("SEEN_DELIVERIES_TTL_SECONDS", "3600"))
+
+# Largest TransactWriteItems request DynamoDB accepts
+TRANSACT_MAX_ITEMS = 100
+BATCH_GET_LIMIT = 100
+
+# Write operations the proxy makes transactional, and their TransactItems action
+TRANSACT_ACTIONS = {"put_item": "Put", "update_item": "Update", "delete_item": "Delete"}
+TRANSACT_PARAMETERS = (
+    "ConditionExpression",
+    "ExpressionAttributeNames",
+    "ExpressionAttributeValues",
+    "ReturnValuesOnConditionCheckFailure",
+)
+
+_deserializer = TypeDeserializer()
+
+
+class DuplicateDelivery(Exception):
+    """The delivery was already applied"""
+
+
+class SeenDeliveries:
+    """Bounded set of delivery keys; entries expire after ttl seconds"""
+
+    def __init__(self, max_entries=SEEN_DELIVERIES_MAX_ENTRIES, ttl=SEEN_DELIVERIES_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.entries = OrderedDict()
+
+    def __contains__(self, key):
+        expires_at = self.entries.get(key)
+        if expires_at is None:
+            return False
+        if expires_at <= time.monotonic():
+            del self.entries[key]
+            return False
+        return True
+
+    def add(self, key):
+        self.entries[key] = time.monotonic() + self.ttl
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+
+# Reused while the Lambda container is warm
+seen_deliveries = SeenDeliveries()
+
+
+def delivery_key(delivery_id, detail_type, payload_str):
+    """Dedup key for an event: its delivery ID, or a hash of the raw payload"""
+    if delivery_id:
+        return f"delivery#{delivery_id}"
+    if isinstance(payload_str, str):
+        payload_str = payload_str.encode()
+    return "sha256#" + hashlib.sha256((detail_type or "").encode() + b"\n" + (payload_str or b"")).hexdigest()
+
+
+def is_recorded(dedup_table, key):
+    """True when an unexpired dedup record exists (TTL deletion can lag by hours)"""
+    if dedup_table is None:
+        return False
+    try:
+        response = dedup_table.get_item(Key={"DeliveryId": key})
+    except ClientError as e:
+        # The transactional write still guards against duplicates
+        print(f"Dedup lookup failed for {key}: {e}")
+        return False
+    item = response.get("Item")
+    return bool(item) and int(item.get("ExpiresAt", 0)) > time.time()
+
+
+def recorded_keys(dedup_table, keys):
+    """The keys among keys that have an unexpired dedup record, read with BatchGetItem"""
+    if dedup_table is None:
+        return set()
+    keys = list(dict.fromkeys(keys))
+    recorded = set()
+    now = time.time()
+    for start in range(0, len(keys), BATCH_GET_LIMIT):
+        request = {dedup_table.name: {"Keys": [{"DeliveryId": key} for key in keys[start:start + BATCH_GET_LIMIT]]}}
+        try:
+            response = dedup_table.meta.client.batch_get_item(RequestItems=request)
+        except ClientError as e:
+            # Unchecked keys are still guarded by the transactional write
+            print(f"Dedup lookup failed for {len(request[dedup_table.name]['Keys'])} keys: {e}")
+            continue
+        for item in response.get("Responses", {}).get(dedup_table.name, []):
+            if int(item.get("ExpiresAt", 0)) > now:
+                recorded.add(item["DeliveryId"])
+    return recorded
+
+
+def transact_item(operation, table_name, kwargs):
+    """TransactItems entry equivalent to a put_item / update_item / delete_item call"""
+    if operation == "put_item":
+        entry = {"Item": kwargs["Item"]}
+    else:
+        entry = {"Key": kwargs["Key"]}
+    if operation == "update_item":
+        entry["UpdateExpression"] = kwargs["UpdateExpression"]
+    for name in TRANSACT_PARAMETERS:
+        if name in kwargs:
+            entry[name] = kwargs[name]
+    entry["TableName"] = table_name
+    return {TRANSACT_ACTIONS[operation]: entry}
+
+
+class StagedTable:
+    """
+    Stand-in for the rollup table whose update_item calls are held instead of sent.
+    IdempotentTable commits them with the next PR write.
+    """
+
+    def __init__(self, table):
+        self.table = table
+        self.name = table.name
+        self.pending = []
+
+    def update_item(self, **kwargs):
+        self.pending.append(kwargs)
+        return {}
+
+    def take(self):
+        pending, self.pending = self.pending, []
+        return pending
+
+
+class IdempotentTable:
+    """
+    Proxy for the PR table that commits each PR write together with the rollup
+    updates staged on self.rollups and, for the event's first write, its dedup
+    records (one per key). Handlers stage the rollup delta first and then make the
+    PR write, so the two cannot be applied apart. Writes with nothing staged and
+    nothing to record go straight through.
+
+    Transactions do not return item images, so transacted writes cannot ask for
+    ReturnValues. Handlers read the item first and make the write conditional on its
+    event_timestamp, which makes the before-image exact.
+    """
+
+    def __init__(self, table, dedup_table, keys, rollup_table=None):
+        self._table = table
+        self.meta = table.meta
+        self.dedup_table = dedup_table
+        self.keys = list(keys)
+        self.rollups = StagedTable(rollup_table) if rollup_table is not None else None
+        self.claimed = dedup_table is None or not self.keys
+        self.duplicate = False
+
+    def __getattr__(self, name):
+        if name in TRANSACT_ACTIONS:
+            return lambda **kwargs: self._write(name, kwargs)
+        return getattr(self._table, name)
+
+    def _dedup_puts(self, pr_id):
+        # An expired record that TTL has not deleted yet counts as absent, as in is_recorded
+        now = int(time.time())
+        return [{"Put": {
+            "TableName": self.dedup_table.name,
+            "Item": {"DeliveryId": key, "PR_ID": pr_id, "ExpiresAt": now + DEDUP_TTL_SECONDS},
+            "ConditionExpression": "attribute_not_exists(DeliveryId) OR ExpiresAt <= :now",
+            "ExpressionAttributeValues": {":now": now},
+        }} for key in self.keys]
+
+    def _write(self, operation, kwargs):
+        if self.duplicate:
+            raise DuplicateDelivery(self.keys)
+        staged = self.rollups.take() if self.rollups else []
+        if self.claimed and not staged:
+            return getattr(self._table, operation)(**kwargs)
+        if kwargs.get("ReturnValues", "NONE") != "NONE":
+            raise ValueError(f"A transacted {operation} cannot return {kwargs['ReturnValues']}")
+
+        key = kwargs.get("Key") or {"PR_ID": kwargs["Item"]["PR_ID"]}
+        records = [] if self.claimed else self._dedup_puts(key["PR_ID"])
+        room = TRANSACT_MAX_ITEMS - 1 - len(records)
+        staged, overflow = staged[:room], staged[room:]
+        try:
+            self.meta.client.transact_write_items(TransactItems=[
+                transact_item(operation, self._table.name, kwargs),
+                *(transact_item("update_item", self.rollups.name, update) for update in staged),
+                *records,
+            ])
+        except ClientError as e:
+            self._raise_cancellation(e, operation, len(records))
+        self.claimed = True
+
+        if overflow:
+            # More rollup rows than one transaction holds: the rest follow the commit
+            print(f"Applying {len(overflow)} rollup updates outside the transaction for {key['PR_ID']}")
+            for update in overflow:
+                self.rollups.table.update_item(**update)
+        return {}
+
+    def _raise_cancellation(self, error, operation, record_count):
+        """Map a cancelled transaction to DuplicateDelivery or to the single-item error"""
+        if error.response.get("Error", {}).get("Code") != "TransactionCanceledException":
+            raise error
+        reasons = error.response.get("CancellationReasons") or []
+        if record_count and any(reason.get("Code") == "ConditionalCheckFailed" for reason in reasons[-record_count:]):
+            self.duplicate = True
+            raise DuplicateDelivery(self.keys) from error
+        if reasons and reasons[0].get("Code") == "ConditionalCheckFailed":
+            # Same shape the handlers already expect from a failed conditional write
+            response = {"Error": {
+                "Code": "ConditionalCheckFailedException",
+                "Message": reasons[0].get("Message") or "The conditional request failed",
+            }}
+            if reasons[0].get("Item"):
+                response["Item"] = {name: _deserializer.deserialize(value) for name, value in reasons[0]["Item"].items()}
+            raise ClientError(response, operation) from error
+        raise error
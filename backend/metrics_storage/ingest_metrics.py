@@ -0,0 +1,160 @@
+"""
+Ingest-side instrumentation for the storage service.
+
+- EventMetrics collects per-event timings (payload parse, each handler), DynamoDB call
+  counts, consumed capacity and conditional-check failures, and emits them as one
+  CloudWatch Embedded Metric Format (EMF) log line.
+- InstrumentedTable wraps a boto3 Table (and its meta.client) so every call is counted,
+  timed and asks for ReturnConsumedCapacity=TOTAL.
+- log_payload replaces logging the full webhook body on every event: payloads are only
+  printed when LOG_LEVEL=DEBUG or for a PAYLOAD_LOG_SAMPLE_RATE fraction of events.
+"""
+
+import os
+import json
+import time
+import random
+from contextlib import contextmanager
+from botocore.exceptions import ClientError
+
+METRICS_NAMESPACE = os.environ.get("METRICS_NAMESPACE", "EngineeringPulse/Ingest")
+METRICS_ENABLED = os.environ.get("INGEST_METRICS_ENABLED", "true").lower() == "true"
+LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO").upper()
+PAYLOAD_LOG_SAMPLE_RATE = float(os.environ.get("PAYLOAD_LOG_SAMPLE_RATE", "0"))
+
+# Table / client operations that accept ReturnConsumedCapacity
+TABLE_OPERATIONS = ("get_item", "put_item", "update_item", "delete_item", "query", "scan")
+CLIENT_OPERATIONS = ("batch_get_item", "batch_write_item", "transact_write_items", "transact_get_items")
+
+
+class EventMetrics:
+    """Metrics for one processed event (or batch), emitted as a single EMF line"""
+
+    def __init__(self, **dimensions):
+        self.dimensions = {name: str(value) for name, value in dimensions.items() if value is not None}
+        self.timings = {}
+        self.counts = {
+            "DynamoDBCalls": 0,
+            "ConsumedCapacity": 0.0,
+            "ConditionalCheckFailures": 0,
+            "DynamoDBTimeMs": 0.0,
+        }
+
+    @contextmanager
+    def timer(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            self.timings[name] = self.timings.get(name, 0.0) + elapsed_ms
+
+    def add(self, name, value=1):
+        self.counts[name] = self.counts.get(name, 0) + value
+
+    def record_call(self, elapsed_ms, consumed=None):
+        self.counts["DynamoDBCalls"] += 1
+        self.counts["DynamoDBTimeMs"] += elapsed_ms
+        # Single-item calls return a dict, batch/transact calls a list of per-table dicts
+        if isinstance(consumed, dict):
+            consumed = [consumed]
+        for entry in consumed or []:
+            self.counts["ConsumedCapacity"] += float(entry.get("CapacityUnits", 0) or 0)
+
+    def set_dimension(self, name, value):
+        if value is not None:
+            self.dimensions[name] = str(value)
+
+    def to_emf(self):
+        values = {f"{name}Ms": round(ms, 3) for name, ms in self.timings.items()}
+        values.update({name: round(value, 3) for name, value in self.counts.items()})
+        metrics = [
+            {"Name": name, "Unit": "Milliseconds" if name.endswith("Ms") else "Count"}
+            for name in values
+        ]
+        return {
+            "_aws": {
+                "Timestamp": int(time.time() * 1000),
+                "CloudWatchMetrics": [{
+                    "Namespace": METRICS_NAMESPACE,
+                    "Dimensions": [sorted(self.dimensions)],
+                    "Metrics": metrics,
+                }],
+            },
+            **self.dimensions,
+            **values,
+        }
+
+    def emit(self):
+        if METRICS_ENABLED:
+            print(json.dumps(self.to_emf(), separators=(",", ":")))
+
+
+def _instrumented_call(method, metrics):
+    def call(*args, **kwargs):
+        kwargs.setdefault("ReturnConsumedCapacity", "TOTAL")
+        start = time.perf_counter()
+        response = None
+        try:
+            response = method(*args, **kwargs)
+            return response
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("ConditionalCheckFailedException", "TransactionCanceledException"):
+                metrics.add("ConditionalCheckFailures")
+            raise
+        finally:
+            metrics.record_call((time.perf_counter() - start) * 1000, (response or {}).get("ConsumedCapacity"))
+    return call
+
+
+class _InstrumentedClient:
+    def __init__(self, client, metrics):
+        self._client = client
+        self._metrics = metrics
+
+    def __getattr__(self, name):
+        attr = getattr(self._client, name)
+        if name in CLIENT_OPERATIONS:
+            return _instrumented_call(attr, self._metrics)
+        return attr
+
+
+class _InstrumentedMeta:
+    def __init__(self, meta, metrics):
+        self._meta = meta
+        self.client = _InstrumentedClient(meta.client, metrics)
+
+    def __getattr__(self, name):
+        return getattr(self._meta, name)
+
+
+class InstrumentedTable:
+    """Proxy for a boto3 Table that records every DynamoDB call into an EventMetrics"""
+
+    def __init__(self, table, metrics):
+        self._table = table
+        self._metrics = metrics
+        self.meta = _InstrumentedMeta(table.meta, metrics)
+
+    def __getattr__(self, name):
+        attr = getattr(self._table, name)
+        if name in TABLE_OPERATIONS:
+            return _instrumented_call(attr, self._metrics)
+        return attr
+
+
+def instrument(table, metrics):
+    """Wrap table for metrics (None and already-wrapped tables are returned unchanged)"""
+    if table is None or isinstance(table, InstrumentedTable):
+        return table
+    return InstrumentedTable(table, metrics)
+
+
+def should_log_payload():
+    return LOG_LEVEL == "DEBUG" or (PAYLOAD_LOG_SAMPLE_RATE > 0 and random.random() < PAYLOAD_LOG_SAMPLE_RATE)
+
+
+def log_payload(payload):
+    """Print the webhook payload only at DEBUG level or for a sampled fraction of events"""
+    if should_log_payload():
+        print("[payload]", json.dumps(payload, separators=(",", ":")))
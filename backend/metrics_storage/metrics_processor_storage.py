@@ -1,8 +1,15 @@
 import json
 import re
-from datetime import datetime
+from datetime import datetime, timezone
 from decimal import Decimal
 from botocore.exceptions import ClientError
+from daily_rollups import apply_rollup_delta
+from ingest_metrics import EventMetrics, instrument, log_payload, LOG_LEVEL
+from dedup import delivery_key, seen_deliveries, is_recorded, IdempotentTable, DuplicateDelivery
+from write_throttle import throttle, ThrottleExhausted
+
+# Times a handler re-reads the PR and retries after a concurrent change failed its write condition
+WRITE_CONFLICT_RETRIES = 3
 
 class DecimalEncoder(json.JSONEncoder):
     def default(self, obj):
@@ -38,6 +45,69 @@ def format_cycle_time_readable(hours):
     else:
         return f"{remaining_hours}h"
 
+def iso_to_epoch(timestamp):
+    """Convert an ISO timestamp to epoch seconds; timestamps without an offset are UTC"""
+    if not timestamp:
+        return None
+    try:
+        parsed = datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
+    except (TypeError, ValueError):
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+# ISO timestamp attribute -> precomputed epoch-seconds attribute
+EPOCH_ATTRIBUTES = {
+    "CreatedDate": "CreatedEpoch",
+    "ReviewRequestedTime": "ReviewRequestedEpoch",
+    "FirstReviewTime": "FirstReviewEpoch",
+    "MergedDate": "MergedEpoch",
+}
+
+def get_epoch_attributes(item):
+    """
+    Derive numeric epoch fields, durations and the created-day key from the ISO
+    timestamps present in item, so readers never have to parse them per request.
+    """
+    epochs = {}
+    attributes = {}
+    for iso_field, epoch_field in EPOCH_ATTRIBUTES.items():
+        epoch = iso_to_epoch(item.get(iso_field))
+        if epoch is not None:
+            epochs[iso_field] = epoch
+            attributes[epoch_field] = Decimal(str(round(epoch, 3)))
+
+    if "CreatedDate" in epochs:
+        attributes["CreatedDay"] = datetime.fromtimestamp(epochs["CreatedDate"], timezone.utc).date().isoformat()
+    if "ReviewRequestedTime" in epochs and "FirstReviewTime" in epochs:
+        wait_hours = (epochs["FirstReviewTime"] - epochs["ReviewRequestedTime"]) / 3600
+        attributes["ReviewWaitHours"] = Decimal(str(round(wait_hours, 4)))
+    if "CreatedDate" in epochs and "MergedDate" in epochs:
+        merge_hours = (epochs["MergedDate"] - epochs["CreatedDate"]) / 3600
+        attributes["CreatedToMergeHours"] = Decimal(str(round(merge_hours, 4)))
+    return attributes
+
+def build_set_clause(attributes, prefix):
+    """Turn {name: value} into (", #p0 = :p0 ...", names, values) for an UpdateExpression SET"""
+    names = {}
+    values = {}
+    clause = ""
+    for i, (name, value) in enumerate(attributes.items()):
+        names[f"#{prefix}{i}"] = name
+        values[f":{prefix}{i}"] = value
+        clause += f", #{prefix}{i} = :{prefix}{i}"
+    return clause, names, values
+
+def version_condition(item):
+    """(ConditionExpression, values) that holds only while the stored PR is still the item that was read"""
+    if item.get("event_timestamp") is None:
+        return "attribute_exists(PR_ID) AND attribute_not_exists(event_timestamp)", {}
+    return "event_timestamp = :version", {":version": item["event_timestamp"]}
+
+def is_conditional_failure(error):
+    return isinstance(error, ClientError) and error.response.get("Error", {}).get("Code") == "ConditionalCheckFailedException"
+
 def extract_pr_base_info(payload, detail_type):
     """Extract common PR information from payload"""
     pr = payload.get('pull_request', {})
@@ -57,36 +127,55 @@ def extract_pr_base_info(payload, detail_type):
 def get_existing_pr_data(table, pr_id):
     """Retrieve existing PR data from DynamoDB"""
     try:
-        response = table.get_item(Key={"PR_ID": pr_id})
+        # Writes are conditional on this read, so it must not be stale
+        response = table.get_item(Key={"PR_ID": pr_id}, ConsistentRead=True)
         if "Item" in response:
             print(f"Found existing item for PR {pr_id}")
             return response["Item"]
         print(f"No existing item found for PR {pr_id}")
         return {}
+    except ThrottleExhausted:
+        # Treating the PR as missing would recreate it over the stored item
+        raise
     except Exception as e:
         print(f"Error retrieving PR data for {pr_id}: {e}")
         return {}
 
-def handle_pr_draft_conversion(table, pr_id):
+def handle_pr_draft_conversion(table, pr_id, rollup_table=None, attempt=0):
     """Handle PR conversion to draft state"""
     print(f"PR moved back to draft. Deleting from DynamoDB: {pr_id}")
-    table.delete_item(Key={"PR_ID": pr_id})
+    existing_item = get_existing_pr_data(table, pr_id)
+    if not existing_item:
+        return
+    condition, values = version_condition(existing_item)
+    # Undo the deleted PR's rollup contribution; staged, so it commits with the delete
+    apply_rollup_delta(rollup_table, existing_item, None)
+    try:
+        table.delete_item(Key={"PR_ID": pr_id}, ConditionExpression=condition, **({"ExpressionAttributeValues": values} if values else {}))
+    except ClientError as e:
+        if not is_conditional_failure(e) or attempt >= WRITE_CONFLICT_RETRIES:
+            raise
+        print(f"PR {pr_id} changed since it was read, retrying delete")
+        handle_pr_draft_conversion(table, pr_id, rollup_table, attempt + 1)
 
-def handle_pr_synchronize(table, pr_id):
+def handle_pr_synchronize(table, pr_id, timestamp):
     """Handle PR synchronize event (new commits pushed)"""
     print(f"New commit pushed to PR {pr_id}. Checking if we should reset state to 'Review in Progress'...")
     try:
         table.update_item(
             Key={"PR_ID": pr_id},
-            UpdateExpression="set #S = :val",
+            UpdateExpression="set #S = :val, event_timestamp = :ts",
             ExpressionAttributeNames={"#S": "State"},
             ExpressionAttributeValues={
                 ":val": "Review in Progress",
-                ":expected": "Changes Requested"
+                ":expected": "Changes Requested",
+                ":ts": timestamp
             },
             ConditionExpression="attribute_exists(PR_ID) AND #S = :expected"
         )
         print(f"State reset to 'Review in Progress' for PR {pr_id}")
+    except ThrottleExhausted:
+        raise
     except Exception as e:
         print(f"Skipped state reset for PR {pr_id}: {e}")
 
@@ -112,7 +201,7 @@ def create_pr_base_item(pr_info, action, timestamp):
         state = "Open"
 
     # Core fields needed for initial PR creation
-    return {
+    item = {
         "PR_ID": pr_id,
         "PRNumber": pr_number,
         "Jira_ID": jira_id,
@@ -123,7 +212,8 @@ def create_pr_base_item(pr_info, action, timestamp):
         "TargetBranch": pr.get("base", {}).get("ref"),
         "Author": author,
         "PR_Size": pr.get("additions", 0) + pr.get("deletions", 0),
-        "TechStack": repo.get("language", "Unknown"),
+        # TechStackIndex key: GitHub sends "language": null, and a NULL key fails the put
+        "TechStack": repo.get("language") or "Unknown",
         "ReviewRequestedTime": review_requested_time,
         "event_timestamp": timestamp,
         "repository": repo.get('name'),
@@ -131,8 +221,35 @@ def create_pr_base_item(pr_info, action, timestamp):
         "action": action,
         "sender": pr_info["sender"]
     }
+    item.update(get_bucket_attributes(item))
+    item.update(get_epoch_attributes(item))
+    return item
 
-def handle_pr_creation_or_update(table, pr_info, timestamp):
+def get_bucket_attributes(item):
+    """Derive the secondary-index bucket keys (created month) for a PR item"""
+    created_at = item.get("CreatedDate")
+    if not created_at:
+        # Index key attributes must be omitted rather than written as NULL
+        return {}
+    return {"CreatedMonth": created_at[:7]}
+
+def update_pr_item(table, existing_item, attributes, rollup_table=None):
+    """
+    SET attributes on a stored PR, conditional on it being unchanged since existing_item
+    was read. The rollup delta is staged first, so it commits with the update.
+    """
+    clause, names, values = build_set_clause(attributes, "a")
+    condition, condition_values = version_condition(existing_item)
+    apply_rollup_delta(rollup_table, existing_item, dict(existing_item, **attributes))
+    table.update_item(
+        Key={"PR_ID": existing_item["PR_ID"]},
+        UpdateExpression="SET" + clause.lstrip(","),
+        ExpressionAttributeNames=names,
+        ExpressionAttributeValues={**values, **condition_values},
+        ConditionExpression=condition
+    )
+
+def handle_pr_creation_or_update(table, pr_info, timestamp, rollup_table=None, attempt=0):
     """Handle PR creation or update events"""
     pr_id = pr_info["pr_id"]
     action = pr_info["action"]
@@ -145,8 +262,18 @@ def handle_pr_creation_or_update(table, pr_info, timestamp):
         # Create new PR item with only essential fields
         item = create_pr_base_item(pr_info, action, timestamp)
         print(f"Creating new PR item for {pr_id}")
-        print(json.dumps(item, indent=2, cls=DecimalEncoder))
-        table.put_item(Item=item)
+        if LOG_LEVEL == "DEBUG":
+            print(json.dumps(item, indent=2, cls=DecimalEncoder))
+        apply_rollup_delta(rollup_table, None, item)
+        try:
+            table.put_item(Item=item, ConditionExpression="attribute_not_exists(PR_ID)")
+        except ClientError as e:
+            if not is_conditional_failure(e) or attempt >= WRITE_CONFLICT_RETRIES:
+                raise
+            # Created concurrently by another event: update it instead
+            print(f"PR {pr_id} was created concurrently, retrying as an update")
+            handle_pr_creation_or_update(table, pr_info, timestamp, rollup_table, attempt + 1)
+            return
         print(f"Created new PR {pr_id} in DynamoDB")
         return
     
@@ -160,230 +287,274 @@ def handle_pr_creation_or_update(table, pr_info, timestamp):
         # Use ReviewRequestedTime instead of CreatedDate for cycle time calculation
         review_requested_time = existing_item.get("ReviewRequestedTime")
         cycle_time_hours = calculate_cycle_time_hours(review_requested_time, merged_at)
-        cycle_time_display = format_cycle_time_readable(cycle_time_hours)
         merged_by_user = pr.get("merged_by", {})
-        merged_by = merged_by_user.get("login") if merged_by_user else ""
-        
-        try:
-            table.update_item(
-                Key={"PR_ID": pr_id},
-                UpdateExpression="SET MergedDate = :md, CycleTimeHours = :cth, CycleTimeDisplay = :ctd, #S = :st, merged_by = :mb, event_timestamp = :ts, #A = :act",
-                ExpressionAttributeNames={
-                    "#S": "State",
-                    "#A": "action"
-                },
-                ExpressionAttributeValues={
-                    ":md": merged_at,
-                    ":cth": Decimal(str(cycle_time_hours)),
-                    ":ctd": cycle_time_display,
-                    ":st": "Merged",
-                    ":mb": merged_by,
-                    ":ts": timestamp,
-                    ":act": action
-                }
-            )
-            print(f"Updated merge data for PR {pr_id}")
-        except Exception as e:
-            print(f"Error updating merge data: {e}")
+        attributes = {
+            "MergedDate": merged_at,
+            "CycleTimeHours": Decimal(str(cycle_time_hours)),
+            "CycleTimeDisplay": format_cycle_time_readable(cycle_time_hours),
+            "State": "Merged",
+            "merged_by": merged_by_user.get("login") if merged_by_user else "",
+        }
+        # Epoch fields for the merge (and the created side, for rows written before they existed)
+        attributes.update(get_epoch_attributes({"CreatedDate": existing_item.get("CreatedDate"), "MergedDate": merged_at}))
+        change = "merge data"
     
     # Handle simple state updates for closed PRs (not merged)
     elif action == "closed":
-        try:
-            table.update_item(
-                Key={"PR_ID": pr_id},
-                UpdateExpression="SET #S = :st, event_timestamp = :ts, #A = :act",
-                ExpressionAttributeNames={
-                    "#S": "State",
-                    "#A": "action"
-                },
-                ExpressionAttributeValues={
-                    ":st": "Closed",
-                    ":ts": timestamp,
-                    ":act": action
-                }
-            )
-            print(f"Updated PR {pr_id} to Closed state")
-        except Exception as e:
-            print(f"Error updating closed state: {e}")
+        attributes = {"State": "Closed"}
+        change = "closed state"
     
     # Handle other action updates (general case)
     else:
-        try:
-            table.update_item(
-                Key={"PR_ID": pr_id},
-                UpdateExpression="SET event_timestamp = :ts, action = :act",
-                ExpressionAttributeValues={
-                    ":ts": timestamp,
-                    ":act": action
-                }
-            )
-            print(f"Updated timestamp for PR {pr_id}")
-        except Exception as e:
-            print(f"Error updating timestamp: {e}")
-
-def record_first_review(table, pr_id, reviewer_login):
-    """Record first review information"""
-    try:
-        first_review_time = datetime.utcnow().isoformat()
-        print(f"🎯 First review activity detected for PR {pr_id} by {reviewer_login}")
-
-        table.update_item(
-            Key={"PR_ID": pr_id},
-            UpdateExpression="SET FirstReviewReceived = :flag, FirstReviewTime = :ts, FirstReviewer = :login",
-            ExpressionAttributeValues={
-                ":flag": True,
-                ":ts": first_review_time,
-                ":login": reviewer_login
-            },
-            ConditionExpression="attribute_exists(PR_ID)"
-        )
-        return True
-    except Exception as e:
-        print(f"⚠️ Failed to record FirstReviewReceived for PR {pr_id}: {e}")
-        return False
+        attributes = {}
+        change = "timestamp"
+    attributes.update({"event_timestamp": timestamp, "action": action})
 
-def add_reviewer_to_list(table, pr_id, reviewer_login):
-    """Add reviewer to the reviewers list if not already present"""
     try:
-        # First, get the current list of reviewers
-        pr_data = get_existing_pr_data(table, pr_id)
-        current_reviewers = pr_data.get("Reviewers", [])
-        
-        # Check if reviewer is already in the list
-        if reviewer_login in current_reviewers:
-            print(f"Reviewer {reviewer_login} already exists for PR {pr_id}, skipping addition")
-            return True
-        
-        print(f"Recording new reviewer {reviewer_login} for PR {pr_id}")
-        table.update_item(
-            Key={"PR_ID": pr_id},
-            UpdateExpression="SET Reviewers = list_append(if_not_exists(Reviewers, :empty_list), :new_reviewer)",
-            ExpressionAttributeValues={
-                ":new_reviewer": [reviewer_login],
-                ":empty_list": []
-            },
-            ConditionExpression="attribute_exists(PR_ID)"
-        )
-        return True
+        update_pr_item(table, existing_item, attributes, rollup_table)
+        print(f"Updated {change} for PR {pr_id}")
+    except ThrottleExhausted:
+        raise
     except Exception as e:
-        print(f"Failed to add reviewer {reviewer_login} to PR {pr_id}: {e}")
-        return False
+        if is_conditional_failure(e) and attempt < WRITE_CONFLICT_RETRIES:
+            print(f"PR {pr_id} changed since it was read, retrying")
+            handle_pr_creation_or_update(table, pr_info, timestamp, rollup_table, attempt + 1)
+            return
+        print(f"Error updating {change}: {e}")
 
-def update_pr_state(table, pr_id, new_state, condition_state=None):
-    """Update PR state with optional condition"""
-    try:
-        if condition_state:
-            print(f"Setting State = '{new_state}' for PR {pr_id} if current state is '{condition_state}'")
-            table.update_item(
-                Key={"PR_ID": pr_id},
-                UpdateExpression="SET #S = :val",
-                ExpressionAttributeNames={"#S": "State"},
-                ExpressionAttributeValues={
-                    ":val": new_state,
-                    ":expected": condition_state
-                },
-                ConditionExpression="attribute_exists(PR_ID) AND #S = :expected"
-            )
-        else:
-            print(f"Setting State = '{new_state}' for PR {pr_id}")
-            table.update_item(
-                Key={"PR_ID": pr_id},
-                UpdateExpression="SET #S = :val",
-                ExpressionAttributeNames={"#S": "State"},
-                ExpressionAttributeValues={
-                    ":val": new_state
-                },
-                ConditionExpression="attribute_exists(PR_ID)"
-            )
-        return True
-    except Exception as e:
-        print(f"Failed to update state for PR {pr_id}: {e}")
-        return False
+def apply_review_to_item(item, pr_info, review, timestamp):
+    """
+    Return the PR item after a review event (item=None means the PR is not stored yet).
+    Mirrors the single UpdateItem built by build_review_update, so callers can derive
+    the new item from the old one without reading it back.
+    """
+    review_state = review.get('state')
+    reviewer_login = review.get('user', {}).get('login')
+
+    created = item is None
+    if created:
+        item = create_pr_base_item(pr_info, pr_info["action"], timestamp)
+    else:
+        item = dict(item)
+
+    # Only the first review sets these (if_not_exists in the update)
+    if not item.get("FirstReviewReceived"):
+        item["FirstReviewReceived"] = True
+        item["FirstReviewTime"] = timestamp
+        item["FirstReviewer"] = reviewer_login
+        item.update(get_epoch_attributes({"ReviewRequestedTime": item.get("ReviewRequestedTime"), "FirstReviewTime": timestamp}))
+
+    item["event_timestamp"] = timestamp
+    if reviewer_login:
+        item["ReviewerSet"] = set(item.get("ReviewerSet") or ()) | {reviewer_login}
+
+    if review_state == 'changes_requested':
+        item["PR_Iterations"] = 1
+        item["State"] = "Changes Requested"
+        if reviewer_login:
+            item["ChangeRequestorSet"] = set(item.get("ChangeRequestorSet") or ()) | {reviewer_login}
+    elif review_state in ['approved', 'commented'] and item.get("State") == "Open" and not created:
+        # A PR first seen through an approval or comment keeps its base state, as before
+        item["State"] = "Review in Progress"
+    return item
+
+def build_review_update(reviewer_login, review_state, timestamp, with_state=True, before=None):
+    """
+    Build the UpdateItem arguments that record a review in one round trip:
+    first-review fields via if_not_exists, reviewer membership via ADD on the
+    ReviewerSet (and, for changes_requested, ChangeRequestorSet) string sets, and
+    the state transition when with_state is set.
+    With before (the stored item as read), the update is also conditional on the
+    item being unchanged since, so apply_review_to_item(before) is exactly the result.
+    """
+    set_clauses = [
+        "FirstReviewReceived = if_not_exists(FirstReviewReceived, :flag)",
+        "FirstReviewTime = if_not_exists(FirstReviewTime, :ts)",
+        "FirstReviewer = if_not_exists(FirstReviewer, :login)",
+        "event_timestamp = :ts",
+    ]
+    names = {}
+    values = {":flag": True, ":ts": timestamp, ":login": reviewer_login}
+    condition = "attribute_exists(PR_ID)"
+    if before is not None:
+        condition, version_values = version_condition(before)
+        values.update(version_values)
+
+    # ReviewWaitHours needs ReviewRequestedTime, which is not known without a read;
+    # readers derive it from the two epochs and the backfill job stores it
+    first_review_epoch = get_epoch_attributes({"FirstReviewTime": timestamp}).get("FirstReviewEpoch")
+    if first_review_epoch is not None:
+        set_clauses.append("FirstReviewEpoch = if_not_exists(FirstReviewEpoch, :fre)")
+        values[":fre"] = first_review_epoch
+    if before is not None and not before.get("FirstReviewReceived"):
+        # With the read it is known, and the result must match apply_review_to_item(before)
+        derived = get_epoch_attributes({"ReviewRequestedTime": before.get("ReviewRequestedTime"), "FirstReviewTime": timestamp})
+        for i, name in enumerate(sorted(set(derived) - {"FirstReviewEpoch"})):
+            set_clauses.append(f"#d{i} = :d{i}")
+            names[f"#d{i}"] = name
+            values[f":d{i}"] = derived[name]
 
-def handle_changes_requested(table, pr_id):
-    """Handle changes requested review state"""
+    if with_state and review_state == 'changes_requested':
+        set_clauses.append("PR_Iterations = :iterations, #S = :state")
+        names["#S"] = "State"
+        values[":iterations"] = 1
+        values[":state"] = "Changes Requested"
+    elif with_state and review_state in ['approved', 'commented']:
+        set_clauses.append("#S = :state")
+        names["#S"] = "State"
+        values[":state"] = "Review in Progress"
+        values[":expected"] = "Open"
+        condition += " AND #S = :expected"
+
+    update_expression = "SET " + ", ".join(set_clauses)
+    if reviewer_login:
+        update_expression += " ADD ReviewerSet :reviewer"
+        values[":reviewer"] = {reviewer_login}
+        if review_state == 'changes_requested':
+            update_expression += ", ChangeRequestorSet :reviewer"
+
+    kwargs = {
+        "UpdateExpression": update_expression,
+        "ExpressionAttributeValues": values,
+        "ConditionExpression": condition,
+    }
+    if names:
+        kwargs["ExpressionAttributeNames"] = names
+    return kwargs
+
+def update_review_fields(table, pr_id, reviewer_login, review_state, timestamp, with_state=True, before=None):
+    """
+    Apply the review update; returns False when the PR does not exist.
+    Without before, a failed state condition is retried once without the state change.
+    With before, the state change is decided from it, and a ConditionalCheckFailed
+    (the PR changed since it was read) is raised to the caller.
+    """
+    if before is not None:
+        with_state = review_state == 'changes_requested' or before.get("State") == "Open"
     try:
-        print(f"Setting State = 'Changes Requested' and PR_Iterations = 1 for: {pr_id}")
         table.update_item(
             Key={"PR_ID": pr_id},
-            UpdateExpression="SET PR_Iterations = :val1, #S = :val2",
-            ExpressionAttributeNames={"#S": "State"},
-            ExpressionAttributeValues={
-                ":val1": 1,
-                ":val2": "Changes Requested"
-            },
-            ConditionExpression="attribute_exists(PR_ID)"
+            ReturnValuesOnConditionCheckFailure="ALL_OLD",
+            **build_review_update(reviewer_login, review_state, timestamp, with_state, before)
         )
         return True
-    except Exception as e:
-        print(f"Failed to handle changes requested for PR {pr_id}: {e}")
-        return False
+    except ClientError as e:
+        if not is_conditional_failure(e) or before is not None:
+            raise
+        if "Item" not in e.response:
+            return False
+        if not with_state:
+            raise
+        # The PR exists but is not Open: record the review without touching State
+        print(f"PR {pr_id} is not Open, recording review without a state change")
+        return update_review_fields(table, pr_id, reviewer_login, review_state, timestamp, with_state=False)
 
-def handle_review_event(table, pr_info, review):
-    """Handle PR review events"""
+def handle_review_event(table, pr_info, review, rollup_table=None, attempt=0):
+    """
+    Handle PR review events with a single conditional UpdateItem. With a rollup
+    table the PR is read first, so the rollup delta can be staged and committed
+    with an update conditional on that read.
+    """
     pr_id = pr_info["pr_id"]
     review_state = review.get('state')
     reviewer_login = review.get('user', {}).get('login')
+    timestamp = datetime.utcnow().isoformat()
     
     print(f"Review received for PR {pr_id} with state: {review_state} by {reviewer_login}")
-    
-    # Check if PR exists, if not create it
-    pr_data = get_existing_pr_data(table, pr_id)
-    
-    if not pr_data:
-        # PR doesn't exist in DynamoDB yet, create it
-        timestamp = datetime.utcnow().isoformat()
-        item = create_pr_base_item(pr_info, pr_info["action"], timestamp)
-        
-        # Add review-specific fields
-        item["FirstReviewReceived"] = True
-        item["FirstReviewTime"] = timestamp
-        item["FirstReviewer"] = reviewer_login
-        item["Reviewers"] = [reviewer_login]
-        
-        if review_state == 'changes_requested':
-            item["PR_Iterations"] = 1
-            item["State"] = "Changes Requested"
-        
-        print(f"Creating new PR item with review data for {pr_id}")
-        table.put_item(Item=item)
+    if review_state not in ['changes_requested', 'approved', 'commented']:
+        print("Review state not actionable, recording reviewer only.")
+
+    try:
+        if rollup_table is None:
+            found = update_review_fields(table, pr_id, reviewer_login, review_state, timestamp)
+        else:
+            old_item = get_existing_pr_data(table, pr_id)
+            found = bool(old_item)
+            if found:
+                apply_rollup_delta(rollup_table, old_item, apply_review_to_item(old_item, pr_info, review, timestamp))
+                update_review_fields(table, pr_id, reviewer_login, review_state, timestamp, before=old_item)
+    except ThrottleExhausted:
+        raise
+    except Exception as e:
+        if is_conditional_failure(e) and attempt < WRITE_CONFLICT_RETRIES:
+            print(f"PR {pr_id} changed since it was read, retrying review update")
+            handle_review_event(table, pr_info, review, rollup_table, attempt + 1)
+            return
+        print(f"Failed to record review for PR {pr_id}: {e}")
         return
-    
-    # PR exists, update review data
-    # Record first review if this is the first one
-    if not pr_data.get("FirstReviewReceived"):
-        record_first_review(table, pr_id, reviewer_login)
-    
-    # Always record the reviewer
-    if reviewer_login:
-        add_reviewer_to_list(table, pr_id, reviewer_login)
-    
-    # Handle different review states
-    if review_state == 'changes_requested':
-        handle_changes_requested(table, pr_id)
-    elif review_state in ['approved', 'commented']:
-        update_pr_state(table, pr_id, "Review in Progress", "Open")
-    else:
-        print("Skipping review event: state not actionable.")
 
-def store_event_in_dynamodb(payload_str, detail_type, table):
-    """Main function to process GitHub webhook events and update DynamoDB"""
+    if not found:
+        # PR doesn't exist in DynamoDB yet, create it with the review data
+        item = apply_review_to_item(None, pr_info, review, timestamp)
+        print(f"Creating new PR item with review data for {pr_id}")
+        apply_rollup_delta(rollup_table, None, item)
+        try:
+            table.put_item(Item=item, ConditionExpression="attribute_not_exists(PR_ID)")
+        except ClientError as e:
+            if not is_conditional_failure(e) or attempt >= WRITE_CONFLICT_RETRIES:
+                raise
+            # Created concurrently by another event: update it instead
+            print(f"PR {pr_id} was created concurrently, retrying review update")
+            handle_review_event(table, pr_info, review, rollup_table, attempt + 1)
+
+def is_pr_event(detail_type):
+    """True for the event types the storage handlers act on"""
     # Skip non-relevant events
     if 'pull_request' not in detail_type and 'pull_request_review' not in detail_type:
         print(f"Skipping non-PR event: {detail_type}")
-        return
+        return False
     
     # Skip inline review comments
     if detail_type == 'pull_request_review_comment':
         print("Skipping inline review comment event.")
+        return False
+    return True
+
+def store_event_in_dynamodb(payload_str, detail_type, table, rollup_table=None, dedup_table=None, delivery_id=None):
+    """Main function to process GitHub webhook events and update DynamoDB"""
+    if not is_pr_event(detail_type):
         return
     
+    # Every DynamoDB call made while handling this event is counted and timed
+    metrics = EventMetrics(DetailType=detail_type)
+    try:
+        # Drop retried deliveries before the payload is parsed
+        key = delivery_key(delivery_id, detail_type, payload_str)
+        # Throttled calls are retried with backoff; writes are paced per table
+        dedup_table = throttle(instrument(dedup_table, metrics), metrics)
+        if key in seen_deliveries or is_recorded(dedup_table, key):
+            print(f"Dropping duplicate delivery {key}")
+            metrics.add("DuplicateDeliveries")
+            seen_deliveries.add(key)
+            return
+        
+        # Each PR write commits with its staged rollup delta and, the first time, the dedup record
+        guarded_table = IdempotentTable(
+            throttle(instrument(table, metrics), metrics), dedup_table, [key],
+            throttle(instrument(rollup_table, metrics), metrics)
+        )
+        try:
+            process_event(payload_str, detail_type, guarded_table, guarded_table.rollups, metrics)
+        except DuplicateDelivery:
+            pass
+        if guarded_table.duplicate:
+            # A handler may have swallowed the exception; nothing after it was written
+            print(f"Dropping duplicate delivery {key}: already applied")
+            metrics.add("DuplicateDeliveries")
+        seen_deliveries.add(key)
+    finally:
+        metrics.emit()
+
+def process_event(payload_str, detail_type, table, rollup_table, metrics):
+    """Parse one webhook event and dispatch it to its handler"""
     # Parse the payload
     try:
-        payload = json.loads(payload_str)
-        print("[payload]", json.dumps(payload, indent=2))
+        with metrics.timer("Parse"):
+            payload = json.loads(payload_str)
+        log_payload(payload)
     except Exception as e:
         print(f"Error parsing payload: {e}")
+        metrics.add("ParseErrors")
         return
     
     # Extract common PR info
@@ -391,17 +562,20 @@ def store_event_in_dynamodb(payload_str, detail_type, table):
     pr_id = pr_info["pr_id"]
     action = pr_info["action"]
     timestamp = datetime.utcnow().isoformat()
+    metrics.set_dimension("Action", action)
     
     # Handle pull_request events
     if detail_type == 'pull_request':
         # Handle PR moved to draft
         if action == 'converted_to_draft':
-            handle_pr_draft_conversion(table, pr_id)
+            with metrics.timer("handle_pr_draft_conversion"):
+                handle_pr_draft_conversion(table, pr_id, rollup_table)
             return
         
         # Handle new commit push
         if action == 'synchronize':
-            handle_pr_synchronize(table, pr_id)
+            with metrics.timer("handle_pr_synchronize"):
+                handle_pr_synchronize(table, pr_id, timestamp)
             return
         
         # Skip irrelevant actions
@@ -415,12 +589,14 @@ def store_event_in_dynamodb(payload_str, detail_type, table):
             return
         
         # Handle PR creation or updating existing PRs
-        handle_pr_creation_or_update(table, pr_info, timestamp)
+        with metrics.timer("handle_pr_creation_or_update"):
+            handle_pr_creation_or_update(table, pr_info, timestamp, rollup_table)
     
     # Handle pull_request_review events
     elif detail_type == 'pull_request_review':
         review = payload.get('review', {})
-        handle_review_event(table, pr_info, review)
+        with metrics.timer("handle_review_event"):
+            handle_review_event(table, pr_info, review, rollup_table)
 
 def get_jira_url(jira_id):
     base_url = "https://base_url"
@@ -0,0 +1,873 @@
+"""
+SQLite storage backend: a local, file-backed implementation of the storage interface.
+
+Storage interface. Ingest and retrieval reach storage only through this subset of
+the boto3 DynamoDB resource. boto3.resource("dynamodb") is one implementation and
+SQLiteResource is the other:
+- resource.Table(name) and table.name
+- get_item / put_item / update_item / delete_item, with ConditionExpression,
+  ReturnValues (NONE, ALL_OLD, ALL_NEW) and ReturnValuesOnConditionCheckFailure.
+  A failed condition raises ClientError ConditionalCheckFailedException.
+- query (base table or index, KeyConditionExpression) and scan (Segment/TotalSegments),
+  with FilterExpression, ProjectionExpression, Limit and ExclusiveStartKey
+- batch_writer, and meta.client.batch_get_item / batch_write_item / transact_write_items
+- read_by_date(start, end, squad, stack): an optional native date-range read.
+  query_planner.read_by_date uses it when the table provides one.
+
+Each table is a SQL table keyed by (partition key, sort key) that holds the item as
+DynamoDB JSON. Numbers keep their Decimal precision and sets stay sets. CreatedDate,
+CreatedMonth, Squad, TechStack and repository are copied into indexed columns. A
+date range, alone or with a squad, stack or repository filter, is then an index
+range scan. A query on any IndexName whose partition key is one of these attributes
+(sort key CreatedDate) is served from these columns.
+
+Expressions:
+- UpdateExpression supports SET (a value, an attribute, if_not_exists, list_append,
+  + and -), ADD, REMOVE and DELETE on top-level attributes.
+- ConditionExpression and FilterExpression may be strings or boto3 condition objects.
+- KeyConditionExpression must be a boto3 Key condition.
+- Empty ExpressionAttributeNames / ExpressionAttributeValues are rejected, as DynamoDB does.
+- Keys are strings.
+
+Usage (create the tables of a local pipeline):
+    python sqlite_backend.py metrics.db --table pr-metrics --rollup-table pr-rollups --dedup-table pr-deliveries
+"""
+
+import argparse
+import base64
+import json
+import re
+import sqlite3
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+from boto3.dynamodb.conditions import AttributeBase, ConditionBase
+from boto3.dynamodb.types import TypeSerializer, TypeDeserializer
+from botocore.exceptions import ClientError
+
+# Attributes copied into indexed columns; each column has an index on (column, CreatedDate)
+INDEXED_ATTRIBUTES = ("CreatedDate", "CreatedMonth", "Squad", "TechStack", "repository")
+INDEX_SORT_KEY = "CreatedDate"
+TABLE_NAME_PATTERN = re.compile(r"^[A-Za-z0-9_.\-]{1,255}$")
+
+_serializer = TypeSerializer()
+_deserializer = TypeDeserializer()
+
+
+def _client_error(code, message, operation, **extra):
+    return ClientError({"Error": {"Code": code, "Message": message}, **extra}, operation)
+
+
+# --- item encoding ------------------------------------------------------------------
+
+def _wire_to_json(value):
+    """Make a DynamoDB JSON value JSON-serializable (binary values become base64)"""
+    if "B" in value:
+        return {"B": base64.b64encode(bytes(getattr(value["B"], "value", value["B"]))).decode()}
+    if "BS" in value:
+        return {"BS": [base64.b64encode(bytes(getattr(v, "value", v))).decode() for v in value["BS"]]}
+    if "M" in value:
+        return {"M": {name: _wire_to_json(v) for name, v in value["M"].items()}}
+    if "L" in value:
+        return {"L": [_wire_to_json(v) for v in value["L"]]}
+    return value
+
+
+def _json_to_wire(value):
+    if "B" in value:
+        return {"B": base64.b64decode(value["B"])}
+    if "BS" in value:
+        return {"BS": [base64.b64decode(v) for v in value["BS"]]}
+    if "M" in value:
+        return {"M": {name: _json_to_wire(v) for name, v in value["M"].items()}}
+    if "L" in value:
+        return {"L": [_json_to_wire(v) for v in value["L"]]}
+    return value
+
+
+def encode_item(item):
+    """Python-typed item -> stored text (floats raise TypeError, as boto3 does)"""
+    return json.dumps(
+        {name: _wire_to_json(_serializer.serialize(value)) for name, value in item.items()},
+        separators=(",", ":"),
+    )
+
+
+def decode_wire(text):
+    return {name: _json_to_wire(value) for name, value in json.loads(text).items()}
+
+
+def deserialize(wire, names=None):
+    """Python-typed item from DynamoDB JSON, optionally only the attributes in names"""
+    if names is None:
+        return {name: _deserializer.deserialize(value) for name, value in wire.items()}
+    return {name: _deserializer.deserialize(wire[name]) for name in names if name in wire}
+
+
+def projection_names(kwargs):
+    """Top-level attribute names of a ProjectionExpression, or None for whole items"""
+    projection = kwargs.get("ProjectionExpression")
+    if not projection:
+        return None
+    names = kwargs.get("ExpressionAttributeNames") or {}
+    return [names.get(part.strip(), part.strip()) for part in projection.split(",")]
+
+
+# --- condition objects --------------------------------------------------------------
+
+def _compare(left, right, op):
+    if left is None or right is None:
+        return False
+    try:
+        return op(left, right)
+    except TypeError:
+        return False
+
+
+COMPARISONS = {
+    "=": lambda a, b: a is not None and a == b,
+    "<>": lambda a, b: a != b,
+    "<": lambda a, b: _compare(a, b, lambda x, y: x < y),
+    "<=": lambda a, b: _compare(a, b, lambda x, y: x <= y),
+    ">": lambda a, b: _compare(a, b, lambda x, y: x > y),
+    ">=": lambda a, b: _compare(a, b, lambda x, y: x >= y),
+}
+OBJECT_COMPARISONS = {
+    "Equals": "=", "NotEquals": "<>", "LessThan": "<",
+    "LessThanEquals": "<=", "GreaterThan": ">", "GreaterThanEquals": ">=",
+}
+
+
+def _size(value):
+    if value is None:
+        return None
+    if isinstance(value, (str, bytes, list, dict, set)):
+        return len(value)
+    return len(bytes(getattr(value, "value", b"")))
+
+
+def evaluate(condition, item):
+    """Evaluate a boto3 Key/Attr condition object against a Python-typed item"""
+    operator = type(condition).__name__
+    values = condition.get_expression()["values"]
+    if operator == "And":
+        return all(evaluate(value, item) for value in values)
+    if operator == "Or":
+        return any(evaluate(value, item) for value in values)
+    if operator == "Not":
+        return not evaluate(values[0], item)
+    if operator == "AttributeExists":
+        return values[0].name in item
+    if operator == "AttributeNotExists":
+        return values[0].name not in item
+
+    operands = [_object_operand(value, item) for value in values]
+    if operator in OBJECT_COMPARISONS:
+        return COMPARISONS[OBJECT_COMPARISONS[operator]](operands[0], operands[1])
+    if operator == "Between":
+        return COMPARISONS[">="](operands[0], operands[1]) and COMPARISONS["<="](operands[0], operands[2])
+    if operator == "BeginsWith":
+        return isinstance(operands[0], str) and operands[0].startswith(operands[1])
+    if operator == "Contains":
+        return operands[0] is not None and _contains(operands[0], operands[1])
+    if operator == "In":
+        return operands[0] in operands[1]
+    raise NotImplementedError(f"Condition {operator} is not supported by the SQLite backend")
+
+
+def _object_operand(value, item):
+    if type(value).__name__ == "Size":
+        return _size(item.get(value.get_expression()["values"][0].name))
+    if isinstance(value, AttributeBase):
+        return item.get(value.name)
+    return value
+
+
+def _contains(container, value):
+    try:
+        return value in container
+    except TypeError:
+        return False
+
+
+# --- expression strings -------------------------------------------------------------
+
+_TOKEN = re.compile(r"\s*(<>|<=|>=|[=<>(),+\-]|[#:]?[\w.\[\]]+)")
+UPDATE_ACTIONS = ("set", "add", "remove", "delete")
+
+
+def _tokenize(text):
+    tokens = []
+    position = 0
+    text = text.strip()
+    while position < len(text):
+        match = _TOKEN.match(text, position)
+        if not match:
+            raise ValueError(f"Cannot parse expression at: {text[position:]!r}")
+        tokens.append(match.group(1))
+        position = match.end()
+    return tokens
+
+
+class _ExpressionParser:
+    """Compiles expression strings into functions of a Python-typed item"""
+
+    def __init__(self, text, names, values):
+        self.tokens = _tokenize(text)
+        self.position = 0
+        self.names = names or {}
+        self.values = values or {}
+
+    def peek(self, offset=0):
+        position = self.position + offset
+        return self.tokens[position] if position < len(self.tokens) else None
+
+    def take(self, expected=None):
+        token = self.peek()
+        if token is None or (expected and token.lower() != expected):
+            raise ValueError(f"Expected {expected or 'a token'}, found {token!r}")
+        self.position += 1
+        return token
+
+    def done(self):
+        return self.position >= len(self.tokens)
+
+    def path(self):
+        token = self.take()
+        if token.startswith(":"):
+            raise ValueError(f"Expected an attribute, found {token!r}")
+        name = self.names[token] if token.startswith("#") else token
+        if "." in token or "[" in token:
+            raise NotImplementedError("Nested attribute paths are not supported by the SQLite backend")
+        return name
+
+    def operand(self):
+        token = self.peek()
+        if token.startswith(":"):
+            self.take()
+            value = self.values[token]
+            return lambda item: value
+        if token.lower() == "size" and self.peek(1) == "(":
+            self.take()
+            self.take("(")
+            name = self.path()
+            self.take(")")
+            return lambda item: _size(item.get(name))
+        name = self.path()
+        return lambda item: item.get(name)
+
+    # Conditions
+    def condition(self):
+        result = self.disjunction()
+        if not self.done():
+            raise ValueError(f"Unexpected {self.peek()!r}")
+        return result
+
+    def disjunction(self):
+        parts = [self.conjunction()]
+        while self.peek() and self.peek().lower() == "or":
+            self.take()
+            parts.append(self.conjunction())
+        return parts[0] if len(parts) == 1 else lambda item: any(part(item) for part in parts)
+
+    def conjunction(self):
+        parts = [self.negation()]
+        while self.peek() and self.peek().lower() == "and":
+            self.take()
+            parts.append(self.negation())
+        return parts[0] if len(parts) == 1 else lambda item: all(part(item) for part in parts)
+
+    def negation(self):
+        if self.peek() and self.peek().lower() == "not":
+            self.take()
+            inner = self.negation()
+            return lambda item: not inner(item)
+        return self.predicate()
+
+    def predicate(self):
+        token = self.peek()
+        if token == "(":
+            self.take()
+            inner = self.disjunction()
+            self.take(")")
+            return inner
+
+        function = token.lower()
+        if self.peek(1) == "(" and function in ("attribute_exists", "attribute_not_exists", "begins_with", "contains"):
+            self.take()
+            self.take("(")
+            if function in ("attribute_exists", "attribute_not_exists"):
+                name = self.path()
+                self.take(")")
+                if function == "attribute_exists":
+                    return lambda item: name in item
+                return lambda item: name not in item
+            left = self.operand()
+            self.take(",")
+            right = self.operand()
+            self.take(")")
+            if function == "begins_with":
+                return lambda item: isinstance(left(item), str) and left(item).startswith(right(item))
+            return lambda item: left(item) is not None and _contains(left(item), right(item))
+
+        left = self.operand()
+        operator = self.take().lower()
+        if operator in COMPARISONS:
+            compare = COMPARISONS[operator]
+            right = self.operand()
+            return lambda item: compare(left(item), right(item))
+        if operator == "between":
+            low = self.operand()
+            self.take("and")
+            high = self.operand()
+            return lambda item: COMPARISONS[">="](left(item), low(item)) and COMPARISONS["<="](left(item), high(item))
+        if operator == "in":
+            self.take("(")
+            options = [self.operand()]
+            while self.peek() == ",":
+                self.take()
+                options.append(self.operand())
+            self.take(")")
+            return lambda item: any(left(item) == option(item) for option in options)
+        raise ValueError(f"Unsupported operator {operator!r}")
+
+    # Updates
+    def update(self):
+        """List of (action, attribute, value function) in expression order"""
+        actions = []
+        while not self.done():
+            action = self.take().lower()
+            if action not in UPDATE_ACTIONS:
+                raise ValueError(f"Expected SET, ADD, REMOVE or DELETE, found {action!r}")
+            while True:
+                name = self.path()
+                if action == "set":
+                    self.take("=")
+                    actions.append((action, name, self.value()))
+                elif action == "remove":
+                    actions.append((action, name, None))
+                else:
+                    actions.append((action, name, self.operand()))
+                if self.peek() != ",":
+                    break
+                self.take()
+        return actions
+
+    def value(self):
+        left = self.term()
+        if self.peek() in ("+", "-"):
+            sign = 1 if self.take() == "+" else -1
+            right = self.term()
+            return lambda item: left(item) + sign * right(item)
+        return left
+
+    def term(self):
+        function = (self.peek() or "").lower()
+        if self.peek(1) == "(" and function in ("if_not_exists", "list_append"):
+            self.take()
+            self.take("(")
+            if function == "if_not_exists":
+                name = self.path()
+                self.take(",")
+                default = self.value()
+                self.take(")")
+                return lambda item: item[name] if name in item else default(item)
+            first = self.value()
+            self.take(",")
+            second = self.value()
+            self.take(")")
+            return lambda item: list(first(item)) + list(second(item))
+        return self.operand()
+
+
+def compile_condition(condition, names=None, values=None):
+    """Function of an item for a ConditionExpression / FilterExpression (string or object)"""
+    if condition is None:
+        return lambda item: True
+    if isinstance(condition, ConditionBase):
+        return lambda item: evaluate(condition, item)
+    return _ExpressionParser(condition, names, values).condition()
+
+
+def apply_update(item, expression, names=None, values=None):
+    """The item after an UpdateExpression; every operand reads the item before the update"""
+    updated = dict(item)
+    for action, name, value in _ExpressionParser(expression, names, values).update():
+        if action == "set":
+            updated[name] = value(item)
+        elif action == "remove":
+            updated.pop(name, None)
+        elif action == "add":
+            addition = value(item)
+            current = updated.get(name)
+            if isinstance(addition, set):
+                updated[name] = set(current or ()) | addition
+            else:
+                updated[name] = (current or 0) + addition
+        else:
+            remaining = set(updated.get(name) or ()) - value(item)
+            if remaining:
+                updated[name] = remaining
+            else:
+                updated.pop(name, None)
+    return updated
+
+
+# --- tables -------------------------------------------------------------------------
+
+class _BatchWriter:
+    """table.batch_writer(): buffers puts and deletes and writes them in one transaction"""
+
+    def __init__(self, table):
+        self._table = table
+        self._requests = []
+
+    def put_item(self, Item):
+        self._requests.append({"PutRequest": {"Item": Item}})
+
+    def delete_item(self, Key):
+        self._requests.append({"DeleteRequest": {"Key": Key}})
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        if self._requests:
+            self._table.meta.client.batch_write_item(RequestItems={self._table.name: self._requests})
+        self._requests = []
+
+
+class SQLiteTable:
+    def __init__(self, resource, name):
+        self._resource = resource
+        self.name = self.table_name = name
+        self.meta = resource.meta
+        self._schema = None
+
+    # --- schema ----------------------------------------------------------------------
+    @property
+    def key_names(self):
+        """(partition key, sort key or None)"""
+        if self._schema is None:
+            self._schema = self._resource.key_schema(self.name)
+        return self._schema
+
+    def _sql_name(self):
+        return f'"{self.name}"'
+
+    def _key(self, key, operation):
+        partition_key, sort_key = self.key_names
+        try:
+            return str(key[partition_key]), str(key[sort_key]) if sort_key else ""
+        except KeyError:
+            raise _client_error("ValidationException", "The provided key element does not match the schema", operation)
+
+    def _item_key(self, item):
+        partition_key, sort_key = self.key_names
+        key = {partition_key: item[partition_key]}
+        if sort_key:
+            key[sort_key] = item[sort_key]
+        return key
+
+    # --- row access (callers hold the resource lock) ----------------------------------
+    def _load(self, connection, key, operation):
+        pk, sk = self._key(key, operation)
+        row = connection.execute(f"SELECT item FROM {self._sql_name()} WHERE pk = ? AND sk = ?", (pk, sk)).fetchone()
+        return decode_wire(row[0]) if row else None
+
+    def _store(self, connection, item, operation):
+        if any(name and name not in item for name in self.key_names):
+            raise _client_error("ValidationException", "One or more parameter values were invalid: Missing the key", operation)
+        pk, sk = self._key(item, operation)
+        columns = [item.get(name) if isinstance(item.get(name), str) else None for name in INDEXED_ATTRIBUTES]
+        connection.execute(
+            f"INSERT OR REPLACE INTO {self._sql_name()} (pk, sk, item, {', '.join(INDEXED_ATTRIBUTES)}) "
+            f"VALUES (?, ?, ?{', ?' * len(INDEXED_ATTRIBUTES)})",
+            (pk, sk, encode_item(item), *columns),
+        )
+
+    def _remove(self, connection, key, operation):
+        pk, sk = self._key(key, operation)
+        connection.execute(f"DELETE FROM {self._sql_name()} WHERE pk = ? AND sk = ?", (pk, sk))
+
+    def _prepare(self, connection, operation, kwargs):
+        """Check a write's condition; returns (old wire item or None, new item or None)"""
+        for name in ("ExpressionAttributeNames", "ExpressionAttributeValues"):
+            # DynamoDB rejects an empty map instead of ignoring it
+            if name in kwargs and not kwargs[name]:
+                raise _client_error("ValidationException", f"{name} must not be empty", operation)
+        key = self._item_key(kwargs["Item"]) if operation == "PutItem" else kwargs["Key"]
+        old_wire = self._load(connection, key, operation)
+        old_item = deserialize(old_wire) if old_wire else {}
+        condition = compile_condition(
+            kwargs.get("ConditionExpression"),
+            kwargs.get("ExpressionAttributeNames"),
+            kwargs.get("ExpressionAttributeValues"),
+        )
+        if not condition(old_item):
+            extra = {}
+            if old_wire and kwargs.get("ReturnValuesOnConditionCheckFailure") == "ALL_OLD":
+                extra["Item"] = old_wire
+            raise _client_error("ConditionalCheckFailedException", "The conditional request failed", operation, **extra)
+
+        if operation == "PutItem":
+            new_item = dict(kwargs["Item"])
+        elif operation == "UpdateItem":
+            new_item = apply_update(
+                old_item or dict(key),
+                kwargs["UpdateExpression"],
+                kwargs.get("ExpressionAttributeNames"),
+                kwargs.get("ExpressionAttributeValues"),
+            )
+            if self._item_key(new_item) != self._item_key({**new_item, **key}):
+                raise _client_error("ValidationException", "Cannot update attribute that is part of the key", operation)
+        else:
+            new_item = None
+        return old_wire, new_item
+
+    def _commit(self, connection, operation, kwargs, new_item):
+        if new_item is None:
+            self._remove(connection, kwargs["Key"], operation)
+        else:
+            self._store(connection, new_item, operation)
+
+    def _write(self, operation, kwargs):
+        with self._resource.transaction() as connection:
+            old_wire, new_item = self._prepare(connection, operation, kwargs)
+            self._commit(connection, operation, kwargs, new_item)
+
+        return_values = kwargs.get("ReturnValues") or "NONE"
+        if return_values == "ALL_OLD":
+            return {"Attributes": deserialize(old_wire)} if old_wire else {}
+        if return_values == "ALL_NEW" and new_item is not None:
+            return {"Attributes": deserialize(decode_wire(encode_item(new_item)))}
+        if return_values not in ("NONE", "ALL_NEW"):
+            raise NotImplementedError(f"ReturnValues={return_values} is not supported by the SQLite backend")
+        return {}
+
+    # --- single-item operations --------------------------------------------------------
+    def get_item(self, Key, **kwargs):
+        with self._resource.lock:
+            wire = self._load(self._resource.connection, Key, "GetItem")
+        return {"Item": deserialize(wire, projection_names(kwargs))} if wire else {}
+
+    def put_item(self, Item, **kwargs):
+        return self._write("PutItem", dict(kwargs, Item=Item))
+
+    def update_item(self, Key, UpdateExpression, **kwargs):
+        return self._write("UpdateItem", dict(kwargs, Key=Key, UpdateExpression=UpdateExpression))
+
+    def delete_item(self, Key, **kwargs):
+        return self._write("DeleteItem", dict(kwargs, Key=Key))
+
+    def batch_writer(self, overwrite_by_pkeys=None):
+        return _BatchWriter(self)
+
+    # --- reads ---------------------------------------------------------------------
+    def query(self, KeyConditionExpression, IndexName=None, FilterExpression=None, Limit=None,
+              ExclusiveStartKey=None, ScanIndexForward=True, **kwargs):
+        partition_key, sort_key = self.key_names
+        if IndexName is None:
+            partitions = {partition_key: "pk"}
+            sort_columns = {sort_key: "sk"} if sort_key else {}
+            order = ["sk"] if sort_key else ["pk"]
+        else:
+            partitions = {name: name for name in INDEXED_ATTRIBUTES if name != INDEX_SORT_KEY}
+            sort_columns = {INDEX_SORT_KEY: INDEX_SORT_KEY}
+            order = [INDEX_SORT_KEY, "pk", "sk"]
+
+        where, params, partition = _key_condition_sql(KeyConditionExpression, partitions, sort_columns, IndexName)
+        if IndexName is not None:
+            where.append(f"{INDEX_SORT_KEY} IS NOT NULL")
+
+        if ExclusiveStartKey:
+            start = {"pk": str(ExclusiveStartKey.get(partition_key)), "sk": str(ExclusiveStartKey.get(sort_key, "")) if sort_key else ""}
+            start[INDEX_SORT_KEY] = ExclusiveStartKey.get(INDEX_SORT_KEY)
+            comparison = ">" if ScanIndexForward else "<"
+            where.append(f"({', '.join(order)}) {comparison} ({', '.join('?' * len(order))})")
+            params.extend(start[column] for column in order)
+
+        direction = "ASC" if ScanIndexForward else "DESC"
+        sql = f"SELECT item FROM {self._sql_name()} WHERE {' AND '.join(where)} ORDER BY {', '.join(f'{c} {direction}' for c in order)}"
+
+        def last_key(item):
+            last = self._item_key(item)
+            if IndexName is not None:
+                last[partition] = item.get(partition)
+                last[INDEX_SORT_KEY] = item.get(INDEX_SORT_KEY)
+            return last
+        return self._page(sql, params, Limit, FilterExpression, kwargs, last_key)
+
+    def scan(self, Segment=None, TotalSegments=None, FilterExpression=None, Limit=None, ExclusiveStartKey=None, **kwargs):
+        where = ["1"]
+        params = []
+        if TotalSegments and TotalSegments > 1:
+            where.append("segment_of(pk, sk, ?) = ?")
+            params.extend([TotalSegments, Segment or 0])
+        if ExclusiveStartKey:
+            where.append("(pk, sk) > (?, ?)")
+            params.extend(self._key(ExclusiveStartKey, "Scan"))
+        sql = f"SELECT item FROM {self._sql_name()} WHERE {' AND '.join(where)} ORDER BY pk, sk"
+        return self._page(sql, params, Limit, FilterExpression, kwargs, self._item_key)
+
+    def read_by_date(self, start, end, squad=None, stack=None, **read_kwargs):
+        """
+        Return (items, stats) for CreatedDate between start and end, optionally one
+        Squad and/or TechStack, as a single indexed SQL query
+        """
+        started = time.perf_counter()
+        where = [f"{INDEX_SORT_KEY} BETWEEN ? AND ?"]
+        params = [start, end]
+        for column, value in (("Squad", squad), ("TechStack", stack)):
+            if value:
+                where.append(f"{column} = ?")
+                params.append(value)
+        sql = f"SELECT item FROM {self._sql_name()} WHERE {' AND '.join(where)} ORDER BY {INDEX_SORT_KEY}, pk, sk"
+        items = self._page(sql, params, None, None, read_kwargs, None)["Items"]
+        return items, {
+            "index": "sqlite",
+            "partitions": 1,
+            "pages": 1,
+            "scanned_count": len(items),
+            "returned_count": len(items),
+            "wall_time_ms": round((time.perf_counter() - started) * 1000, 2),
+        }
+
+    def _page(self, sql, params, limit, filter_exp, kwargs, last_key):
+        if limit:
+            sql += " LIMIT ?"
+            params = list(params) + [limit]
+        with self._resource.lock:
+            rows = self._resource.connection.execute(sql, params).fetchall()
+
+        names = projection_names(kwargs)
+        condition = compile_condition(filter_exp, kwargs.get("ExpressionAttributeNames"), kwargs.get("ExpressionAttributeValues"))
+        items = []
+        item = None
+        for (text,) in rows:
+            wire = decode_wire(text)
+            item = deserialize(wire)
+            if condition(item):
+                items.append(item if names is None else deserialize(wire, names))
+        response = {"Items": items, "Count": len(items), "ScannedCount": len(rows)}
+        if limit and len(rows) == limit and last_key:
+            response["LastEvaluatedKey"] = last_key(item)
+        return response
+
+
+def _key_condition_sql(condition, partitions, sort_columns, index_name):
+    """
+    (where clauses, params, partition attribute) for a boto3 KeyConditionExpression;
+    partitions and sort_columns map the usable key attributes to their SQL columns
+    """
+    if not isinstance(condition, ConditionBase):
+        raise NotImplementedError("KeyConditionExpression must be a boto3 Key condition for the SQLite backend")
+    leaves = []
+    pending = [condition]
+    while pending:
+        current = pending.pop()
+        if type(current).__name__ == "And":
+            pending.extend(current.get_expression()["values"])
+        else:
+            leaves.append(current)
+
+    where, params, partition = [], [], None
+    for leaf in leaves:
+        operator = type(leaf).__name__
+        values = leaf.get_expression()["values"]
+        name = values[0].name
+        if partition is None and operator == "Equals" and name in partitions:
+            partition = name
+            where.append(f"{partitions[name]} = ?")
+            params.append(str(values[1]))
+            continue
+        column = sort_columns.get(name)
+        if column is None:
+            message = f"The table does not have the specified index: {index_name}" if index_name else f"Query condition missed key schema element: {name}"
+            raise _client_error("ValidationException", message, "Query")
+        if operator in OBJECT_COMPARISONS and operator != "NotEquals":
+            where.append(f"{column} {OBJECT_COMPARISONS[operator]} ?")
+            params.append(values[1])
+        elif operator == "Between":
+            where.append(f"{column} BETWEEN ? AND ?")
+            params.extend(values[1:3])
+        elif operator == "BeginsWith":
+            prefix = values[1]
+            where.append(f"{column} >= ? AND {column} < ?")
+            params.extend([prefix, prefix[:-1] + chr(ord(prefix[-1]) + 1)])
+        else:
+            raise _client_error("ValidationException", f"Unsupported key condition {operator}", "Query")
+    if partition is None:
+        message = f"The table does not have the specified index: {index_name}" if index_name else "Query condition missed key schema element"
+        raise _client_error("ValidationException", message, "Query")
+    return where, params, partition
+
+
+# --- resource and client --------------------------------------------------------------
+
+class _SQLiteClient:
+    """Subset of the resource's meta.client, used with Python-typed items"""
+
+    def __init__(self, resource):
+        self._resource = resource
+
+    def batch_write_item(self, RequestItems, **kwargs):
+        with self._resource.transaction() as connection:
+            for table_name, requests in RequestItems.items():
+                table = self._resource.Table(table_name)
+                for request in requests:
+                    if "PutRequest" in request:
+                        table._store(connection, request["PutRequest"]["Item"], "BatchWriteItem")
+                    else:
+                        table._remove(connection, request["DeleteRequest"]["Key"], "BatchWriteItem")
+        return {"UnprocessedItems": {}}
+
+    def batch_get_item(self, RequestItems, **kwargs):
+        responses = {}
+        for table_name, request in RequestItems.items():
+            table = self._resource.Table(table_name)
+            found = [table.get_item(Key=key, **{k: v for k, v in request.items() if k != "Keys"}).get("Item") for key in request.get("Keys", [])]
+            responses[table_name] = [item for item in found if item]
+        return {"Responses": responses, "UnprocessedKeys": {}}
+
+    def transact_write_items(self, TransactItems, **kwargs):
+        """All-or-nothing: every condition is checked before anything is written"""
+        operations = {"Put": "PutItem", "Update": "UpdateItem", "Delete": "DeleteItem", "ConditionCheck": "ConditionCheck"}
+        with self._resource.transaction() as connection:
+            prepared = []
+            reasons = []
+            for entry in TransactItems:
+                (action, kwargs_), = entry.items()
+                table = self._resource.Table(kwargs_["TableName"])
+                operation = operations[action]
+                try:
+                    if operation == "ConditionCheck":
+                        table._prepare(connection, "DeleteItem", kwargs_)
+                        prepared.append(None)
+                    else:
+                        prepared.append((table, operation, kwargs_, table._prepare(connection, operation, kwargs_)[1]))
+                    reasons.append({"Code": "None"})
+                except ClientError as e:
+                    if e.response["Error"]["Code"] != "ConditionalCheckFailedException":
+                        raise
+                    reason = {"Code": "ConditionalCheckFailed", "Message": e.response["Error"]["Message"]}
+                    if "Item" in e.response:
+                        reason["Item"] = e.response["Item"]
+                    reasons.append(reason)
+            if any(reason["Code"] != "None" for reason in reasons):
+                raise _client_error(
+                    "TransactionCanceledException",
+                    "Transaction cancelled, please refer cancellation reasons for specific reasons",
+                    "TransactWriteItems",
+                    CancellationReasons=reasons,
+                )
+            for entry in prepared:
+                if entry:
+                    table, operation, kwargs_, new_item = entry
+                    table._commit(connection, operation, kwargs_, new_item)
+        return {}
+
+
+class _Meta:
+    def __init__(self, client):
+        self.client = client
+
+
+class SQLiteResource:
+    """Stand-in for boto3.resource("dynamodb") backed by one SQLite database file"""
+
+    def __init__(self, path=":memory:"):
+        self.path = path
+        self.lock = threading.RLock()
+        self.connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.connection.create_function("segment_of", 3, _segment_of, deterministic=True)
+        if path != ":memory:":
+            # Lets a retrieval process read while an ingest process writes
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS _tables (name TEXT PRIMARY KEY, partition_key TEXT NOT NULL, sort_key TEXT)"
+        )
+        self.meta = _Meta(_SQLiteClient(self))
+        self._tables = {}
+
+    @contextmanager
+    def transaction(self):
+        with self.lock:
+            self.connection.execute("BEGIN IMMEDIATE")
+            try:
+                yield self.connection
+            except BaseException:
+                self.connection.execute("ROLLBACK")
+                raise
+            self.connection.execute("COMMIT")
+
+    def create_table(self, name, partition_key, sort_key=None):
+        """Create a table and its indexes; an existing table must have the same key schema"""
+        if not TABLE_NAME_PATTERN.match(name) or name == "_tables":
+            raise _client_error("ValidationException", f"Invalid table name: {name}", "CreateTable")
+        with self.transaction() as connection:
+            row = connection.execute("SELECT partition_key, sort_key FROM _tables WHERE name = ?", (name,)).fetchone()
+            if row and tuple(row) != (partition_key, sort_key):
+                raise _client_error("ResourceInUseException", f"Table {name} exists with key schema {tuple(row)}", "CreateTable")
+            connection.execute("INSERT OR IGNORE INTO _tables VALUES (?, ?, ?)", (name, partition_key, sort_key))
+            connection.execute(
+                f'CREATE TABLE IF NOT EXISTS "{name}" (pk TEXT NOT NULL, sk TEXT NOT NULL, item TEXT NOT NULL, '
+                f"{', '.join(f'{column} TEXT' for column in INDEXED_ATTRIBUTES)}, PRIMARY KEY (pk, sk)) WITHOUT ROWID"
+            )
+            for column in INDEXED_ATTRIBUTES:
+                columns = column if column == INDEX_SORT_KEY else f"{column}, {INDEX_SORT_KEY}"
+                connection.execute(f'CREATE INDEX IF NOT EXISTS "{name}__{column}" ON "{name}" ({columns})')
+        return self.Table(name)
+
+    def key_schema(self, name):
+        with self.lock:
+            row = self.connection.execute("SELECT partition_key, sort_key FROM _tables WHERE name = ?", (name,)).fetchone()
+        if not row:
+            raise _client_error("ResourceNotFoundException", f"Requested resource not found: Table: {name} not found", "DescribeTable")
+        return row[0], row[1]
+
+    def Table(self, name):
+        table = self._tables.get(name)
+        if table is None:
+            table = self._tables[name] = SQLiteTable(self, name)
+        return table
+
+
+def _segment_of(pk, sk, total_segments):
+    return zlib.crc32(f"{pk}\x00{sk}".encode()) % total_segments
+
+
+# Key schemas of the pipeline's tables, as documented in the service READMEs
+PIPELINE_KEY_SCHEMAS = {
+    "table": ("PR_ID", None),
+    "rollup_table": ("Day", "RollupKey"),
+    "dedup_table": ("DeliveryId", None),
+    "sketch_table": ("Day", "ScopeKey"),
+}
+
+
+def create_pipeline_tables(resource, **names):
+    """Create the named pipeline tables, e.g. create_pipeline_tables(resource, table="prs", rollup_table="rollups")"""
+    for role, name in names.items():
+        if name:
+            resource.create_table(name, *PIPELINE_KEY_SCHEMAS[role])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Create the tables of a local SQLite pipeline")
+    parser.add_argument("path", help="SQLite database file")
+    parser.add_argument("--table", help="PR metrics table (PR_ID)")
+    parser.add_argument("--rollup-table", help="Daily rollup table (Day, RollupKey)")
+    parser.add_argument("--dedup-table", help="Webhook dedup table (DeliveryId)")
+    parser.add_argument("--sketch-table", help="Daily percentile partial table (Day, ScopeKey)")
+    args = parser.parse_args()
+
+    names = {role: getattr(args, role) for role in PIPELINE_KEY_SCHEMAS}
+    create_pipeline_tables(SQLiteResource(args.path), **names)
+    print(f"Tables ready in {args.path}: {', '.join(name for name in names.values() if name)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,289 @@
+"""
+Webhook ingestion against the local SQLite backend: redelivered, concurrent and
+batched events must leave the PR items and their rollup rows as if each delivery
+had been applied exactly once, in order.
+"""
+
+import json
+import time
+import itertools
+from datetime import datetime, timedelta
+
+import pytest
+from botocore.exceptions import ClientError
+
+import batch_ingest
+import dedup
+import metrics_processor_storage
+from daily_rollups import apply_rollup_delta
+from sqlite_backend import SQLiteResource, create_pipeline_tables
+
+
+def pr_payload(number, action, merged=False, state="open", updated_at="2025-05-01T10:00:00Z"):
+    return {
+        "action": action, "number": number, "sender": {"login": "ana"},
+        "repository": {"name": "api", "language": "Python"},
+        "pull_request": {
+            "number": number, "state": state, "draft": False, "user": {"login": "ana"},
+            "created_at": "2025-05-01T09:00:00Z", "updated_at": updated_at,
+            "merged_at": "2025-05-02T09:00:00Z" if merged else None, "merged": merged,
+            "merged_by": {"login": "bo"}, "head": {"ref": f"ENG-{number}-fix"}, "base": {"ref": "develop"},
+            "additions": 30, "deletions": 5, "html_url": f"https://github/api/{number}",
+        },
+    }
+
+
+def review_payload(number, review_state, reviewer, submitted_at="2025-05-01T12:00:00Z"):
+    payload = pr_payload(number, "submitted")
+    payload["review"] = {"state": review_state, "user": {"login": reviewer}, "submitted_at": submitted_at}
+    return payload
+
+
+class Tables:
+    def __init__(self):
+        self.resource = SQLiteResource(":memory:")
+        create_pipeline_tables(self.resource, table="prs", rollup_table="rollups", dedup_table="dedup")
+        self.prs = self.resource.Table("prs")
+        self.rollups = self.resource.Table("rollups")
+        self.dedup = self.resource.Table("dedup")
+
+    def deliver(self, detail_type, payload, delivery_id, table=None):
+        metrics_processor_storage.store_event_in_dynamodb(
+            json.dumps(payload), detail_type, table or self.prs, self.rollups, self.dedup, delivery_id)
+
+    def deliver_batch(self, records, table=None):
+        return batch_ingest.store_events_batch(records, table or self.prs, self.rollups, self.dedup)
+
+    def snapshot(self):
+        return tuple(
+            sorted((json.dumps(item, sort_keys=True, default=sorted_value) for item in table.scan()["Items"]))
+            for table in (self.prs, self.rollups, self.dedup)
+        )
+
+
+def sorted_value(value):
+    return sorted(value) if isinstance(value, set) else str(value)
+
+
+def rebuilt_rollups(tables):
+    """Rollup rows rebuilt from scratch out of the stored PR items"""
+    fresh = Tables()
+    for item in tables.prs.scan()["Items"]:
+        apply_rollup_delta(fresh.rollups, None, item)
+    return fresh.snapshot()[1]
+
+
+@pytest.fixture(autouse=True)
+def ticking_clock(monkeypatch):
+    """Every event gets its own handler timestamp, so a second write would change event_timestamp"""
+    ticks = itertools.count()
+    start = datetime(2025, 5, 1, 12, 0, 0)
+
+    class Clock(datetime):
+        @classmethod
+        def utcnow(cls):
+            return start + timedelta(seconds=next(ticks))
+
+    monkeypatch.setattr(metrics_processor_storage, "datetime", Clock)
+    dedup.seen_deliveries.entries.clear()
+    yield
+    dedup.seen_deliveries.entries.clear()
+
+
+@pytest.mark.parametrize("checked_before_write", [True, False], ids=["lookup", "transaction"])
+def test_replayed_delivery_writes_nothing(monkeypatch, checked_before_write):
+    tables = Tables()
+    deliveries = [
+        ("pull_request", pr_payload(1, "opened"), "d1"),
+        ("pull_request_review", review_payload(1, "changes_requested", "bo"), "d2"),
+        ("pull_request", pr_payload(1, "closed", merged=True, state="closed"), "d3"),
+    ]
+    for delivery in deliveries:
+        tables.deliver(*delivery)
+    before = tables.snapshot()
+
+    # A retry that lands on another container, optionally racing past the dedup lookup
+    dedup.seen_deliveries.entries.clear()
+    if not checked_before_write:
+        monkeypatch.setattr(metrics_processor_storage, "is_recorded", lambda table, key: False)
+    for delivery in deliveries:
+        tables.deliver(*delivery)
+
+    assert tables.snapshot() == before
+    assert before[1] == rebuilt_rollups(tables)
+
+
+class ConcurrentWriter:
+    """PR table whose first read is followed by another event's write, so the read is stale"""
+
+    def __init__(self, table, write):
+        self._table = table
+        self._write = write
+
+    def __getattr__(self, name):
+        return getattr(self._table, name)
+
+    def get_item(self, **kwargs):
+        response = self._table.get_item(**kwargs)
+        write, self._write = self._write, None
+        if write:
+            write()
+        return response
+
+
+@pytest.mark.parametrize("detail_type,payload", [
+    ("pull_request_review", review_payload(1, "approved", "cy")),
+    ("pull_request", pr_payload(1, "closed", merged=True, state="closed")),
+], ids=["review", "merge"])
+def test_version_conflict_is_retried_without_double_counting(detail_type, payload):
+    tables = Tables()
+    tables.deliver("pull_request", pr_payload(1, "opened"), "d1")
+    concurrent = ConcurrentWriter(tables.prs, lambda: tables.deliver(
+        "pull_request_review", review_payload(1, "changes_requested", "bo"), "d2"))
+
+    tables.deliver(detail_type, payload, "d3", table=concurrent)
+
+    item = tables.prs.get_item(Key={"PR_ID": "api_1"})["Item"]
+    assert "bo" in item["ReviewerSet"] and item["ChangeRequestorSet"] == {"bo"}
+    if detail_type == "pull_request_review":
+        assert item["ReviewerSet"] == {"bo", "cy"}
+    else:
+        assert item["State"] == "Merged"
+    assert tables.snapshot()[1] == rebuilt_rollups(tables)
+    assert len(tables.dedup.scan()["Items"]) == 3
+
+
+def test_expired_dedup_record_does_not_block_delivery():
+    tables = Tables()
+    payload = pr_payload(1, "opened")
+    key = dedup.delivery_key("d1", "pull_request", json.dumps(payload))
+    # TTL deletion lags: the record has expired but is still stored
+    tables.dedup.put_item(Item={"DeliveryId": key, "PR_ID": "api_1", "ExpiresAt": int(time.time()) - 60})
+
+    tables.deliver("pull_request", payload, "d1")
+
+    assert tables.prs.get_item(Key={"PR_ID": "api_1"})["Item"]["State"] == "Open"
+    assert tables.dedup.get_item(Key={"DeliveryId": key})["Item"]["ExpiresAt"] > time.time()
+    assert tables.snapshot()[1] == rebuilt_rollups(tables)
+
+
+def burst(number):
+    """One PR's events, in the order they happened"""
+    return [
+        ("pull_request", pr_payload(number, "opened"), f"{number}-open"),
+        ("pull_request_review", review_payload(number, "commented", "cy", "2025-05-01T11:00:00Z"), f"{number}-comment"),
+        ("pull_request_review", review_payload(number, "changes_requested", "bo", "2025-05-01T12:00:00Z"), f"{number}-changes"),
+        ("pull_request", pr_payload(number, "synchronize", updated_at="2025-05-01T13:00:00Z"), f"{number}-push"),
+        ("pull_request_review", review_payload(number, "approved", "bo", "2025-05-01T14:00:00Z"), f"{number}-approve"),
+        ("pull_request", pr_payload(number, "closed", merged=True, state="closed", updated_at="2025-05-02T09:00:00Z"),
+         f"{number}-merge"),
+    ]
+
+
+def eventbridge_records(deliveries):
+    return [{"id": delivery_id, "detail-type": detail_type, "detail": payload}
+            for detail_type, payload, delivery_id in deliveries]
+
+
+@pytest.fixture
+def frozen_clock(monkeypatch):
+    """The batch stamps all of its events with one timestamp; the single-event path gets the same one"""
+    class Clock(datetime):
+        @classmethod
+        def utcnow(cls):
+            return datetime(2025, 5, 2, 12, 0, 0)
+
+    monkeypatch.setattr(metrics_processor_storage, "datetime", Clock)
+    monkeypatch.setattr(batch_ingest, "datetime", Clock)
+
+
+@pytest.mark.parametrize("stored_first", [False, True], ids=["new", "existing"])
+def test_batch_matches_single_events(frozen_clock, stored_first):
+    deliveries = burst(1) + burst(2)
+    single, batched = Tables(), Tables()
+    if stored_first:
+        # The batch then updates a stored item instead of creating it
+        single.deliver(*deliveries[0])
+        dedup.seen_deliveries.entries.clear()
+        batched.deliver(*deliveries[0])
+        deliveries = deliveries[1:]
+    for delivery in deliveries:
+        single.deliver(*delivery)
+
+    # Shuffled in the batch; it orders each PR's events by event time. The warm-container
+    # set is shared by both pipelines here, so it is cleared first
+    dedup.seen_deliveries.entries.clear()
+    result = batched.deliver_batch(eventbridge_records(deliveries[::-1]))
+
+    assert result == {"batchItemFailures": []}
+    assert batched.snapshot()[:2] == single.snapshot()[:2]
+    assert batched.snapshot()[1] == rebuilt_rollups(batched)
+    keys = lambda tables: sorted(item["DeliveryId"] for item in tables.dedup.scan()["Items"])
+    assert keys(batched) == keys(single)
+
+
+class FailingWrites:
+    """PR table whose writes (direct or transacted) fail for one PR"""
+
+    def __init__(self, table, pr_id):
+        self._table = table
+        self._pr_id = pr_id
+        self.meta = self
+        self.client = self
+
+    def __getattr__(self, name):
+        return getattr(self._table, name) if hasattr(self._table, name) else getattr(self._table.meta.client, name)
+
+    def _check(self, pr_id, operation):
+        if pr_id == self._pr_id:
+            raise ClientError({"Error": {"Code": "InternalServerError", "Message": "boom"}}, operation)
+
+    def put_item(self, Item, **kwargs):
+        self._check(Item["PR_ID"], "PutItem")
+        return self._table.put_item(Item=Item, **kwargs)
+
+    def transact_write_items(self, TransactItems, **kwargs):
+        for entry in TransactItems:
+            (action, request), = entry.items()
+            if request["TableName"] == self._table.name:
+                self._check((request.get("Item") or request.get("Key"))["PR_ID"], "TransactWriteItems")
+        return self._table.meta.client.transact_write_items(TransactItems=TransactItems, **kwargs)
+
+
+def test_failed_write_reports_only_its_records():
+    tables = Tables()
+    result = tables.deliver_batch(eventbridge_records(burst(1) + burst(2)), table=FailingWrites(tables.prs, "api_2"))
+
+    assert sorted(failure["itemIdentifier"] for failure in result["batchItemFailures"]) == sorted(
+        delivery_id for _, _, delivery_id in burst(2))
+    assert [item["PR_ID"] for item in tables.prs.scan()["Items"]] == ["api_1"]
+    # Nothing of the failed PR was committed, so its redelivery is not dropped
+    assert all(item["PR_ID"] == "api_1" for item in tables.dedup.scan()["Items"])
+    assert tables.snapshot()[1] == rebuilt_rollups(tables)
+
+
+def test_remove_only_change_sends_no_empty_values():
+    tables = Tables()
+    # A legacy row: no event_timestamp, so the version condition has no values
+    before = {"PR_ID": "api_1", "State": "Open", "Jira_URL": "https://jira/ENG-1"}
+    tables.prs.put_item(Item=before)
+    after = {"PR_ID": "api_1", "State": "Open"}
+
+    batch_ingest.update_changed_attributes(tables.prs, "api_1", before, after)
+
+    assert tables.prs.get_item(Key={"PR_ID": "api_1"})["Item"] == after
+
+
+@pytest.mark.parametrize("review_state,expected", [
+    ("approved", "Open"), ("commented", "Open"), ("changes_requested", "Changes Requested"),
+])
+def test_pr_created_by_a_review_keeps_its_base_state(review_state, expected):
+    single, batched = Tables(), Tables()
+    delivery = ("pull_request_review", review_payload(1, review_state, "bo"), "d1")
+    single.deliver(*delivery)
+    dedup.seen_deliveries.entries.clear()
+    batched.deliver_batch(eventbridge_records([delivery]))
+
+    for tables in (single, batched):
+        item = tables.prs.get_item(Key={"PR_ID": "api_1"})["Item"]
+        assert item["State"] == expected and item["FirstReviewer"] == "bo"
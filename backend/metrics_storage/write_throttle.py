@@ -0,0 +1,221 @@
+"""
+Throttle-aware DynamoDB calls for the storage service.
+
+classify_error sorts every ClientError into one of:
+- "throttle": ProvisionedThroughputExceededException, ThrottlingException,
+  RequestLimitExceeded, or a transaction cancelled by throttling or a conflicting
+  transaction. These are retried with full-jitter exponential backoff.
+- "conditional": ConditionalCheckFailedException or a transaction cancelled by a
+  condition. Raised at once; the handlers rely on them.
+- "error": anything else. Raised at once.
+
+ThrottledTable wraps a Table and its meta.client. Writes first take tokens from a
+per-table TokenBucket sized by WRITE_CAPACITY_UNITS, so a webhook burst is paced
+instead of hammering the table. The bucket is adaptive: a throttle (or unprocessed
+batch items) cuts its rate, and successful calls restore it step by step.
+A call still throttled after WRITE_MAX_ATTEMPTS raises ThrottleExhausted, so the event
+fails and its delivery is retried rather than losing the update.
+
+Counts go into the event's EventMetrics: ThrottleRetries, ThrottleDrops,
+UnprocessedItems and ThrottleWaitMs.
+"""
+
+import os
+import time
+import random
+import threading
+from botocore.exceptions import ClientError
+
+# Write capacity units per second one container may use per table; 0 disables pacing (on-demand tables)
+WRITE_CAPACITY_UNITS = float(os.environ.get("WRITE_CAPACITY_UNITS", "0"))
+WRITE_BURST_SECONDS = float(os.environ.get("WRITE_BURST_SECONDS", "1"))
+WRITE_MAX_ATTEMPTS = int(os.environ.get("WRITE_MAX_ATTEMPTS", "6"))
+THROTTLE_BASE_DELAY_MS = float(os.environ.get("THROTTLE_BASE_DELAY_MS", "50"))
+THROTTLE_MAX_DELAY_MS = float(os.environ.get("THROTTLE_MAX_DELAY_MS", "5000"))
+# Rate multiplier applied on each throttle, the floor it cannot go below, and the per-success recovery step
+THROTTLE_RATE_DECREASE = 0.7
+THROTTLE_MIN_RATE_FRACTION = 0.1
+THROTTLE_RATE_RECOVERY = 0.05
+
+THROTTLE_CODES = ("ProvisionedThroughputExceededException", "ThrottlingException", "RequestLimitExceeded", "TransactionConflictException")
+CANCELLATION_THROTTLE_CODES = ("ThrottlingError", "ProvisionedThroughputExceeded", "TransactionConflict")
+TABLE_OPERATIONS = ("get_item", "put_item", "update_item", "delete_item", "query", "scan")
+CLIENT_OPERATIONS = ("batch_get_item", "batch_write_item", "transact_write_items", "transact_get_items")
+
+
+class ThrottleExhausted(ClientError):
+    """A call was still throttled after WRITE_MAX_ATTEMPTS attempts"""
+
+
+def classify_error(error):
+    """"throttle", "conditional" or "error" for a ClientError"""
+    code = error.response.get("Error", {}).get("Code")
+    if code in THROTTLE_CODES:
+        return "throttle"
+    if code == "ConditionalCheckFailedException":
+        return "conditional"
+    if code == "TransactionCanceledException":
+        reasons = [reason.get("Code") for reason in error.response.get("CancellationReasons") or []]
+        if "ConditionalCheckFailed" in reasons:
+            return "conditional"
+        if any(reason in CANCELLATION_THROTTLE_CODES for reason in reasons):
+            return "throttle"
+    return "error"
+
+
+def backoff_delay(attempt):
+    """Full-jitter delay in seconds before retry number attempt (0-based)"""
+    return random.uniform(0, min(THROTTLE_MAX_DELAY_MS, THROTTLE_BASE_DELAY_MS * 2 ** attempt)) / 1000
+
+
+class TokenBucket:
+    """Adaptive token bucket shared by a container's threads; rate 0 never waits"""
+
+    def __init__(self, rate, burst_seconds=WRITE_BURST_SECONDS):
+        self.max_rate = rate
+        self.rate = rate
+        self.capacity = max(1.0, rate * burst_seconds)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self, tokens=1):
+        """Take tokens, sleeping until they are available; returns the seconds waited"""
+        if not self.max_rate or not tokens:
+            return 0.0
+        tokens = min(tokens, self.capacity)
+        waited = 0.0
+        while True:
+            with self.lock:
+                self._refill()
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return waited
+                delay = (tokens - self.tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+    def on_throttle(self):
+        """Slow down: cut the rate and drop the saved-up burst"""
+        if not self.max_rate:
+            return
+        with self.lock:
+            self._refill()
+            self.rate = max(self.max_rate * THROTTLE_MIN_RATE_FRACTION, self.rate * THROTTLE_RATE_DECREASE)
+            self.tokens = min(self.tokens, 0.0)
+
+    def on_success(self):
+        if self.rate < self.max_rate:
+            with self.lock:
+                self.rate = min(self.max_rate, self.rate + self.max_rate * THROTTLE_RATE_RECOVERY)
+
+
+# One bucket per table, reused while the Lambda container is warm
+_buckets = {}
+_buckets_lock = threading.Lock()
+
+
+def bucket_for(table_name):
+    with _buckets_lock:
+        bucket = _buckets.get(table_name)
+        if bucket is None:
+            bucket = _buckets[table_name] = TokenBucket(WRITE_CAPACITY_UNITS)
+        return bucket
+
+
+def write_units(operation, kwargs):
+    """Approximate write capacity a call consumes (items up to 1 KB; transactions cost double)"""
+    if operation in ("put_item", "update_item", "delete_item"):
+        return 1
+    if operation == "batch_write_item":
+        return sum(len(requests) for requests in kwargs.get("RequestItems", {}).values())
+    if operation == "transact_write_items":
+        return 2 * len(kwargs.get("TransactItems", []))
+    return 0
+
+
+def _throttled_call(method, operation, bucket, metrics):
+    def call(*args, **kwargs):
+        units = write_units(operation, kwargs)
+        waited = 0.0
+        try:
+            for attempt in range(WRITE_MAX_ATTEMPTS):
+                waited += bucket.acquire(units)
+                try:
+                    response = method(*args, **kwargs)
+                except ClientError as e:
+                    if classify_error(e) != "throttle":
+                        raise
+                    bucket.on_throttle()
+                    if attempt + 1 == WRITE_MAX_ATTEMPTS:
+                        metrics.add("ThrottleDrops")
+                        print(f"{operation} still throttled after {WRITE_MAX_ATTEMPTS} attempts: {e}")
+                        raise ThrottleExhausted(e.response, e.operation_name) from e
+                    metrics.add("ThrottleRetries")
+                    delay = backoff_delay(attempt)
+                    time.sleep(delay)
+                    waited += delay
+                    continue
+
+                unprocessed = sum(len(requests) for requests in (response.get("UnprocessedItems") or {}).values())
+                if unprocessed:
+                    # BatchWriteItem reports throttled items instead of failing; the caller retries them
+                    metrics.add("UnprocessedItems", unprocessed)
+                    bucket.on_throttle()
+                else:
+                    bucket.on_success()
+                return response
+        finally:
+            if waited:
+                metrics.add("ThrottleWaitMs", waited * 1000)
+    return call
+
+
+class _ThrottledClient:
+    def __init__(self, client, bucket, metrics):
+        self._client = client
+        self._bucket = bucket
+        self._metrics = metrics
+
+    def __getattr__(self, name):
+        attr = getattr(self._client, name)
+        if name in CLIENT_OPERATIONS:
+            return _throttled_call(attr, name, self._bucket, self._metrics)
+        return attr
+
+
+class _ThrottledMeta:
+    def __init__(self, meta, bucket, metrics):
+        self._meta = meta
+        self.client = _ThrottledClient(meta.client, bucket, metrics)
+
+    def __getattr__(self, name):
+        return getattr(self._meta, name)
+
+
+class ThrottledTable:
+    """Proxy for a boto3 Table that paces writes and retries throttled calls"""
+
+    def __init__(self, table, metrics):
+        self._table = table
+        self._bucket = bucket_for(table.name)
+        self._metrics = metrics
+        self.meta = _ThrottledMeta(table.meta, self._bucket, metrics)
+
+    def __getattr__(self, name):
+        attr = getattr(self._table, name)
+        if name in TABLE_OPERATIONS:
+            return _throttled_call(attr, name, self._bucket, self._metrics)
+        return attr
+
+
+def throttle(table, metrics):
+    """Wrap table for throttle handling (None and already-wrapped tables are returned unchanged)"""
+    if table is None or isinstance(table, ThrottledTable):
+        return table
+    return ThrottledTable(table, metrics)